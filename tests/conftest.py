@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the utilities are imported as in the notebooks, from the root of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,189 @@
+import copy
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.backtest_engine import run_multi_asset_backtest
+from utilities.value_at_risk import ValueAtRisk
+
+SIGNAL_COLUMNS = ["open_long_market", "close_long_market", "open_short_market", "close_short_market"]
+
+
+class NotebookValueAtRisk:
+    """ ValueAtRisk of the multi_division notebooks (scipy norm.ppf replaced by NormalDist) """
+
+    def __init__(self, df_list):
+        self.df_list = df_list
+        self.cov = None
+        self.avg_return = None
+        self.conf_level = 0.05
+        self.usd_balance = 1
+
+    def update_cov(self, current_date, occurance_data=1000):
+        returns = pd.DataFrame()
+        returns["temp"] = [0] * (occurance_data)
+        for pair in self.df_list:
+            temp_df = self.df_list[pair].copy()
+            try:
+                iloc_date = int(temp_df.loc[current_date]["iloc"])
+                if math.isnan(iloc_date) or iloc_date-occurance_data < 0:
+                    returns["long_"+pair] = -1
+                    returns["short_"+pair] = -1
+                else:
+                    returns["long_"+pair] = temp_df.iloc[iloc_date-occurance_data:iloc_date].reset_index()["close"].pct_change()
+                    returns["short_"+pair] = -temp_df.iloc[iloc_date-occurance_data:iloc_date].reset_index()["close"].pct_change()
+            except Exception:
+                returns["long_"+pair] = -1
+                returns["short_"+pair] = -1
+        del returns["temp"]
+        returns = returns.iloc[:-1]
+        self.cov = returns.cov()
+        self.cov = self.cov.replace(0.0, 1.0)
+        self.avg_return = returns.mean()
+
+    def get_var(self, positions):
+        usd_in_position = 0
+        for pair in list(positions.keys()):
+            usd_in_position += positions[pair]["long"] + positions[pair]["short"]
+        weights = []
+        if usd_in_position == 0:
+            return 0
+        for pair in list(positions.keys()):
+            weights.append(positions[pair]["long"] / usd_in_position)
+            weights.append(positions[pair]["short"] / usd_in_position)
+        weights = np.array(weights)
+        port_mean = self.avg_return.dot(weights)
+        port_stdev = np.sqrt(weights.T.dot(self.cov).dot(weights))
+        mean_investment = (1+port_mean) * usd_in_position
+        stdev_investment = usd_in_position * port_stdev
+        cutoff1 = mean_investment + stdev_investment * NormalDist().inv_cdf(self.conf_level)
+        var_1d1 = usd_in_position - cutoff1
+        return var_1d1 / self.usd_balance * 100
+
+
+def notebook_multi_backtest(df_list, wallet_exposure, oldest_pair, max_var, occurance_data, var_reset):
+    """ Trading loop of the multi_division notebooks, the covariance is updated when
+        var_counter is back to 0 and var_counter restarts from var_reset (1000 in the notebooks)
+    """
+    df_list = {pair: df.assign(iloc=range(len(df))) for pair, df in df_list.items()}
+    signals = {
+        column: pd.concat([df.loc[df[column], []].assign(pair=pair) for pair, df in df_list.items()])
+        .groupby(level=0)["pair"].apply(list)
+        for column in SIGNAL_COLUMNS
+    }
+    wallet = 1000
+    taker_fee = 0.0007
+    exposition = {"LONG": 0, "SHORT": 0}
+    trades = []
+    risks = []
+    previous_day = 0
+    current_positions = {}
+    positions_exposition = {pair: {"long": 0, "short": 0} for pair in df_list}
+    var = NotebookValueAtRisk(df_list=df_list.copy())
+    var_counter = 0
+
+    for index, row in df_list[oldest_pair].iterrows():
+        if var_counter == 0:
+            var.update_cov(current_date=index, occurance_data=occurance_data)
+            var_counter = var_reset
+        else:
+            var_counter -= 1
+        if previous_day != index.day:
+            risks.append(var.get_var(positions=positions_exposition))
+        previous_day = index.day
+
+        for side, column in (("LONG", "close_long_market"), ("SHORT", "close_short_market")):
+            to_close = set(k for k, v in current_positions.items() if v["side"] == side)
+            for pos in sorted(to_close.intersection(signals[column].get(index, [])), key=list(df_list).index):
+                close_price = df_list[pos].loc[index]["close"]
+                trade_result = (close_price - current_positions[pos]["price"]) / current_positions[pos]["price"]
+                if side == "SHORT":
+                    trade_result = -trade_result
+                close_size = current_positions[pos]["size"] + current_positions[pos]["size"] * trade_result
+                fee = close_size * taker_fee
+                wallet += close_size - current_positions[pos]["size"] - fee
+                exposition[side] -= wallet_exposure[pos]
+                positions_exposition[pos][side.lower()] -= wallet_exposure[pos]
+                trades.append((pos, current_positions[pos]["date"], index, side, wallet))
+                del current_positions[pos]
+
+        for side, column in (("LONG", "open_long_market"), ("SHORT", "open_short_market")):
+            for pos in signals[column].get(index, []):
+                if (pos not in current_positions) and (exposition[side] + wallet_exposure[pos] <= 1):
+                    new_positions = copy.deepcopy(positions_exposition)
+                    new_positions[pos][side.lower()] += wallet_exposure[pos]
+                    if var.get_var(positions=new_positions) > max_var:
+                        continue
+                    pos_size = wallet * wallet_exposure[pos]
+                    exposition[side] += wallet_exposure[pos]
+                    positions_exposition[pos][side.lower()] += wallet_exposure[pos]
+                    fee = pos_size * taker_fee
+                    wallet -= fee
+                    current_positions[pos] = {
+                        "size": pos_size - fee,
+                        "date": index,
+                        "price": df_list[pos].loc[index]["close"],
+                        "side": side,
+                    }
+    return wallet, trades, risks
+
+
+def make_pairs(n_pairs=4, length=720, seed=3):
+    """ Hourly pairs listed at different dates, with random signals """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2022-01-01", periods=length, freq="1h")
+    df_list = {}
+    for k in range(n_pairs):
+        dates = index[0 if k == 0 else rng.integers(0, length // 3):]
+        df = pd.DataFrame(
+            {"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01 * (k + 1), len(dates))))}, index=dates)
+        for column in SIGNAL_COLUMNS:
+            df[column] = rng.random(len(dates)) < 0.05
+        df_list[f"P{k}/USDT"] = df
+    return df_list
+
+
+@pytest.mark.parametrize("var_update_every", [1, 50])
+def test_multi_asset_var_gate_matches_notebook(var_update_every):
+    df_list = make_pairs()
+    wallet_exposure = {pair: 0.3 for pair in df_list}
+    max_var = 2
+
+    wallet, trades, risks = notebook_multi_backtest(
+        df_list, wallet_exposure, "P0/USDT", max_var, occurance_data=100, var_reset=var_update_every - 1)
+    result = run_multi_asset_backtest(
+        df_list, wallet_exposure, "P0/USDT", max_var=max_var, value_at_risk=ValueAtRisk(df_list),
+        var_window=100, var_update_every=var_update_every)
+
+    df_trades = result["trades"]
+    assert len(df_trades) == len(trades)
+    assert df_trades["pair"].tolist() == [trade[0] for trade in trades]
+    assert df_trades["open_date"].tolist() == [trade[1] for trade in trades]
+    assert df_trades["close_date"].tolist() == [trade[2] for trade in trades]
+    np.testing.assert_allclose(df_trades["wallet"], [trade[4] for trade in trades], rtol=1e-9)
+    np.testing.assert_allclose(result["days"]["risk"], risks, rtol=1e-6, atol=1e-9)
+    assert result["wallet"] == pytest.approx(wallet, rel=1e-9)
+
+    # the gate really refuses positions
+    ungated = run_multi_asset_backtest(df_list, wallet_exposure, "P0/USDT")
+    assert len(ungated["trades"]) > len(df_trades)
+
+
+def test_value_at_risk_array_matches_positions():
+    df_list = make_pairs()
+    notebook_var = NotebookValueAtRisk({pair: df.assign(iloc=range(len(df))) for pair, df in df_list.items()})
+    value_at_risk = ValueAtRisk(df_list)
+    rng = np.random.default_rng(0)
+    for date in df_list["P0/USDT"].index[[150, 400, 719]]:
+        notebook_var.update_cov(current_date=date, occurance_data=100)
+        value_at_risk.update_cov(current_date=date, occurance_data=100)
+        exposures = rng.choice([0, 0.1, 0.3], size=(len(df_list), 2))
+        positions = {
+            pair: {"long": exposures[j, 0], "short": exposures[j, 1]} for j, pair in enumerate(df_list)
+        }
+        expected = notebook_var.get_var(positions=positions)
+        assert value_at_risk.get_var_array(exposures) == pytest.approx(expected, rel=1e-6)
+        assert value_at_risk.get_var(positions=positions) == pytest.approx(expected, rel=1e-6)
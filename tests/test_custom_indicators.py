@@ -0,0 +1,136 @@
+import importlib
+import math
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities import custom_indicators
+
+
+# Loop implementations replaced by the compiled kernels, as they were before them.
+# They index by label, so they are run on a RangeIndex.
+
+def heikin_ashi_reference(df):
+    df['HA_Close'] = (df.open + df.high + df.low + df.close)/4
+    ha_open = [(df.open[0] + df.close[0]) / 2]
+    [ha_open.append((ha_open[i] + df.HA_Close.values[i]) / 2)
+     for i in range(0, len(df)-1)]
+    df['HA_Open'] = ha_open
+    df['HA_High'] = df[['HA_Open', 'HA_Close', 'high']].max(axis=1)
+    df['HA_Low'] = df[['HA_Open', 'HA_Close', 'low']].min(axis=1)
+    return df
+
+
+def supertrend_reference(high, low, close, atr_window=10, atr_multi=3):
+    price_diffs = [high - low, high - close.shift(), close.shift() - low]
+    true_range = pd.concat(price_diffs, axis=1)
+    true_range = true_range.abs().max(axis=1)
+    atr = true_range.ewm(alpha=1/atr_window, min_periods=atr_window).mean()
+    hl2 = (high + low) / 2
+    final_upperband = hl2 + (atr_multi * atr)
+    final_lowerband = hl2 - (atr_multi * atr)
+    supertrend = [True] * len(close)
+    for i in range(1, len(close)):
+        curr, prev = i, i-1
+        if close[curr] > final_upperband[prev]:
+            supertrend[curr] = True
+        elif close[curr] < final_lowerband[prev]:
+            supertrend[curr] = False
+        else:
+            supertrend[curr] = supertrend[prev]
+            if supertrend[curr] == True and final_lowerband[curr] < final_lowerband[prev]:
+                final_lowerband[curr] = final_lowerband[prev]
+            if supertrend[curr] == False and final_upperband[curr] > final_upperband[prev]:
+                final_upperband[curr] = final_upperband[prev]
+        if supertrend[curr] == True:
+            final_upperband[curr] = np.nan
+        else:
+            final_lowerband[curr] = np.nan
+    return pd.DataFrame({
+        'Supertrend': supertrend,
+        'Final Lowerband': final_lowerband,
+        'Final Upperband': final_upperband
+    })
+
+
+def ma_slope_reference(close, high, low, long_ma=200, major_length=14, minor_length=6, slope_period=34, slope_ir=25):
+    minAlpha = 2 / (minor_length + 1)
+    majAlpha = 2 / (major_length + 1)
+    df = pd.DataFrame(data = {"close": close, "high": high, "low": low})
+    df['hh'] = df['high'].rolling(window=long_ma+1).max()
+    df['ll'] = df['low'].rolling(window=long_ma+1).min()
+    df = df.fillna(0)
+    df.loc[df['hh'] == df['ll'], 'mult'] = 0
+    df.loc[df['hh'] != df['ll'], 'mult'] = abs(2 * df['close'] - df['ll'] - df['hh']) / (df['hh'] - df['ll'])
+    df['final'] = df['mult'] * (minAlpha - majAlpha) + majAlpha
+    ma_first = (df.iloc[0]['final']**2) * df.iloc[0]['close']
+    col_ma = [ma_first]
+    for i in range(1, len(df)):
+        ma1 = col_ma[i-1]
+        col_ma.append(ma1 + (df.iloc[i]['final']**2) * (df.iloc[i]['close'] - ma1))
+    df['ma'] = col_ma
+    pi = math.atan(1) * 4
+    df['hh1'] = df['high'].rolling(window=slope_period).max()
+    df['ll1'] = df['low'].rolling(window=slope_period).min()
+    df['slope_range'] = slope_ir / (df['hh1'] - df['ll1']) * df['ll1']
+    df['dt'] = (df['ma'].shift(2) - df['ma']) / df['close'] * df['slope_range']
+    df['c'] = (1+df['dt']*df['dt'])**0.5
+    df['xangle'] = round(180*np.arccos(1/df['c']) / pi)
+    df.loc[df['dt'] > 0, "xangle"] = - df['xangle']
+    return df
+
+
+@pytest.fixture(params=["numba", "python"])
+def indicators(request, monkeypatch):
+    """ custom_indicators with the kernels compiled by numba, or run by the jit fallback """
+    if request.param == "numba":
+        pytest.importorskip("numba")
+        return custom_indicators
+    monkeypatch.setitem(sys.modules, "numba", None)
+    monkeypatch.delitem(sys.modules, "utilities.jit")
+    monkeypatch.delitem(sys.modules, "utilities.custom_indicators")
+    module = importlib.import_module("utilities.custom_indicators")
+    assert not hasattr(module._supertrend_kernel, "py_func")
+    return module
+
+
+@pytest.fixture(params=[0, 30])
+def ohlc(request):
+    """ Random OHLC candles indexed by date, the first rows (warm-up) are NaN """
+    rng = np.random.default_rng(request.param)
+    length = 600
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    open_ = np.concatenate([[100], close[:-1]])
+    df = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, length)),
+        "low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, length)),
+        "close": close,
+    }, index=pd.date_range("2022-01-01", periods=length, freq="1h"))
+    df.iloc[:request.param] = np.nan
+    return df
+
+
+def test_heikin_ashi(indicators, ohlc):
+    expected = heikin_ashi_reference(ohlc.reset_index(drop=True))
+    result = indicators.heikinAshiDf(ohlc.copy())
+    for column in ["HA_Close", "HA_Open", "HA_High", "HA_Low"]:
+        np.testing.assert_allclose(result[column].to_numpy(), expected[column].to_numpy(), rtol=1e-12)
+
+
+def test_supertrend(indicators, ohlc):
+    expected = supertrend_reference(*(ohlc[column].reset_index(drop=True) for column in ["high", "low", "close"]))
+    result = indicators.SuperTrend(ohlc["high"], ohlc["low"], ohlc["close"])
+    assert result.st.index.equals(ohlc.index)
+    np.testing.assert_array_equal(result.super_trend_direction().to_numpy(), expected["Supertrend"].to_numpy())
+    np.testing.assert_allclose(result.super_trend_upper().to_numpy(), expected["Final Upperband"].to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(result.super_trend_lower().to_numpy(), expected["Final Lowerband"].to_numpy(), rtol=1e-12)
+
+
+def test_ma_slope(indicators, ohlc):
+    expected = ma_slope_reference(*(ohlc[column].reset_index(drop=True) for column in ["close", "high", "low"]))
+    result = indicators.MaSlope(ohlc["close"], ohlc["high"], ohlc["low"])
+    np.testing.assert_allclose(result.ma_line().to_numpy(), expected["ma"].to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(result.x_angle().to_numpy(), expected["xangle"].to_numpy())
@@ -0,0 +1,137 @@
+import asyncio
+
+import ccxt.async_support as ccxt
+import pytest
+
+from utilities import data_manager
+from utilities.data_manager import ExchangeDataManager, TooManyError
+
+HOUR_MS = 3600000
+
+
+class FakeExchange:
+    """ ccxt like exchange serving 1h candles, with a few milliseconds of latency per request """
+
+    rateLimit = 0.001
+
+    def __init__(self, delay=0.005, bad_symbols=(), bad_since=(), failing=False):
+        self.delay = delay
+        self.bad_symbols = bad_symbols
+        self.bad_since = bad_since
+        self.failing = failing
+        self.closed = False
+        self.calls = 0
+        self.calls_after_close = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def load_markets(self):
+        return {}
+
+    async def close(self):
+        self.closed = True
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls += 1
+        self.calls_after_close += self.closed
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if symbol in self.bad_symbols or since in self.bad_since:
+                raise ccxt.BadRequest(symbol)
+            if self.failing:
+                raise ccxt.NetworkError("timeout")
+            return [[since + i * HOUR_MS, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(limit)]
+        finally:
+            self.in_flight -= 1
+
+
+def make_manager(tmp_path, exchange, max_concurrent_requests=2):
+    manager = ExchangeDataManager("binance", path_download=str(tmp_path))
+    manager.exchange = exchange
+    manager.exchange_dict = dict(
+        manager.exchange_dict, limit_size_request=10, max_concurrent_requests=max_concurrent_requests)
+    return manager
+
+
+def test_requests_are_bounded_per_exchange(tmp_path):
+    exchange = FakeExchange()
+    manager = make_manager(tmp_path, exchange)
+    asyncio.run(manager.download_data(
+        ["BTC/USDT", "ETH/USDT"], ["1h"],
+        start_date="2022-01-01 00:00:00", end_date="2022-01-11 00:00:00", fill_gaps=False, max_jobs=4,
+    ))
+    # 24 requests of 10 candles per pair, at most 2 of them in flight on the exchange
+    assert exchange.calls == 2 * 25
+    assert exchange.max_in_flight == 2
+    assert exchange.closed
+    df = manager.load_data("BTC/USDT", "1h")
+    # the last request may return candles after the end date, as an exchange does
+    assert len(df) >= 241
+    assert df.index.is_unique
+    assert (df.index.to_series().diff().dropna() == "1h").all()
+
+
+def test_retries_with_backoff_then_too_many_error(tmp_path, monkeypatch):
+    exchange = FakeExchange(failing=True)
+    manager = make_manager(tmp_path, exchange)
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record_sleep(delay, *args):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(data_manager.random, "uniform", lambda a, b: 1)
+    monkeypatch.setattr(data_manager.asyncio, "sleep", record_sleep)
+    with pytest.raises(TooManyError):
+        asyncio.run(manager.download_tf("BTC/USDT", "1h", 0, max_retries=6))
+    assert exchange.calls == 6
+    assert [delay for delay in delays if delay >= 1] == [1, 2, 4, 8, 16]
+
+
+def test_failed_job_cancels_the_others_before_closing(tmp_path):
+    exchange = FakeExchange(bad_symbols=("BAD/USDT",))
+    manager = make_manager(tmp_path, exchange)
+
+    async def download():
+        with pytest.raises(ccxt.BadRequest):
+            await manager.download_data(
+                ["BTC/USDT", "BAD/USDT", "ETH/USDT"], ["1h"],
+                start_date="2022-01-01 00:00:00", end_date="2022-03-01 00:00:00", fill_gaps=False,
+            )
+        assert exchange.closed
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        rows = manager.store.get_meta("BTC/USDT", "1h")["rows"]
+        await asyncio.sleep(0.1)
+        # nothing keeps requesting or writing once the call has returned
+        assert manager.store.get_meta("BTC/USDT", "1h")["rows"] == rows
+        assert exchange.calls_after_close == 0
+
+    asyncio.run(download())
+
+
+def test_backfill_merges_each_chunk_and_resumes(tmp_path):
+    exchange = FakeExchange(bad_since=(60 * HOUR_MS,))
+    manager = make_manager(tmp_path, exchange)
+    hours = list(range(10)) + list(range(110, 120))
+    manager.store.write("BTC/USDT", "1h", [[h * HOUR_MS, 1.0, 2.0, 0.5, 1.5, 10.0] for h in hours])
+    assert manager.store.get_meta("BTC/USDT", "1h")["gaps"] == [[10 * HOUR_MS, 109 * HOUR_MS]]
+
+    # the 6th chunk of the gap fails: the 5 chunks before it are already stored
+    with pytest.raises(ccxt.BadRequest):
+        asyncio.run(manager.backfill_gaps("BTC/USDT", "1h"))
+    meta = manager.store.get_meta("BTC/USDT", "1h")
+    assert meta["rows"] == 70
+    assert meta["gaps"] == [[60 * HOUR_MS, 109 * HOUR_MS]]
+    assert meta["checked_gaps"] == []
+
+    exchange.bad_since = ()
+    exchange.calls = 0
+    assert asyncio.run(manager.backfill_gaps("BTC/USDT", "1h")) == 50
+    assert exchange.calls == 5
+    meta = manager.store.get_meta("BTC/USDT", "1h")
+    assert meta["rows"] == 120
+    assert meta["gaps"] == []
+    assert asyncio.run(manager.backfill_gaps("BTC/USDT", "1h")) == 0
@@ -0,0 +1,65 @@
+import importlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utilities.custom_indicators import SuperTrend
+from utilities.indicator_cache import IndicatorCache
+
+
+def make_ohlc(length=200, seed=0):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, length))),
+                      index=pd.date_range("2022-01-01", periods=length, freq="1h"))
+    return close * 1.01, close * 0.99, close
+
+
+def test_objects_are_not_shared():
+    cache = IndicatorCache()
+    high, low, close = make_ohlc()
+    first = cache(SuperTrend, high, low, close, 10, 3)
+    expected = first.super_trend_upper().copy()
+    first.st["Final Upperband"] = 0.0
+    first.atr_window = 0
+    second = cache(SuperTrend, high, low, close, 10, 3)
+    assert cache.stats()["hits"] == 1
+    assert second is not first
+    assert second.atr_window == 10
+    pd.testing.assert_series_equal(second.super_trend_upper(), expected)
+
+
+def test_base_class_change_invalidates():
+    class Base:
+        def value(self):
+            return 1
+
+    class Indicator(Base):
+        def __init__(self, close):
+            self.result = close * self.value()
+
+    cache = IndicatorCache()
+    key = cache.key(Indicator, 1.0)
+
+    def value(self):
+        return 2
+    Base.value = value
+    assert cache.key(Indicator, 1.0) != key
+
+
+def test_module_source_change_invalidates(tmp_path, monkeypatch):
+    module_file = tmp_path / "cached_indicator.py"
+    module_file.write_text("def helper(x):\n    return x + 1\n\n\ndef indicator(x):\n    return helper(x)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = importlib.import_module("cached_indicator")
+    try:
+        cache = IndicatorCache()
+        key = cache.key(module.indicator, 1)
+        assert cache.key(module.indicator, 1) == key
+        module_file.write_text("def helper(x):\n    return x + 2\n\n\ndef indicator(x):\n    return helper(x)\n")
+        stat = os.stat(module_file)
+        os.utime(module_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert cache.key(module.indicator, 1) != key
+    finally:
+        del sys.modules["cached_indicator"]
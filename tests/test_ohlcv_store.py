@@ -0,0 +1,33 @@
+import pandas as pd
+
+from utilities.ohlcv_store import OhlcvStore
+
+INTERVALS = {
+    "1h": {"interval_ms": 3600000},
+    "1M": {"interval_ms": 2629746000},
+}
+
+
+def to_ms(dates):
+    return OhlcvStore.to_ms(pd.DatetimeIndex(dates))
+
+
+def test_find_gaps_hours(tmp_path):
+    store = OhlcvStore(str(tmp_path), INTERVALS)
+    dates = to_ms(pd.date_range("2022-01-01", periods=10, freq="1h").delete([3, 4, 7]))
+    assert store.find_gaps(dates, "1h") == [
+        to_ms(["2022-01-01 03:00", "2022-01-01 04:00"]).tolist(),
+        to_ms(["2022-01-01 07:00", "2022-01-01 07:00"]).tolist(),
+    ]
+
+
+def test_find_gaps_months(tmp_path):
+    store = OhlcvStore(str(tmp_path), INTERVALS)
+    months = pd.date_range("2021-12-01", "2022-12-01", freq="MS")
+    assert store.find_gaps(to_ms(months), "1M") == []
+    # february is missing: january to march is only 59 days
+    dates = to_ms(months[months != "2022-02-01"])
+    assert store.find_gaps(dates, "1M") == [to_ms(["2022-02-01", "2022-02-01"]).tolist()]
+    # july and august are missing
+    dates = to_ms(months[~months.isin(pd.to_datetime(["2022-07-01", "2022-08-01"]))])
+    assert store.find_gaps(dates, "1M") == [to_ms(["2022-07-01", "2022-08-01"]).tolist()]
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.backtest_engine import run_multi_asset_backtest
+from utilities.backtesting import compute_backtest_metrics
+from utilities.online_metrics import OnlineMetrics
+
+SIGNAL_COLUMNS = ["open_long_market", "close_long_market", "open_short_market", "close_short_market"]
+
+
+def multi_asset_result(seed=1):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2021-01-01", periods=2000, freq="1h")
+    df_list = {}
+    for k in range(4):
+        df = pd.DataFrame({"close": 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))}, index=index)
+        for column in SIGNAL_COLUMNS:
+            df[column] = rng.random(len(index)) < 0.05
+        df_list[f"P{k}/USDT"] = df
+    return run_multi_asset_backtest(df_list, 0.2, "P0/USDT", leverage=2)
+
+
+def stream(trades, days, **kwargs):
+    online = OnlineMetrics(**kwargs)
+    for day in days.to_dict("records"):
+        online.update_day(**day)
+    for trade in trades.to_dict("records"):
+        online.update_trade(trade)
+    return online.metrics()
+
+
+def assert_same_metrics(online, batch):
+    batch = {key: value for key, value in batch.items() if key not in ("trades_columns", "days_columns")}
+    assert set(online) == set(batch)
+    for key, expected in batch.items():
+        value = online[key]
+        if key == "pairs":
+            pd.testing.assert_frame_equal(value.loc[expected.index], expected, check_dtype=False, rtol=1e-9)
+        elif isinstance(expected, (float, np.floating)):
+            assert (math.isnan(value) and math.isnan(expected)) or value == pytest.approx(expected, rel=1e-9), key
+        elif expected is pd.NaT:
+            assert value is pd.NaT, key
+        else:
+            assert value == expected, key
+
+
+@pytest.mark.parametrize("indepedant_trade", [True, False])
+def test_online_metrics_match_batch(indepedant_trade):
+    result = multi_asset_result()
+    trades, days = result["trades"], result["days"]
+    assert_same_metrics(
+        stream(trades, days, indepedant_trade=indepedant_trade),
+        compute_backtest_metrics(trades, days, indepedant_trade=indepedant_trade),
+    )
+
+
+def test_online_metrics_without_drawdown_or_exposition():
+    # a wallet that never draws down has an infinite calmar ratio, no exposition or risk columns
+    day = pd.date_range("2021-01-01", periods=30, freq="1D")
+    days = pd.DataFrame({"day": day, "wallet": np.linspace(1000, 1300, 30), "price": 1.0}, index=day)
+    trades = pd.DataFrame({
+        "open_date": pd.Series(dtype="datetime64[ns]"),
+        "close_date": pd.Series(dtype="datetime64[ns]"),
+    } | {
+        column: pd.Series(dtype=float)
+        for column in ["open_fee", "close_fee", "open_trade_size", "close_trade_size", "wallet"]
+    })
+    online = stream(trades, days)
+    batch = compute_backtest_metrics(trades, days)
+    assert online["calmar_ratio"] == math.inf
+    assert "mean_exposition" not in online and "max_risk" not in online
+    assert_same_metrics(online, batch)
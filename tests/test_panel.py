@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from utilities.panel import align_pairs
+
+
+def test_align_pairs():
+    index = pd.date_range("2022-01-01", periods=5, freq="1h")
+    df_list = {
+        "BTC/USDT": pd.DataFrame({"close": [1.0, 2, 3, 4, 5], "signal": True}, index=index),
+        "ETH/USDT": pd.DataFrame({"close": [10.0, 30], "signal": True}, index=index[[1, 3]]),
+    }
+    aligned_index, pairs, panel, valid = align_pairs(df_list, ["close", "signal"])
+    assert aligned_index.equals(index)
+    assert pairs == ["BTC/USDT", "ETH/USDT"]
+    np.testing.assert_array_equal(panel["close"][:, 1], [np.nan, 10, np.nan, 30, np.nan])
+    np.testing.assert_array_equal(panel["signal"][:, 1], [False, True, False, True, False])
+    np.testing.assert_array_equal(valid[:, 0], True)
+    np.testing.assert_array_equal(valid[:, 1], [False, True, False, True, False])
@@ -0,0 +1,51 @@
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from utilities import parameter_sweep
+from utilities.parameter_sweep import run_sweep
+
+
+def make_frame():
+    index = pd.date_range("2022-03-26", periods=72, freq="1h", tz="Europe/Paris", name="date")
+    rng = np.random.default_rng(0)
+    close = 100 + rng.normal(0, 1, len(index)).cumsum()
+    return pd.DataFrame({
+        "close": close,
+        "volume": rng.integers(0, 1000, len(index)),
+        "signal": close > 100,
+        "pair": "BTC/USDT",
+        "timestamp": index.tz_convert("UTC"),
+    }, index=index)
+
+
+def check_frame(df, expected, scale):
+    pd.testing.assert_frame_equal(df, expected, check_freq=False)
+    df["close"] *= scale
+    return {"close": df["close"].iloc[-1], "pair": df["pair"].iloc[0]}
+
+
+def test_shared_frame_round_trip():
+    df = make_frame()
+    shm, spec = parameter_sweep._share_frame(df)
+    try:
+        parameter_sweep._init_worker(spec)
+        pd.testing.assert_frame_equal(parameter_sweep._shared_frame(), df, check_freq=False)
+        # every call gives a private copy
+        copy = parameter_sweep._shared_frame()
+        copy["close"] *= 2
+        pd.testing.assert_frame_equal(parameter_sweep._shared_frame(), df, check_freq=False)
+    finally:
+        parameter_sweep._shared.pop("shm").close()
+        shm.unlink()
+
+
+def test_sweep_spawn_with_tz_index_and_object_columns():
+    df = make_frame()
+    parameters = [{"expected": df, "scale": scale} for scale in [1, 2, 3]]
+    result = run_sweep(
+        check_frame, df, parameters, max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+    assert "error" not in result
+    assert result["pair"].tolist() == ["BTC/USDT"] * 3
+    np.testing.assert_allclose(result["close"], df["close"].iloc[-1] * np.array([1, 2, 3]))
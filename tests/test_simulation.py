@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.backtest_engine import run_single_asset_backtest, score_backtest
+from utilities.simulation import backtest_paths, generate_fake_data, path_frame
+
+
+class MaCross:
+    def __init__(self, df, fast=10, slow=50):
+        self.df = df
+        self.fast = fast
+        self.slow = slow
+
+    def populate_indicators(self):
+        self.df["fast"] = self.df["close"].rolling(self.fast).mean()
+        self.df["slow"] = self.df["close"].rolling(self.slow).mean()
+
+    def populate_buy_sell(self):
+        up = self.df["fast"] > self.df["slow"]
+        self.df["open_long_market"] = up
+        self.df["close_long_market"] = ~up
+        self.df["open_short_market"] = False
+        self.df["close_short_market"] = False
+
+
+def make_paths(n_paths=12, length=500):
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+    open_ = np.r_[close[0], close[:-1]]
+    df = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * 1.004,
+        "low": np.minimum(open_, close) * 0.996,
+        "close": close,
+    }, index=pd.date_range("2022-01-01", periods=length, freq="1h"))
+    return generate_fake_data(df, 365 * 24, n_paths, seed=3)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_backtest_paths_matches_path_by_path(max_workers):
+    paths = make_paths()
+    params = {"fast": 5, "slow": 20}
+    scores = backtest_paths(paths, MaCross, params, backtest_kwargs={"leverage": 2}, max_workers=max_workers)
+
+    expected = []
+    for i in range(len(paths["close"])):
+        strategy = MaCross(df=path_frame(paths, i), **params)
+        strategy.populate_indicators()
+        strategy.populate_buy_sell()
+        result = run_single_asset_backtest(strategy.df, return_type="arrays", leverage=2)
+        expected.append({"wallet": result["wallet"]} | score_backtest(result["equity"], result["trade_results"])._asdict())
+    pd.testing.assert_frame_equal(scores, pd.DataFrame(expected), check_dtype=False)
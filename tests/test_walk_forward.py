@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from utilities.backtest_engine import run_single_asset_backtest
+from utilities.walk_forward import run_walk_forward
+
+
+def make_ohlcv(days=60, seed=0):
+    index = pd.date_range("2022-01-01", periods=days * 24, freq="1h")
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * 1.001,
+        "low": np.minimum(open_, close) * 0.999,
+        "close": close,
+        "volume": 1.0,
+    }, index=index)
+
+
+class PeriodicStrat:
+    """ Opens a long every `every` candles and closes it on the next one, until last_signal """
+
+    last_signal = pd.Timestamp("2022-02-10")
+
+    def __init__(self, df, every=12, fail_without_trade=False):
+        self.df = df
+        self.every = every
+        self.fail_without_trade = fail_without_trade
+
+    def populate_indicators(self):
+        pass
+
+    def populate_buy_sell(self):
+        row = np.arange(len(self.df))
+        active = self.df.index < self.last_signal
+        self.df["open_long_market"] = (row % self.every == 0) & active
+        self.df["close_long_market"] = (row % self.every == 1) & active
+        self.df["open_short_market"] = False
+        self.df["close_short_market"] = False
+
+    def run_backtest(self, initial_wallet=1000):
+        result = run_single_asset_backtest(self.df, initial_wallet)
+        if len(result["trades"]) == 0:
+            if self.fail_without_trade:
+                raise ValueError("no trades")
+            print("!!! No trades")
+            return None
+        return result | {"total_trades": len(result["trades"])}
+
+
+def test_empty_out_of_sample_folds_are_flat():
+    result = run_walk_forward(
+        PeriodicStrat, make_ohlcv(), {"every": [12, 24]},
+        train="20D", test="10D", score="total_trades", max_workers=1,
+    )
+    folds = result["folds"]
+    # out-of-sample windows from day 20 to 60 by 10 days, no signal after day 40
+    assert folds["fold"].tolist() == [0, 1, 2, 3]
+    assert folds["skipped"].tolist() == [False, False, True, True]
+    assert (folds["trades"].iloc[:2] > 0).all()
+    assert (folds["trades"].iloc[2:] == 0).all()
+    assert (folds["wallet"].iloc[2:] == folds["wallet"].iloc[1]).all()
+    assert result["wallet"] == folds["wallet"].iloc[1]
+    assert set(result["trades"]["fold"]) == {0, 1}
+
+
+def test_failed_out_of_sample_folds_are_flat():
+    result = run_walk_forward(
+        PeriodicStrat, make_ohlcv(), {"every": [12], "fail_without_trade": [True]},
+        train="20D", test="10D", score="total_trades", max_workers=1,
+    )
+    folds = result["folds"]
+    assert len(folds) == 4
+    assert folds["skipped"].tolist() == [False, False, True, True]
+    assert result["wallet"] == folds["wallet"].iloc[1]
@@ -0,0 +1,394 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.panel import align_pairs
+
+
+TRADES_COLUMNS = [
+    "open_date",
+    "close_date",
+    "position",
+    "open_reason",
+    "close_reason",
+    "open_price",
+    "close_price",
+    "open_fee",
+    "close_fee",
+    "open_trade_size",
+    "close_trade_size",
+    "wallet",
+]
+
+
+def scan_market_positions(open_long, close_long, open_short, close_short):
+    """ Position state machine of the market signal strategies
+
+        Same rules as the notebooks run_backtest loops: when flat, open on the first
+        open_long (priority) or open_short row; when in position, close on the first
+        close row of the same side strictly after the opening row; never reopen on
+        the closing row. The scan jumps from event to event with binary searches, so
+        it costs O(trades * log(rows)) instead of one Python iteration per row.
+
+        Args:
+            open_long, close_long, open_short, close_short (np.ndarray): boolean signals
+
+        Returns:
+            tuple of np.ndarray: open rows, close rows (len(signals) if still open), sides (1 long, -1 short)
+    """
+    size = len(open_long)
+    open_rows = np.flatnonzero(open_long | open_short)
+    close_rows = {1: np.flatnonzero(close_long), -1: np.flatnonzero(close_short)}
+    opens, closes, sides = [], [], []
+    row = 0
+    while True:
+        k = np.searchsorted(open_rows, row)
+        if k == len(open_rows):
+            break
+        open_row = open_rows[k]
+        side = 1 if open_long[open_row] else -1
+        candidates = close_rows[side]
+        k = np.searchsorted(candidates, open_row + 1)
+        close_row = candidates[k] if k < len(candidates) else size
+        opens.append(open_row)
+        closes.append(close_row)
+        sides.append(side)
+        if close_row == size:
+            break
+        row = close_row + 1
+    return (
+        np.array(opens, dtype=np.int64),
+        np.array(closes, dtype=np.int64),
+        np.array(sides, dtype=np.int64),
+    )
+
+
+def run_single_asset_backtest(df, initial_wallet=1000, leverage=1, fee=0.0007, return_type="frames"):
+    """ Vectorized replacement of the single asset run_backtest loops
+
+        Consumes the open_long_market, close_long_market, open_short_market and
+        close_short_market columns of a populated strategy dataframe. Orders are
+        filled at the close price and pay the fee (taker) on open and close. A
+        position still open at the end is not part of the trades.
+
+        Args:
+            df (pd.DataFrame): dataframe indexed by date with 'close' and the signal columns
+            initial_wallet (float): starting wallet
+            leverage (float): multiplier applied to each trade result
+            fee (float): fee rate paid on each order
+            return_type (str): "frames", or "arrays" to skip the dataframes (see score_backtest)
+
+        Returns:
+            dict: wallet (final wallet), trades and days dataframes as expected by
+            basic_single_asset_backtest, or with "arrays": wallet, equity (daily wallet)
+            and trade_results (result of each trade in % of its size, fees included)
+    """
+    close = df["close"].to_numpy(dtype=float)
+    signals = [
+        df[column].to_numpy(dtype=bool)
+        for column in ["open_long_market", "close_long_market", "open_short_market", "close_short_market"]
+    ]
+    opens, closes, sides = scan_market_positions(*signals)
+    closed = closes < len(close)
+
+    # -- Wallet after each order, as a product of per-trade factors --
+    open_price = close[opens]
+    close_price = close[closes[closed]]
+    trade_result = sides[closed] * (close_price - open_price[closed]) / open_price[closed] * leverage
+    factors = (1 - fee) * (1 + trade_result) * (1 - fee)
+    # wallet_flat[k]: wallet once the first k trades are closed
+    wallet_flat = initial_wallet * np.concatenate([[1.0], np.cumprod(factors)])
+    wallet_before = wallet_flat[:len(opens)]
+    open_fee = wallet_before * fee
+    open_size = wallet_before - open_fee
+    close_gross = open_size[closed] * (1 + trade_result)
+    close_fee = close_gross * fee
+    close_size = close_gross - close_fee
+
+    if len(opens) and not closed[-1]:
+        wallet = open_size[-1]
+    elif len(close_size):
+        wallet = close_size[-1]
+    else:
+        wallet = initial_wallet
+
+    # -- Daily report on the first row of each day, before any order of that row --
+    index = df.index
+    day_of_month = index.day.to_numpy()
+    report_rows = np.flatnonzero(np.r_[True, day_of_month[1:] != day_of_month[:-1]])
+    trade = np.searchsorted(opens, report_rows, side="left") - 1
+    active = trade >= 0
+    active[active] = report_rows[active] <= closes[trade[active]]
+    report_wallet = wallet_flat[np.searchsorted(closes[closed], report_rows, side="left")]
+    if active.any():
+        t = trade[active]
+        mark = sides[t] * (close[report_rows[active]] - open_price[t]) / open_price[t] * leverage
+        report_wallet[active] = open_size[t] * (1 + mark) * (1 - fee)
+
+    if return_type == "arrays":
+        trade_results = (close_size - open_size[closed] - open_fee[closed] - close_fee) / open_size[closed]
+        return {"wallet": wallet, "equity": report_wallet, "trade_results": trade_results}
+
+    dates = index.to_numpy()
+    df_trades = pd.DataFrame(
+        {
+            "open_date": dates[opens[closed]],
+            "close_date": dates[closes[closed]],
+            "position": np.where(sides[closed] == 1, "LONG", "SHORT"),
+            "open_reason": "Market",
+            "close_reason": "Market",
+            "open_price": open_price[closed],
+            "close_price": close_price,
+            "open_fee": open_fee[closed],
+            "close_fee": close_fee,
+            "open_trade_size": open_size[closed],
+            "close_trade_size": close_size,
+            "wallet": close_size,
+        },
+        columns=TRADES_COLUMNS,
+    )
+    df_trades = df_trades.set_index(df_trades["open_date"])
+
+    df_days = pd.DataFrame(
+        {
+            "day": index[report_rows].normalize(),
+            "wallet": report_wallet,
+            "price": close[report_rows],
+        }
+    )
+    df_days = df_days.set_index(df_days["day"])
+
+    return {"wallet": wallet, "trades": df_trades, "days": df_days}
+
+
+def run_multi_asset_backtest(
+    df_list,
+    wallet_exposure,
+    oldest_pair=None,
+    initial_wallet=1000,
+    leverage=1,
+    fee=0.0007,
+    max_var=0,
+    value_at_risk=None,
+    var_window=1000,
+    var_update_every=1,
+    return_type="frames",
+):
+    """ Array based replacement of the multi_division run_backtest loops
+
+        Every pair of df_list must have 'close' and the open/close long/short market
+        columns. The pairs are aligned once in (time x pair) arrays and the wallet,
+        positions and expositions live in preallocated arrays, so each bar only costs
+        a few vectorized operations over the pairs instead of .loc lookups in dicts.
+
+        Same rules as the notebooks: on each bar, positions with a close signal are
+        closed first, then new positions are opened (longs, then shorts) if the pair
+        has no position, the side exposition stays <= 1 and, when max_var != 0, the
+        value at risk of the new portfolio stays <= max_var.
+
+        Args:
+            df_list (dict): pair -> populated dataframe indexed by date
+            wallet_exposure (dict or float): part of the wallet used by each position of a pair
+            oldest_pair (str): pair whose dates drive the backtest (default: union of every date)
+            initial_wallet (float): starting wallet
+            leverage (float): multiplier applied to the position size
+            fee (float): fee rate paid on each order
+            max_var (float): maximum value at risk in % of the wallet, 0 to disable
+            value_at_risk: object with update_cov(current_date, occurance_data) and
+                get_var_array(exposures) methods, exposures being the (pair x 2) long and short
+                expositions in the order of df_list (ex: value_at_risk.ValueAtRisk built on
+                the same df_list), required if max_var != 0
+            var_window (int): number of closes in the covariance window, given to
+                update_cov as occurance_data
+            var_update_every (int): the covariance is updated every var_update_every bars,
+                1 updates it on every bar (the notebooks update it every 1001 bars)
+            return_type (str): "frames", or "arrays" to skip the dataframes (see score_backtest)
+
+        Returns:
+            dict: wallet (final wallet), trades and days dataframes as expected by
+            complete_multi_asset_backtest, or with "arrays": wallet, equity (daily wallet)
+            and trade_results (result of each trade in % of its size, fees included)
+    """
+    signal_columns = ["open_long_market", "close_long_market", "open_short_market", "close_short_market"]
+    index = df_list[oldest_pair].index if oldest_pair is not None else None
+    index, pairs, panel, valid = align_pairs(df_list, ["close"] + signal_columns, index)
+    close = panel["close"]
+    # last known price of each pair, for the daily mark to market
+    mark_close = pd.DataFrame(close).ffill().to_numpy()
+    open_long, close_long, open_short, close_short = (panel[column] for column in signal_columns)
+    if oldest_pair is not None:
+        price = close[:, pairs.index(oldest_pair)]
+    else:
+        price = np.nanmean(mark_close, axis=1)
+
+    if isinstance(wallet_exposure, dict):
+        exposure = np.array([wallet_exposure[pair] for pair in pairs], dtype=float)
+    else:
+        exposure = np.full(len(pairs), float(wallet_exposure))
+
+    # -- Portfolio state --
+    wallet = initial_wallet
+    side = np.zeros(len(pairs), dtype=np.int64)
+    size = np.zeros(len(pairs))
+    entry_price = np.zeros(len(pairs))
+    entry_fee = np.zeros(len(pairs))
+    entry_row = np.zeros(len(pairs), dtype=np.int64)
+    positions_exposure = np.zeros((len(pairs), 2))
+    side_exposition = {1: 0.0, -1: 0.0}
+    trades = []
+    days = []
+
+    day_of_month = index.day.to_numpy()
+    report = np.r_[True, day_of_month[1:] != day_of_month[:-1]]
+    var_counter = 0
+
+    for t in range(len(index)):
+        if max_var != 0:
+            if var_counter == 0:
+                value_at_risk.update_cov(current_date=index[t], occurance_data=var_window)
+                var_counter = var_update_every
+            var_counter -= 1
+
+        # -- Add daily report --
+        if report[t]:
+            held = np.flatnonzero(side)
+            trade_result = side[held] * (mark_close[t, held] - entry_price[held]) / entry_price[held]
+            close_size = size[held] * (1 + trade_result)
+            temp_wallet = wallet + np.sum(close_size - size[held] - close_size * fee)
+            risk = value_at_risk.get_var_array(positions_exposure) if max_var != 0 else 0
+            days.append((t, temp_wallet, side_exposition[1], side_exposition[-1], risk))
+
+        # -- Close positions --
+        for position_side, signal in ((1, close_long), (-1, close_short)):
+            for j in np.flatnonzero((side == position_side) & signal[t]):
+                close_price = close[t, j]
+                trade_result = position_side * (close_price - entry_price[j]) / entry_price[j]
+                close_size = size[j] + size[j] * trade_result
+                close_fee = close_size * fee
+                wallet += close_size - size[j] - close_fee
+                side_exposition[position_side] -= exposure[j]
+                positions_exposure[j, 0 if position_side == 1 else 1] -= exposure[j]
+                trades.append((
+                    j, entry_row[j], t, position_side, entry_price[j], close_price,
+                    entry_fee[j], close_fee, size[j], close_size, wallet,
+                ))
+                side[j] = 0
+
+        # -- Open positions --
+        for position_side, signal in ((1, open_long), (-1, open_short)):
+            column = 0 if position_side == 1 else 1
+            for j in np.flatnonzero(signal[t] & (side == 0)):
+                if side_exposition[position_side] + exposure[j] > 1:
+                    continue
+                if max_var != 0:
+                    new_positions = positions_exposure.copy()
+                    new_positions[j, column] += exposure[j]
+                    if value_at_risk.get_var_array(new_positions) > max_var:
+                        continue
+                position_size = wallet * exposure[j] * leverage
+                side_exposition[position_side] += exposure[j]
+                positions_exposure[j, column] += exposure[j]
+                open_fee = position_size * fee
+                wallet -= open_fee
+                side[j] = position_side
+                size[j] = position_size - open_fee
+                entry_price[j] = close[t, j]
+                entry_fee[j] = open_fee
+                entry_row[j] = t
+
+    trades = np.array(trades, dtype=float).reshape(-1, 11)
+    days = np.array(days, dtype=float).reshape(-1, 5)
+    if return_type == "arrays":
+        trade_results = (trades[:, 9] - trades[:, 8] - trades[:, 6] - trades[:, 7]) / trades[:, 8]
+        return {"wallet": wallet, "equity": days[:, 1], "trade_results": trade_results}
+
+    dates = index.to_numpy()
+    pair_index, open_rows, close_rows = (trades[:, k].astype(np.int64) for k in range(3))
+    df_trades = pd.DataFrame(
+        {
+            "pair": np.array(pairs, dtype=object)[pair_index],
+            "open_date": dates[open_rows],
+            "close_date": dates[close_rows],
+            "position": np.where(trades[:, 3] == 1, "LONG", "SHORT"),
+            "open_reason": "Market",
+            "close_reason": "Market",
+            "open_price": trades[:, 4],
+            "close_price": trades[:, 5],
+            "open_fee": trades[:, 6],
+            "close_fee": trades[:, 7],
+            "open_trade_size": trades[:, 8],
+            "close_trade_size": trades[:, 9],
+            "wallet": trades[:, 10],
+        },
+        columns=["pair"] + TRADES_COLUMNS,
+    )
+    df_trades = df_trades.set_index(df_trades["open_date"])
+
+    report_rows = days[:, 0].astype(np.int64)
+    df_days = pd.DataFrame(
+        {
+            "day": index[report_rows].normalize(),
+            "wallet": days[:, 1],
+            "price": price[report_rows],
+            "long_exposition": days[:, 2],
+            "short_exposition": days[:, 3],
+            "risk": days[:, 4],
+        }
+    )
+    df_days = df_days.set_index(df_days["day"])
+
+    return {"wallet": wallet, "trades": df_trades, "days": df_days}
+
+
+class BacktestScore(NamedTuple):
+    sharpe_ratio: float
+    sortino_ratio: float
+    calmar_ratio: float
+    max_drawdown: float
+    win_rate: float
+    total_trades: int
+
+
+def score_backtest(equity, trade_results=None, periods_per_year=365):
+    """ Lean scoring for optimizers, straight from numpy arrays
+
+        Same formulas as complete_multi_asset_backtest (sharpe, sortino and calmar on the
+        daily wallet returns) without building, copying or printing any dataframe.
+
+        Args:
+            equity (np.ndarray): wallet at each period (the days wallet)
+            trade_results (np.ndarray): result of each trade, only its sign is used for the win rate
+            periods_per_year (int): number of equity points per year
+
+        Returns:
+            BacktestScore: sharpe_ratio, sortino_ratio, calmar_ratio, max_drawdown (fraction
+            of the wallet ATH, 0.25 for -25%), win_rate and total_trades
+    """
+    equity = np.asarray(equity, dtype=float)
+    returns = np.diff(equity) / equity[:-1] if len(equity) > 1 else np.empty(0)
+    returns = returns[~np.isnan(returns)]
+    downside = returns[returns < 0]
+    wallet_ath = np.fmax.accumulate(equity) if len(equity) else equity
+    drawdown = (wallet_ath - equity) / wallet_ath
+    drawdown = drawdown[~np.isnan(drawdown)]
+
+    mean_return = returns.mean() if len(returns) else np.nan
+    std_return = returns.std(ddof=1) if len(returns) > 1 else np.nan
+    std_downside = downside.std(ddof=1) if len(downside) > 1 else np.nan
+    max_drawdown = drawdown.max() if len(drawdown) else np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe_ratio = periods_per_year**0.5 * mean_return / std_return
+        sortino_ratio = periods_per_year**0.5 * mean_return / std_downside
+        calmar_ratio = mean_return * periods_per_year / max_drawdown
+
+    total_trades = 0 if trade_results is None else len(trade_results)
+    win_rate = np.count_nonzero(np.asarray(trade_results) > 0) / total_trades if total_trades else np.nan
+    return BacktestScore(
+        float(sharpe_ratio),
+        float(sortino_ratio),
+        float(calmar_ratio),
+        float(max_drawdown),
+        float(win_rate),
+        total_trades,
+    )
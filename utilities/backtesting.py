@@ -4,139 +4,298 @@ import seaborn as sns
 import datetime
 import numpy as np
 
-def basic_single_asset_backtest(trades, days):
-    df_trades = trades.copy()
-    df_days = days.copy()
-    
-    df_days['evolution'] = df_days['wallet'].diff()
-    df_days['daily_return'] = df_days['evolution']/df_days['wallet'].shift(1)
-    
-    df_trades['trade_result'] = df_trades["close_trade_size"] - df_trades["open_trade_size"] - df_trades["open_fee"]
-    df_trades['trade_result_pct'] = df_trades['trade_result']/df_trades["open_trade_size"]
-    df_trades['trade_result_pct_wallet'] = df_trades['trade_result']/(df_trades["wallet"]+df_trades["trade_result"])
-    
-    df_trades['wallet_ath'] = df_trades['wallet'].cummax()
-    df_trades['drawdown'] = df_trades['wallet_ath'] - df_trades['wallet']
-    df_trades['drawdown_pct'] = df_trades['drawdown'] / df_trades['wallet_ath']
-    df_days['wallet_ath'] = df_days['wallet'].cummax()
-    df_days['drawdown'] = df_days['wallet_ath'] - df_days['wallet']
-    df_days['drawdown_pct'] = df_days['drawdown'] / df_days['wallet_ath']
-    
-    good_trades = df_trades.loc[df_trades['trade_result'] > 0]
-    
-    initial_wallet = df_days.iloc[0]["wallet"]
-    total_trades = len(df_trades)
-    total_good_trades = len(good_trades)
-    avg_profit = df_trades['trade_result_pct'].mean()   
-    global_win_rate = total_good_trades / total_trades
-    max_trades_drawdown = df_trades['drawdown_pct'].max()
-    max_days_drawdown = df_days['drawdown_pct'].max()
-    final_wallet = df_days.iloc[-1]['wallet']
-    buy_and_hold_pct = (df_days.iloc[-1]['price'] - df_days.iloc[0]['price']) / df_days.iloc[0]['price']
-    buy_and_hold_wallet = initial_wallet + initial_wallet * buy_and_hold_pct
-    vs_hold_pct = (final_wallet - buy_and_hold_wallet)/buy_and_hold_wallet
+def _column(df, column):
+    return df[column].to_numpy(dtype=float)
+
+def _drawdown_columns(wallet):
+    wallet_ath = np.fmax.accumulate(wallet) if len(wallet) else wallet
+    drawdown = wallet_ath - wallet
+    return wallet_ath, drawdown, drawdown / wallet_ath
+
+def _nan_stat(function, values, **kwargs):
+    values = values[~np.isnan(values)]
+    if len(values) <= kwargs.get('ddof', 0):
+        return np.nan
+    return function(values, **kwargs)
+
+def _equity_metrics(wallet, periods_per_year=365):
+    evolution = np.full(len(wallet), np.nan)
+    daily_return = np.full(len(wallet), np.nan)
+    if len(wallet) > 1:
+        evolution[1:] = np.diff(wallet)
+        daily_return[1:] = evolution[1:] / wallet[:-1]
+    wallet_ath, drawdown, drawdown_pct = _drawdown_columns(wallet)
+    mean_return = _nan_stat(np.mean, daily_return)
+    max_drawdown = _nan_stat(np.max, drawdown_pct)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = (periods_per_year**0.5)*(mean_return/_nan_stat(np.std, daily_return, ddof=1))
+        sortino_ratio = periods_per_year**0.5 * (mean_return / _nan_stat(np.std, daily_return[daily_return < 0], ddof=1))
+        calmar_ratio = (mean_return*periods_per_year) / max_drawdown
+    return {
+        'evolution': evolution,
+        'daily_return': daily_return,
+        'wallet_ath': wallet_ath,
+        'drawdown': drawdown,
+        'drawdown_pct': drawdown_pct,
+        'sharpe_ratio': sharpe_ratio,
+        'sortino_ratio': sortino_ratio,
+        'calmar_ratio': calmar_ratio,
+        'max_drawdown': max_drawdown,
+        'mean_drawdown': _nan_stat(np.mean, drawdown_pct),
+    }
+
+def _streaks(win_loose):
+    # same as the grouper cumsum: neutral days neither break nor extend a streak
+    streak = np.full(len(win_loose), np.nan)
+    trade_days = np.flatnonzero(win_loose)
+    if len(trade_days):
+        sign = win_loose[trade_days]
+        new_streak = np.r_[True, sign[1:] != sign[:-1]]
+        streak_start = np.flatnonzero(new_streak)[np.cumsum(new_streak) - 1]
+        streak[trade_days] = (np.arange(len(sign)) - streak_start + 1) * sign
+        last_trade_day = np.maximum.accumulate(np.where(np.isnan(streak), -1, np.arange(len(streak))))
+        streak = np.where(last_trade_day >= 0, streak[np.maximum(last_trade_day, 0)], np.nan)
+    return streak
+
+def compute_backtest_metrics(
+    trades,
+    days,
+    close_fee_in_result=False,
+    open_fee_in_base=False,
+    indepedant_trade=True,
+    detailed=True
+):
+    open_trade_size = _column(trades, 'open_trade_size')
+    open_fee = _column(trades, 'open_fee')
+    close_fee = _column(trades, 'close_fee')
+    trade_wallet = _column(trades, 'wallet')
+    trade_result = _column(trades, 'close_trade_size') - open_trade_size - open_fee
+    if close_fee_in_result:
+        trade_result = trade_result - close_fee
+    trade_result_pct = trade_result / (open_trade_size + open_fee if open_fee_in_base else open_trade_size)
+    trade_result_pct_wallet = trade_result / (trade_wallet + trade_result)
+    result_to_use = trade_result_pct if indepedant_trade else trade_result_pct_wallet
+
+    wallet = _column(days, 'wallet')
+    equity = _equity_metrics(wallet)
+    trades_wallet_ath, trades_drawdown, trades_drawdown_pct = _drawdown_columns(trade_wallet)
+
+    total_trades = len(trade_result)
+    good = trade_result > 0
+    bad = trade_result < 0
+    total_good_trades = int(good.sum())
+    initial_wallet = wallet[0] if len(wallet) else np.nan
+    final_wallet = wallet[-1] if len(wallet) else np.nan
     vs_usd_pct = (final_wallet - initial_wallet)/initial_wallet
-    sharpe_ratio = (365**0.5)*(df_days['daily_return'].mean()/df_days['daily_return'].std())
-    total_fees = df_trades['open_fee'].sum() + df_trades['close_fee'].sum()
-    
-    best_trade = df_trades['trade_result_pct'].max()
-    best_trade_date1 =  str(df_trades.loc[df_trades['trade_result_pct'] == best_trade].iloc[0]['open_date'])
-    best_trade_date2 =  str(df_trades.loc[df_trades['trade_result_pct'] == best_trade].iloc[0]['close_date'])
-    worst_trade = df_trades['trade_result_pct'].min()
-    worst_trade_date1 =  str(df_trades.loc[df_trades['trade_result_pct'] == worst_trade].iloc[0]['open_date'])
-    worst_trade_date2 =  str(df_trades.loc[df_trades['trade_result_pct'] == worst_trade].iloc[0]['close_date'])
+    metrics = {
+        'initial_wallet': initial_wallet,
+        'final_wallet': final_wallet,
+        'vs_usd_pct': vs_usd_pct,
+        'sharpe_ratio': equity['sharpe_ratio'],
+        'sortino_ratio': equity['sortino_ratio'],
+        'calmar_ratio': equity['calmar_ratio'],
+        'max_trades_drawdown': _nan_stat(np.max, trades_drawdown_pct),
+        'max_days_drawdown': equity['max_drawdown'],
+        'mean_drawdown': equity['mean_drawdown'],
+        'total_trades': total_trades,
+        'total_good_trades': total_good_trades,
+        'total_bad_trades': int(bad.sum()),
+        'global_win_rate': total_good_trades / total_trades if total_trades else np.nan,
+        'avg_profit': _nan_stat(np.mean, result_to_use),
+    }
+    if not detailed:
+        return metrics
+
+    with np.errstate(invalid='ignore'):
+        win_loose = np.sign(np.nan_to_num(equity['daily_return'])).astype(int)
+    streak = _streaks(win_loose)
+    day = days['day']
+    price = _column(days, 'price') if 'price' in days else np.full(len(days), np.nan)
+    buy_and_hold_pct = (price[-1] - price[0]) / price[0] if len(price) else np.nan
+    buy_and_hold_wallet = initial_wallet + initial_wallet * buy_and_hold_pct
+
+    trades_duration = trades['close_date'] - trades['open_date']
+    pairs = trades['pair'].to_numpy() if 'pair' in trades else None
+
+    metrics |= {
+        'period_start': day.iloc[0] if len(day) else None,
+        'period_end': day.iloc[-1] if len(day) else None,
+        'total_days': len(days),
+        'buy_and_hold_pct': buy_and_hold_pct,
+        'vs_hold_pct': (final_wallet - buy_and_hold_wallet)/buy_and_hold_wallet,
+        'total_fees': np.sum(open_fee) + np.sum(close_fee),
+        'avg_profit_good_trades': _nan_stat(np.mean, result_to_use[good]),
+        'avg_profit_bad_trades': _nan_stat(np.mean, result_to_use[bad]),
+        'mean_trades_duration': trades_duration.mean(),
+        'mean_good_trades_duration': trades_duration[good].mean(),
+        'mean_bad_trades_duration': trades_duration[bad].mean(),
+        'mean_trades_per_days': total_trades/len(days) if len(days) else np.nan,
+        'win_days_number': int((win_loose == 1).sum()),
+        'loose_days_number': int((win_loose == -1).sum()),
+        'neutral_days_number': int((win_loose == 0).sum()),
+    }
+
+    for name, values in [('best_trade', result_to_use), ('worst_trade', -result_to_use)]:
+        row = np.nanargmax(values) if total_trades and not np.isnan(values).all() else None
+        metrics[name] = result_to_use[row] if row is not None else np.nan
+        metrics[name + '_open_date'] = trades['open_date'].iloc[row] if row is not None else None
+        metrics[name + '_close_date'] = trades['close_date'].iloc[row] if row is not None else None
+        metrics[name + '_pair'] = pairs[row] if row is not None and pairs is not None else None
+    for name, values in [('best_day', equity['daily_return']), ('worst_day', -equity['daily_return'])]:
+        row = np.nanargmax(values) if not np.isnan(values).all() else None
+        metrics[name + '_return'] = equity['daily_return'][row] if row is not None else np.nan
+        metrics[name + '_date'] = day.iloc[row] if row is not None else None
+    for name, values in [('best_streak', streak), ('worst_streak', -streak)]:
+        row = np.nanargmax(values) if not np.isnan(values).all() else None
+        metrics[name + '_number'] = streak[row] if row is not None else np.nan
+        metrics[name + '_date'] = day.iloc[row] if row is not None else None
+
+    total_exposition = None
+    if 'long_exposition' in days and 'short_exposition' in days:
+        long_exposition = _column(days, 'long_exposition')
+        short_exposition = _column(days, 'short_exposition')
+        total_exposition = long_exposition + short_exposition
+        metrics |= {
+            'mean_exposition': _nan_stat(np.mean, total_exposition),
+            'max_exposition': _nan_stat(np.max, total_exposition),
+            'max_long_exposition': _nan_stat(np.max, long_exposition),
+            'max_short_exposition': _nan_stat(np.max, short_exposition),
+        }
+    if 'risk' in days:
+        risk = _column(days, 'risk')
+        metrics |= {
+            'max_risk': _nan_stat(np.max, risk),
+            'min_risk': _nan_stat(np.min, risk),
+            'mean_risk': _nan_stat(np.mean, risk),
+        }
+
+    if 'position' in trades:
+        position = trades['position'].to_numpy()
+        for side in ['LONG', 'SHORT']:
+            is_side = position == side
+            side_trades = int(is_side.sum())
+            metrics[side.lower() + '_trades'] = side_trades
+            metrics[side.lower() + '_win_rate'] = int((good & is_side).sum()) / side_trades if side_trades else np.nan
+            metrics[side.lower() + '_average_profit'] = _nan_stat(np.mean, result_to_use[is_side])
+        if 'open_reason' in trades and 'close_reason' in trades:
+            metrics['entries'] = trades.groupby('position')['open_reason'].value_counts().to_dict()
+            metrics['exits'] = trades.groupby('position')['close_reason'].value_counts().to_dict()
+
+    if pairs is not None:
+        pair_result = pd.DataFrame({
+            'pair': pairs,
+            'good': good,
+            'trade_result_pct': trade_result_pct
+        }).groupby('pair', sort=False)
+        df_pairs = pair_result['trade_result_pct'].agg(['size', 'sum', 'mean', 'min', 'max'])
+        df_pairs.columns = ['trades', 'sum_result', 'mean_trade', 'worst_trade', 'best_trade']
+        df_pairs['win_rate'] = pair_result['good'].sum() / df_pairs['trades']
+        metrics['pairs'] = df_pairs
+        metrics['total_pair_traded'] = len(df_pairs)
+
+    metrics['trades_columns'] = {
+        'trade_result': trade_result,
+        'trade_result_pct': trade_result_pct,
+        'trade_result_pct_wallet': trade_result_pct_wallet,
+        'trades_duration': trades_duration.to_numpy(),
+        'wallet_ath': trades_wallet_ath,
+        'drawdown': trades_drawdown,
+        'drawdown_pct': trades_drawdown_pct,
+    }
+    metrics['days_columns'] = {
+        'evolution': equity['evolution'],
+        'daily_return': equity['daily_return'],
+        'total_exposition': total_exposition,
+        'wallet_ath': equity['wallet_ath'],
+        'drawdown': equity['drawdown'],
+        'drawdown_pct': equity['drawdown_pct'],
+        'win_loose': win_loose,
+        'streak': streak,
+    }
+    return metrics
+
+def _add_metrics_columns(df, values, columns):
+    df = df.copy()
+    for column in columns:
+        df[column] = values[column]
+    return df
+
+def _print_reasons(reasons, total):
+    for entry in reasons:
+        print(
+            "{:<25s}{:>15s}".format(
+                entry[0] + " - " + entry[1],
+                str(reasons[entry])
+                + " ("
+                + str(round(100 * reasons[entry] / total, 1))
+                + "%)",
+            )
+        )
+
+def _print_pair_result(df_pairs):
+    print('-' * 95)
+    print('{:<6s}{:>10s}{:>15s}{:>15s}{:>15s}{:>15s}{:>15s}'.format(
+                "Trades","Pair","Sum-result","Mean-trade","Worst-trade","Best-trade","Win-rate"
+                ))
+    print('-' * 95)
+    for pair, row in zip(df_pairs.index, df_pairs.itertuples(index=False)):
+        print('{:<6d}{:>10s}{:>15s}{:>15s}{:>15s}{:>15s}{:>15s}'.format(
+                            int(row.trades),
+                            pair,
+                            str(round(row.sum_result * 100, 2))+' %',
+                            str(round(row.mean_trade * 100, 2))+' %',
+                            str(round(row.worst_trade * 100, 2))+' %',
+                            str(round(row.best_trade * 100, 2))+' %',
+                            str(round(row.win_rate * 100, 2))+' %'
+                        ))
+
+def basic_single_asset_backtest(trades, days):
+    metrics = compute_backtest_metrics(trades, days)
+    df_trades = _add_metrics_columns(trades, metrics['trades_columns'], ['trade_result', 'trade_result_pct', 'trade_result_pct_wallet', 'wallet_ath', 'drawdown', 'drawdown_pct'])
+    df_days = _add_metrics_columns(days, metrics['days_columns'], ['evolution', 'daily_return', 'wallet_ath', 'drawdown', 'drawdown_pct'])
     
-    print("Period: [{}] -> [{}]".format(df_days.iloc[0]["day"], df_days.iloc[-1]["day"]))
-    print("Initial wallet: {} $".format(round(initial_wallet,2)))
+    print("Period: [{}] -> [{}]".format(metrics['period_start'], metrics['period_end']))
+    print("Initial wallet: {} $".format(round(metrics['initial_wallet'],2)))
     
     print("\n--- General Information ---")
-    print("Final wallet: {} $".format(round(final_wallet,2)))
-    print("Performance vs US dollar: {} %".format(round(vs_usd_pct*100,2)))
-    print("Sharpe Ratio: {}".format(round(sharpe_ratio,2)))
-    print("Worst Drawdown T|D: -{}% | -{}%".format(round(max_trades_drawdown*100, 2), round(max_days_drawdown*100, 2)))
-    print("Buy and hold performance: {} %".format(round(buy_and_hold_pct*100,2)))
-    print("Performance vs buy and hold: {} %".format(round(vs_hold_pct*100,2)))
-    print("Total trades on the period: {}".format(total_trades))
-    print("Global Win rate: {} %".format(round(global_win_rate*100, 2)))
-    print("Average Profit: {} %".format(round(avg_profit*100, 2)))
-    print("Total fees paid {}$".format(round(total_fees, 2)))
-    
-    print("\nBest trades: +{} % the {} -> {}".format(round(best_trade*100, 2), best_trade_date1, best_trade_date2))
-    print("Worst trades: {} % the {} -> {}".format(round(worst_trade*100, 2), worst_trade_date1, worst_trade_date2))
+    print("Final wallet: {} $".format(round(metrics['final_wallet'],2)))
+    print("Performance vs US dollar: {} %".format(round(metrics['vs_usd_pct']*100,2)))
+    print("Sharpe Ratio: {}".format(round(metrics['sharpe_ratio'],2)))
+    print("Worst Drawdown T|D: -{}% | -{}%".format(round(metrics['max_trades_drawdown']*100, 2), round(metrics['max_days_drawdown']*100, 2)))
+    print("Buy and hold performance: {} %".format(round(metrics['buy_and_hold_pct']*100,2)))
+    print("Performance vs buy and hold: {} %".format(round(metrics['vs_hold_pct']*100,2)))
+    print("Total trades on the period: {}".format(metrics['total_trades']))
+    print("Global Win rate: {} %".format(round(metrics['global_win_rate']*100, 2)))
+    print("Average Profit: {} %".format(round(metrics['avg_profit']*100, 2)))
+    print("Total fees paid {}$".format(round(metrics['total_fees'], 2)))
+    
+    print("\nBest trades: +{} % the {} -> {}".format(round(metrics['best_trade']*100, 2), metrics['best_trade_open_date'], metrics['best_trade_close_date']))
+    print("Worst trades: {} % the {} -> {}".format(round(metrics['worst_trade']*100, 2), metrics['worst_trade_open_date'], metrics['worst_trade_close_date']))
 
     return df_trades, df_days
 
 def basic_multi_asset_backtest(trades, days):
-    df_trades = trades.copy()
-    df_days = days.copy()
-    
-    df_days['evolution'] = df_days['wallet'].diff()
-    df_days['daily_return'] = df_days['evolution']/df_days['wallet'].shift(1)
-    
+    metrics = compute_backtest_metrics(trades, days, close_fee_in_result=True, open_fee_in_base=True)
+    df_trades = _add_metrics_columns(trades, metrics['trades_columns'], ['trade_result', 'trade_result_pct', 'trade_result_pct_wallet', 'wallet_ath', 'drawdown', 'drawdown_pct'])
+    df_days = _add_metrics_columns(days, metrics['days_columns'], ['evolution', 'daily_return', 'wallet_ath', 'drawdown', 'drawdown_pct'])
     
-    df_trades = df_trades.copy()
-    df_trades['trade_result'] = df_trades["close_trade_size"] - df_trades["open_trade_size"] - df_trades["open_fee"] - df_trades["close_fee"]
-    df_trades['trade_result_pct'] = df_trades['trade_result']/(df_trades["open_trade_size"] + df_trades["open_fee"])
-    df_trades['trade_result_pct_wallet'] = df_trades['trade_result']/(df_trades["wallet"]+df_trades["trade_result"])
-    good_trades = df_trades.loc[df_trades['trade_result_pct'] > 0]
-    
-    df_trades['wallet_ath'] = df_trades['wallet'].cummax()
-    df_trades['drawdown'] = df_trades['wallet_ath'] - df_trades['wallet']
-    df_trades['drawdown_pct'] = df_trades['drawdown'] / df_trades['wallet_ath']
-    df_days['wallet_ath'] = df_days['wallet'].cummax()
-    df_days['drawdown'] = df_days['wallet_ath'] - df_days['wallet']
-    df_days['drawdown_pct'] = df_days['drawdown'] / df_days['wallet_ath']
-    
-    good_trades = df_trades.loc[df_trades['trade_result'] > 0]
-    
-    total_pair_traded = df_trades['pair'].nunique()
-    initial_wallet = df_days.iloc[0]["wallet"]
-    total_trades = len(df_trades)
-    total_good_trades = len(good_trades)
-    avg_profit = df_trades['trade_result_pct'].mean()   
-    global_win_rate = total_good_trades / total_trades
-    max_trades_drawdown = df_trades['drawdown_pct'].max()
-    max_days_drawdown = df_days['drawdown_pct'].max()
-    final_wallet = df_days.iloc[-1]['wallet']
-    buy_and_hold_pct = (df_days.iloc[-1]['price'] - df_days.iloc[0]['price']) / df_days.iloc[0]['price']
-    buy_and_hold_wallet = initial_wallet + initial_wallet * buy_and_hold_pct
-    vs_hold_pct = (final_wallet - buy_and_hold_wallet)/buy_and_hold_wallet
-    vs_usd_pct = (final_wallet - initial_wallet)/initial_wallet
-    sharpe_ratio = (365**0.5)*(df_days['daily_return'].mean()/df_days['daily_return'].std())
-    
-    print("Period: [{}] -> [{}]".format(df_days.iloc[0]["day"], df_days.iloc[-1]["day"]))
-    print("Initial wallet: {} $".format(round(initial_wallet,2)))
-    print("Trades on {} pairs".format(total_pair_traded))
+    print("Period: [{}] -> [{}]".format(metrics['period_start'], metrics['period_end']))
+    print("Initial wallet: {} $".format(round(metrics['initial_wallet'],2)))
+    print("Trades on {} pairs".format(metrics['total_pair_traded']))
     
     print("\n--- General Information ---")
-    print("Final wallet: {} $".format(round(final_wallet,2)))
-    print("Performance vs US dollar: {} %".format(round(vs_usd_pct*100,2)))
-    print("Sharpe Ratio: {}".format(round(sharpe_ratio,2)))
-    print("Worst Drawdown T|D: -{}% | -{}%".format(round(max_trades_drawdown*100, 2), round(max_days_drawdown*100, 2)))
-    print("Buy and hold performance: {} %".format(round(buy_and_hold_pct*100,2)))
-    print("Performance vs buy and hold: {} %".format(round(vs_hold_pct*100,2)))
-    print("Total trades on the period: {}".format(total_trades))
-    print("Global Win rate: {} %".format(round(global_win_rate*100, 2)))
-    print("Average Profit: {} %".format(round(avg_profit*100, 2)))
+    print("Final wallet: {} $".format(round(metrics['final_wallet'],2)))
+    print("Performance vs US dollar: {} %".format(round(metrics['vs_usd_pct']*100,2)))
+    print("Sharpe Ratio: {}".format(round(metrics['sharpe_ratio'],2)))
+    print("Worst Drawdown T|D: -{}% | -{}%".format(round(metrics['max_trades_drawdown']*100, 2), round(metrics['max_days_drawdown']*100, 2)))
+    print("Buy and hold performance: {} %".format(round(metrics['buy_and_hold_pct']*100,2)))
+    print("Performance vs buy and hold: {} %".format(round(metrics['vs_hold_pct']*100,2)))
+    print("Total trades on the period: {}".format(metrics['total_trades']))
+    print("Global Win rate: {} %".format(round(metrics['global_win_rate']*100, 2)))
+    print("Average Profit: {} %".format(round(metrics['avg_profit']*100, 2)))
     
     print("\n----- Pair Result -----")
-    print('-' * 95)
-    print('{:<6s}{:>10s}{:>15s}{:>15s}{:>15s}{:>15s}{:>15s}'.format(
-                "Trades","Pair","Sum-result","Mean-trade","Worst-trade","Best-trade","Win-rate"
-                ))
-    print('-' * 95)
-    for pair in df_trades["pair"].unique():
-        df_pair = df_trades.loc[df_trades["pair"] == pair]
-        pair_total_trades = len(df_pair)
-        pair_good_trades = len(df_pair.loc[df_pair["trade_result"] > 0])
-        pair_worst_trade = str(round(df_pair["trade_result_pct"].min() * 100, 2))+' %'
-        pair_best_trade = str(round(df_pair["trade_result_pct"].max() * 100, 2))+' %'
-        pair_win_rate = str(round((pair_good_trades / pair_total_trades) * 100, 2))+' %'
-        pair_sum_result = str(round(df_pair["trade_result_pct"].sum() * 100, 2))+' %'
-        pair_avg_result = str(round(df_pair["trade_result_pct"].mean() * 100, 2))+' %'
-        print('{:<6d}{:>10s}{:>15s}{:>15s}{:>15s}{:>15s}{:>15s}'.format(
-                            pair_total_trades,pair,pair_sum_result,pair_avg_result,pair_worst_trade,pair_best_trade,pair_win_rate
-                        ))
+    _print_pair_result(metrics['pairs'])
     
     return df_trades, df_days
 
@@ -193,30 +352,13 @@ def plot_wallet_vs_asset(df_days, log=False):
     plt.show()
     
 def get_metrics(df_trades, df_days):
-    df_days_copy = df_days.copy()
-    df_days_copy['evolution'] = df_days_copy['wallet'].diff()
-    df_days_copy['daily_return'] = df_days_copy['evolution']/df_days_copy['wallet'].shift(1)
-    sharpe_ratio = (365**0.5)*(df_days_copy['daily_return'].mean()/df_days_copy['daily_return'].std())
-    
-    df_days_copy['wallet_ath'] = df_days_copy['wallet'].cummax()
-    df_days_copy['drawdown'] = df_days_copy['wallet_ath'] - df_days_copy['wallet']
-    df_days_copy['drawdown_pct'] = df_days_copy['drawdown'] / df_days_copy['wallet_ath']
-    max_drawdown = -df_days_copy['drawdown_pct'].max() * 100
-    
-    df_trades_copy = df_trades.copy()
-    df_trades_copy['trade_result'] = df_trades_copy["close_trade_size"] - df_trades_copy["open_trade_size"] - df_trades_copy["open_fee"] - df_trades_copy["close_fee"]
-    df_trades_copy['trade_result_pct'] = df_trades_copy['trade_result']/df_trades_copy["open_trade_size"]
-    df_trades_copy['trade_result_pct_wallet'] = df_trades_copy['trade_result']/(df_trades_copy["wallet"]+df_trades_copy["trade_result"])
-    good_trades = df_trades_copy.loc[df_trades_copy['trade_result_pct'] > 0]
-    win_rate = len(good_trades) / len(df_trades)
-    avg_profit = df_trades_copy['trade_result_pct'].mean()
-    
+    metrics = compute_backtest_metrics(df_trades, df_days, close_fee_in_result=True, detailed=False)
     return {
-        "sharpe_ratio": sharpe_ratio,
-        "win_rate": win_rate,
-        "avg_profit": avg_profit,
-        "total_trades": len(df_trades_copy),
-        "max_drawdown": max_drawdown
+        "sharpe_ratio": metrics['sharpe_ratio'],
+        "win_rate": metrics['global_win_rate'],
+        "avg_profit": metrics['avg_profit'],
+        "total_trades": metrics['total_trades'],
+        "max_drawdown": -metrics['max_days_drawdown'] * 100
     }
     
 def get_n_columns(df, columns, n=1):
@@ -225,52 +367,54 @@ def get_n_columns(df, columns, n=1):
         dt["n"+str(n)+"_"+col] = dt[col].shift(n)
     return dt
 
+def _wallet_by_date(df_days):
+    index = df_days.index if isinstance(df_days.index, pd.DatetimeIndex) else pd.DatetimeIndex(df_days['day'])
+    return pd.Series(df_days['wallet'].to_numpy(dtype=float), index=index)
+
+def _period_returns(df_days, freq):
+    wallet = _wallet_by_date(df_days).resample(freq).agg(['first', 'last'])
+    return (wallet['last'] - wallet['first']) / wallet['first']
+
+def get_monthly_returns(df_days):
+    # performance between the first and the last wallet of each month, years x months (1-12)
+    monthly = _period_returns(df_days, 'MS')
+    table = pd.DataFrame({
+        'year': monthly.index.year,
+        'month': monthly.index.month,
+        'result': monthly.to_numpy()
+    }).pivot(index='year', columns='month', values='result')
+    return table.reindex(columns=range(1, 13))
+
+def get_yearly_returns(df_days):
+    # performance between the first and the last wallet of each year
+    yearly = _period_returns(df_days, 'YS')
+    yearly.index = yearly.index.year
+    return yearly
+
 def plot_bar_by_month(df_days):
     sns.set(rc={'figure.figsize':(11.7,8.27)})
-    custom_palette = {}
-    
-    last_month = int(df_days.iloc[-1]['day'].month)
-    last_year = int(df_days.iloc[-1]['day'].year)
-    
-    current_month = int(df_days.iloc[0]['day'].month)
-    current_year = int(df_days.iloc[0]['day'].year)
-    current_year_array = []
-    while current_year != last_year or current_month-1 != last_month:
-        date_string = str(current_year) + "-" + str(current_month)
-        
-        monthly_perf = (df_days.loc[date_string]['wallet'].iloc[-1] - df_days.loc[date_string]['wallet'].iloc[0]) / df_days.loc[date_string]['wallet'].iloc[0]
-        monthly_row = {
-            'date': str(datetime.date(1900, current_month, 1).strftime('%B')),
-            'result': round(monthly_perf*100)
-        }
-        if monthly_row["result"] >= 0:
-            custom_palette[str(datetime.date(1900, current_month, 1).strftime('%B'))] = 'g'
-        else:
-            custom_palette[str(datetime.date(1900, current_month, 1).strftime('%B'))] = 'r'
-        current_year_array.append(monthly_row)
-        # print(monthly_perf*100) 
-        if ((current_month == 12) or (current_month == last_month and current_year == last_year)):
-            current_df = pd.DataFrame(current_year_array)
-            # print(current_df)
-            g = sns.barplot(data=current_df,x='date',y='result', palette=custom_palette)
-            for index, row in current_df.iterrows():
-                if row.result >= 0:
-                    g.text(row.name,row.result, '+'+str(round(row.result))+'%', color='black', ha="center", va="bottom")
-                else:
-                    g.text(row.name,row.result, '-'+str(round(row.result))+'%', color='black', ha="center", va="top")
-            g.set_title(str(current_year) + ' performance in %')
-            g.set(xlabel=current_year, ylabel='performance %')
-            
-            year_result = (df_days.loc[str(current_year)]['wallet'].iloc[-1] - df_days.loc[str(current_year)]['wallet'].iloc[0]) / df_days.loc[str(current_year)]['wallet'].iloc[0]
-            print("----- " + str(current_year) +" Cumulative Performances: " + str(round(year_result*100,2)) + "% -----")
-            plt.show()
-
-            current_year_array = []
-        
-        current_month += 1
-        if current_month > 12:
-            current_month = 1
-            current_year += 1
+    monthly_returns = get_monthly_returns(df_days)
+    yearly_returns = get_yearly_returns(df_days)
+    month_names = [datetime.date(1900, month, 1).strftime('%B') for month in range(1, 13)]
+
+    for year, year_returns in monthly_returns.iterrows():
+        year_returns = year_returns.dropna()
+        current_df = pd.DataFrame({
+            'date': [month_names[month - 1] for month in year_returns.index],
+            'result': np.round(year_returns.to_numpy()*100)
+        })
+        custom_palette = dict(zip(current_df['date'], np.where(current_df['result'] >= 0, 'g', 'r')))
+        g = sns.barplot(data=current_df,x='date',y='result', palette=custom_palette)
+        for position, result in enumerate(current_df['result']):
+            if result >= 0:
+                g.text(position, result, '+'+str(round(result))+'%', color='black', ha="center", va="bottom")
+            else:
+                g.text(position, result, str(round(result))+'%', color='black', ha="center", va="top")
+        g.set_title(str(year) + ' performance in %')
+        g.set(xlabel=year, ylabel='performance %')
+
+        print("----- " + str(year) +" Cumulative Performances: " + str(round(yearly_returns[year]*100,2)) + "% -----")
+        plt.show()
 
 def complete_multi_asset_backtest(
     trades, 
@@ -284,249 +428,96 @@ def complete_multi_asset_backtest(
     exposition_info=False,
     indepedant_trade=True
 ):
-    df_trades = trades.copy()
-    df_days = days.copy().loc[df_trades.index.values[0] - np.timedelta64(1,'D'):]
-    
-    if df_trades.empty:
+    if trades.empty:
         raise Exception("No trades found")
+    df_days = days.loc[trades.index.values[0] - np.timedelta64(1,'D'):]
     if df_days.empty:
         raise Exception("No days found")
     
-    df_days['evolution'] = df_days['wallet'].diff()
-    df_days['daily_return'] = df_days['evolution']/df_days['wallet'].shift(1)
-    df_days['total_exposition'] = df_days['long_exposition']+df_days['short_exposition']
-    
-    df_trades['trade_result'] = df_trades["close_trade_size"] - df_trades["open_trade_size"] - df_trades["open_fee"]
-    df_trades['trade_result_pct'] = df_trades['trade_result']/df_trades["open_trade_size"]
-    df_trades['trade_result_pct_wallet'] = df_trades['trade_result']/(df_trades["wallet"]+df_trades["trade_result"])
-    if indepedant_trade:
-        result_to_use = "trade_result_pct"
-    else:
-        result_to_use = "trade_result_pct_wallet"
-    
-    df_trades['trades_duration'] = df_trades['close_date'] - df_trades['open_date']
-    
-    df_trades['wallet_ath'] = df_trades['wallet'].cummax()
-    df_trades['drawdown'] = df_trades['wallet_ath'] - df_trades['wallet']
-    df_trades['drawdown_pct'] = df_trades['drawdown'] / df_trades['wallet_ath']
-    df_days['wallet_ath'] = df_days['wallet'].cummax()
-    df_days['drawdown'] = df_days['wallet_ath'] - df_days['wallet']
-    df_days['drawdown_pct'] = df_days['drawdown'] / df_days['wallet_ath']
+    m = compute_backtest_metrics(trades, df_days, indepedant_trade=indepedant_trade)
+    df_trades = _add_metrics_columns(trades, m['trades_columns'], ['trade_result', 'trade_result_pct', 'trade_result_pct_wallet', 'trades_duration', 'wallet_ath', 'drawdown', 'drawdown_pct'])
+    df_days = _add_metrics_columns(df_days, m['days_columns'], ['evolution', 'daily_return', 'total_exposition', 'wallet_ath', 'drawdown', 'drawdown_pct', 'win_loose', 'streak'])
     
-    good_trades = df_trades.loc[df_trades['trade_result'] > 0]
-    if good_trades.empty:
+    if m['total_good_trades'] == 0:
         print("!!! No good trades found")
-    bad_trades = df_trades.loc[df_trades['trade_result'] < 0]
-    if bad_trades.empty:
+    if m['total_bad_trades'] == 0:
         print("!!! No bad trades found")
     
-    initial_wallet = df_days.iloc[0]["wallet"]
-    total_trades = len(df_trades)
-    total_days = len(df_days)
-    if good_trades.empty:
-        total_good_trades = 0
-    else:
-        total_good_trades = len(good_trades)
-        
-    avg_profit = df_trades[result_to_use].mean()  
-     
-    try:
-        avg_profit_good_trades = good_trades[result_to_use].mean()   
-        avg_profit_bad_trades = bad_trades[result_to_use].mean() 
-        total_bad_trades = len(bad_trades)
-        mean_good_trades_duration = good_trades['trades_duration'].mean()
-        mean_bad_trades_duration = bad_trades['trades_duration'].mean()
-
-    except Exception as e:
-        pass  
-    
-    global_win_rate = total_good_trades / total_trades
-    max_trades_drawdown = df_trades['drawdown_pct'].max()
-    max_days_drawdown = df_days['drawdown_pct'].max()
-    mean_drawdown = df_days['drawdown_pct'].mean()
-    final_wallet = df_days.iloc[-1]['wallet']
-    buy_and_hold_pct = (df_days.iloc[-1]['price'] - df_days.iloc[0]['price']) / df_days.iloc[0]['price']
-    buy_and_hold_wallet = initial_wallet + initial_wallet * buy_and_hold_pct
-    vs_hold_pct = (final_wallet - buy_and_hold_wallet)/buy_and_hold_wallet
-    vs_usd_pct = (final_wallet - initial_wallet)/initial_wallet
-    sharpe_ratio = (365**0.5)*(df_days['daily_return'].mean()/df_days['daily_return'].std())
-    sortino_ratio = 365**0.5 * (df_days["daily_return"].mean() / df_days["daily_return"][df_days["daily_return"] < 0].std())
-    calmar_ratio = (df_days["daily_return"].mean()*365) / max_days_drawdown
-    mean_trades_duration = df_trades['trades_duration'].mean()
-    mean_trades_per_days = total_trades/total_days
-    
-    best_trade = df_trades[result_to_use].max()
-    best_trade_date1 =  str(df_trades.loc[df_trades[result_to_use] == best_trade].iloc[0]['open_date'])
-    best_trade_date2 =  str(df_trades.loc[df_trades[result_to_use] == best_trade].iloc[0]['close_date'])
-    best_trade_pair =  str(df_trades.loc[df_trades[result_to_use] == best_trade].iloc[0]['pair'])
-    worst_trade = df_trades[result_to_use].min()
-    worst_trade_date1 =  str(df_trades.loc[df_trades[result_to_use] == worst_trade].iloc[0]['open_date'])
-    worst_trade_date2 =  str(df_trades.loc[df_trades[result_to_use] == worst_trade].iloc[0]['close_date'])
-    worst_trade_pair =  str(df_trades.loc[df_trades[result_to_use] == worst_trade].iloc[0]['pair'])
-
-    df_days["win_loose"] = 0
-    df_days.loc[df_days['daily_return'] > 0, "win_loose"] = 1
-    df_days.loc[df_days['daily_return'] < 0, "win_loose"] = -1
-    trade_days = df_days.loc[df_days['win_loose'] != 0]
-    grouper = (trade_days["win_loose"] != trade_days["win_loose"].shift()).cumsum()
-    df_days['streak'] = trade_days["win_loose"].groupby(grouper).cumsum()
-    df_days['streak'] = df_days['streak'].ffill(axis = 0)
-
-    best_day = df_days.loc[df_days['daily_return'] == df_days['daily_return'].max()].iloc[0]
-    worst_day = df_days.loc[df_days['daily_return'] == df_days['daily_return'].min()].iloc[0]
-    worst_day_return = worst_day['daily_return']
-    best_day_return = best_day['daily_return']
-    worst_day_date = worst_day['day']
-    best_day_date = best_day['day']
-    best_streak = df_days.loc[df_days['streak'] == df_days['streak'].max()].iloc[0]
-    worst_streak = df_days.loc[df_days['streak'] == df_days['streak'].min()].iloc[0]
-    best_streak_date = best_streak['day']
-    worst_streak_date = worst_streak['day']
-    best_streak_number = best_streak['streak']
-    worst_streak_number = worst_streak['streak']
-    win_days_number = len(df_days.loc[df_days['win_loose'] == 1])
-    loose_days_number = len(df_days.loc[df_days['win_loose'] == -1])
-    neutral_days_number = len(df_days.loc[df_days['win_loose'] == 0])
-
-    mean_exposition = df_days['total_exposition'].mean()
-    max_exposition = df_days['total_exposition'].max()
-    max_long_exposition = df_days['long_exposition'].max()
-    max_short_exposition = df_days['short_exposition'].max()
-    max_risk = df_days['risk'].max()
-    min_risk = df_days['risk'].min()
-    mean_risk = df_days['risk'].mean()
-    
     if general_info:
         print(f"Period: [{df_days.iloc[0]['day']}] -> [{df_days.iloc[-1]['day']}]")
-        print(f"Initial wallet: {round(initial_wallet,2)} $")
+        print(f"Initial wallet: {round(m['initial_wallet'],2)} $")
         
         print("\n--- General Information ---")
-        print(f"Final wallet: {round(final_wallet,2)} $")
-        print(f"Performance: {round(vs_usd_pct*100,2)} %")
-        print(f"Sharpe Ratio: {round(sharpe_ratio,2)} | Sortino Ratio: {round(sortino_ratio,2)} | Calmar Ratio: {round(calmar_ratio,2)}")
-        print(f"Worst Drawdown T|D: -{round(max_trades_drawdown*100, 2)}% | -{round(max_days_drawdown*100, 2)}%")
-        print(f"Mean daily Drawdown: -{round(mean_drawdown*100, 2)}%")
-        print(f"Buy and hold performance: {round(buy_and_hold_pct*100,2)} %")
-        print(f"Performance vs buy and hold: {round(vs_hold_pct*100,2)} %")
-        print(f"Total trades on the period: {total_trades}")
-        print(f"Average Profit: {round(avg_profit*100, 2)} %")
-        print(f"Global Win rate: {round(global_win_rate*100, 2)} %")
+        print(f"Final wallet: {round(m['final_wallet'],2)} $")
+        print(f"Performance: {round(m['vs_usd_pct']*100,2)} %")
+        print(f"Sharpe Ratio: {round(m['sharpe_ratio'],2)} | Sortino Ratio: {round(m['sortino_ratio'],2)} | Calmar Ratio: {round(m['calmar_ratio'],2)}")
+        print(f"Worst Drawdown T|D: -{round(m['max_trades_drawdown']*100, 2)}% | -{round(m['max_days_drawdown']*100, 2)}%")
+        print(f"Mean daily Drawdown: -{round(m['mean_drawdown']*100, 2)}%")
+        print(f"Buy and hold performance: {round(m['buy_and_hold_pct']*100,2)} %")
+        print(f"Performance vs buy and hold: {round(m['vs_hold_pct']*100,2)} %")
+        print(f"Total trades on the period: {m['total_trades']}")
+        print(f"Average Profit: {round(m['avg_profit']*100, 2)} %")
+        print(f"Global Win rate: {round(m['global_win_rate']*100, 2)} %")
     
     if trades_info:
         print("\n--- Trades Information ---")
-        print(f"Mean Trades per day: {round(mean_trades_per_days, 2)}")
-        print(f"Mean Trades Duration: {mean_trades_duration}")
-        print(f"Best trades: +{round(best_trade*100, 2)} % the {best_trade_date1} -> {best_trade_date2} ({best_trade_pair})")
-        print(f"Worst trades: {round(worst_trade*100, 2)} % the {worst_trade_date1} -> {worst_trade_date2} ({worst_trade_pair})")
+        print(f"Mean Trades per day: {round(m['mean_trades_per_days'], 2)}")
+        print(f"Mean Trades Duration: {m['mean_trades_duration']}")
+        print(f"Best trades: +{round(m['best_trade']*100, 2)} % the {m['best_trade_open_date']} -> {m['best_trade_close_date']} ({m['best_trade_pair']})")
+        print(f"Worst trades: {round(m['worst_trade']*100, 2)} % the {m['worst_trade_open_date']} -> {m['worst_trade_close_date']} ({m['worst_trade_pair']})")
         try:
-            print(f"Total Good trades on the period: {total_good_trades}")
-            print(f"Total Bad trades on the period: {total_bad_trades}")
-            print(f"Average Good Trades result: {round(avg_profit_good_trades*100, 2)} %")
-            print(f"Average Bad Trades result: {round(avg_profit_bad_trades*100, 2)} %")
-            print(f"Mean Good Trades Duration: {mean_good_trades_duration}")
-            print(f"Mean Bad Trades Duration: {mean_bad_trades_duration}")
+            print(f"Total Good trades on the period: {m['total_good_trades']}")
+            print(f"Total Bad trades on the period: {m['total_bad_trades']}")
+            print(f"Average Good Trades result: {round(m['avg_profit_good_trades']*100, 2)} %")
+            print(f"Average Bad Trades result: {round(m['avg_profit_bad_trades']*100, 2)} %")
+            print(f"Mean Good Trades Duration: {m['mean_good_trades_duration']}")
+            print(f"Mean Bad Trades Duration: {m['mean_bad_trades_duration']}")
         except Exception as e: 
             pass
 
     if days_info:
         print("\n--- Days Informations ---")
         print(f"Total: {len(df_days)} days recorded")
-        print(f"Winning days: {win_days_number} days ({round(100*win_days_number/len(df_days), 2)}%)")
-        print(f"Neutral days: {neutral_days_number} days ({round(100*neutral_days_number/len(df_days), 2)}%)")
-        print(f"Loosing days: {loose_days_number} days ({round(100*loose_days_number/len(df_days), 2)}%)")
-        print(f"Longest winning streak: {round(best_streak_number)} days ({best_streak_date})")
-        print(f"Longest loosing streak: {round(-worst_streak_number)} days ({worst_streak_date})")
-        print(f"Best day: {best_day_date} (+{round(best_day_return*100, 2)}%)")
-        print(f"Worst day: {worst_day_date} ({round(worst_day_return*100, 2)}%)")
+        print(f"Winning days: {m['win_days_number']} days ({round(100*m['win_days_number']/len(df_days), 2)}%)")
+        print(f"Neutral days: {m['neutral_days_number']} days ({round(100*m['neutral_days_number']/len(df_days), 2)}%)")
+        print(f"Loosing days: {m['loose_days_number']} days ({round(100*m['loose_days_number']/len(df_days), 2)}%)")
+        print(f"Longest winning streak: {round(m['best_streak_number'])} days ({m['best_streak_date']})")
+        print(f"Longest loosing streak: {round(-m['worst_streak_number'])} days ({m['worst_streak_date']})")
+        print(f"Best day: {m['best_day_date']} (+{round(m['best_day_return']*100, 2)}%)")
+        print(f"Worst day: {m['worst_day_date']} ({round(m['worst_day_return']*100, 2)}%)")
 
     if exposition_info:
         print("\n--- Exposition Informations ---")
-        print(f"Mean Exposition: {round(mean_exposition, 2)}")
-        print(f"Max Exposition: {round(max_exposition, 2)}")
-        print(f"Max Long Exposition: {round(max_long_exposition, 2)}")
-        print(f"Max Short Exposition: {round(max_short_exposition, 2)}")
-        print(f"Mean VAR Rsik: {round(mean_risk, 2)}%")
-        print(f"Max VAR Rsik: {round(max_risk, 2)}%")
-        print(f"Min VAR Rsik: {round(min_risk, 2)}%")
+        print(f"Mean Exposition: {round(m['mean_exposition'], 2)}")
+        print(f"Max Exposition: {round(m['max_exposition'], 2)}")
+        print(f"Max Long Exposition: {round(m['max_long_exposition'], 2)}")
+        print(f"Max Short Exposition: {round(m['max_short_exposition'], 2)}")
+        print(f"Mean VAR Rsik: {round(m['mean_risk'], 2)}%")
+        print(f"Max VAR Rsik: {round(m['max_risk'], 2)}%")
+        print(f"Min VAR Rsik: {round(m['min_risk'], 2)}%")
         
     if long_short_info:
-        long_trades = df_trades.loc[df_trades['position'] == "LONG"]
-        short_trades = df_trades.loc[df_trades['position'] == "SHORT"]
-        if long_trades.empty or short_trades.empty:
+        if m['long_trades'] == 0 or m['short_trades'] == 0:
             print("!!! No long or short trades found")
         else:
-            total_long_trades = len(long_trades)
-            total_short_trades = len(short_trades)
-            good_long_trades = long_trades.loc[long_trades['trade_result'] > 0]
-            good_short_trades = short_trades.loc[short_trades['trade_result'] > 0]
-            if good_long_trades.empty: 
-                total_good_long_trades = 0
-            else:
-                total_good_long_trades = len(good_long_trades)
-            if good_short_trades.empty: 
-                total_good_short_trades = 0
-            else:
-                total_good_short_trades = len(good_short_trades)
-            long_win_rate = total_good_long_trades / total_long_trades
-            short_win_rate = total_good_short_trades / total_short_trades
-            long_average_profit = long_trades[result_to_use].mean()
-            short_average_profit = short_trades[result_to_use].mean()
             print("\n--- " + "LONG informations" + " ---")
-            print(f"Total LONG trades on the period: {total_long_trades}")
-            print(f"LONG Win rate: {round(long_win_rate*100, 2)} %")
-            print(f"Average LONG Profit: {round(long_average_profit*100, 2)} %")
+            print(f"Total LONG trades on the period: {m['long_trades']}")
+            print(f"LONG Win rate: {round(m['long_win_rate']*100, 2)} %")
+            print(f"Average LONG Profit: {round(m['long_average_profit']*100, 2)} %")
             print("\n--- " + "SHORT informations" + " ---")
-            print(f"Total SHORT trades on the period: {total_short_trades}")
-            print(f"SHORT Win rate: {round(short_win_rate*100, 2)} %")
-            print(f"Average SHORT Profit: {round(short_average_profit*100, 2)} %")
+            print(f"Total SHORT trades on the period: {m['short_trades']}")
+            print(f"SHORT Win rate: {round(m['short_win_rate']*100, 2)} %")
+            print(f"Average SHORT Profit: {round(m['short_average_profit']*100, 2)} %")
     
     if entry_exit_info:
         print("\n" + "-" * 16 + " Entries " + "-" * 16)
-        total_entries = len(df_trades)
-        open_dict = df_trades.groupby("position")["open_reason"].value_counts().to_dict()
-        for entry in open_dict:
-            print(
-                "{:<25s}{:>15s}".format(
-                    entry[0] + " - " + entry[1],
-                    str(open_dict[entry])
-                    + " ("
-                    + str(round(100 * open_dict[entry] / total_entries, 1))
-                    + "%)",
-                )
-            )
+        _print_reasons(m['entries'], m['total_trades'])
         print("-" * 17 + " Exits " + "-" * 17)
-        total_exits = len(df_trades)
-        close_dict = df_trades.groupby("position")["close_reason"].value_counts().to_dict()
-        for entry in close_dict:
-            print(
-                "{:<25s}{:>15s}".format(
-                    entry[0] + " - " + entry[1],
-                    str(close_dict[entry])
-                    + " ("
-                    + str(round(100 * close_dict[entry] / total_entries, 1))
-                    + "%)",
-                )
-            )
+        _print_reasons(m['exits'], m['total_trades'])
         print("-" * 40)
 
     if pair_info:
         print("\n--- Pair Result ---")
-        print('-' * 95)
-        print('{:<6s}{:>10s}{:>15s}{:>15s}{:>15s}{:>15s}{:>15s}'.format(
-                    "Trades","Pair","Sum-result","Mean-trade","Worst-trade","Best-trade","Win-rate"
-                    ))
-        print('-' * 95)
-        for pair in df_trades["pair"].unique():
-            df_pair = df_trades.loc[df_trades["pair"] == pair]
-            pair_total_trades = len(df_pair)
-            pair_good_trades = len(df_pair.loc[df_pair["trade_result"] > 0])
-            pair_worst_trade = str(round(df_pair["trade_result_pct"].min() * 100, 2))+' %'
-            pair_best_trade = str(round(df_pair["trade_result_pct"].max() * 100, 2))+' %'
-            pair_win_rate = str(round((pair_good_trades / pair_total_trades) * 100, 2))+' %'
-            pair_sum_result = str(round(df_pair["trade_result_pct"].sum() * 100, 2))+' %'
-            pair_avg_result = str(round(df_pair["trade_result_pct"].mean() * 100, 2))+' %'
-            print('{:<6d}{:>10s}{:>15s}{:>15s}{:>15s}{:>15s}{:>15s}'.format(
-                                pair_total_trades,pair,pair_sum_result,pair_avg_result,pair_worst_trade,pair_best_trade,pair_win_rate
-                            ))
-
-    return df_trades, df_days
\ No newline at end of file
+        _print_pair_result(m['pairs'])
+
+    return df_trades, df_days
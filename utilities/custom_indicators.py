@@ -4,6 +4,7 @@ import pandas as pd
 import ta
 import math
 import requests
+from utilities.jit import njit
 
 def get_n_columns(df, columns, n=1):
     dt = df.copy()
@@ -191,12 +192,22 @@ class VMC():
         return pd.Series(money_flow, name="money_flow")
 
 
+@njit
+def _heikin_ashi_open_kernel(first_open, ha_close):
+    ha_open = np.empty(len(ha_close))
+    if len(ha_close) == 0:
+        return ha_open
+    ha_open[0] = first_open
+    for i in range(0, len(ha_close)-1):
+        ha_open[i+1] = (ha_open[i] + ha_close[i]) / 2
+    return ha_open
+
+
 def heikinAshiDf(df):
     df['HA_Close'] = (df.open + df.high + df.low + df.close)/4
-    ha_open = [(df.open[0] + df.close[0]) / 2]
-    [ha_open.append((ha_open[i] + df.HA_Close.values[i]) / 2)
-     for i in range(0, len(df)-1)]
-    df['HA_Open'] = ha_open
+    first_open = (df.open.iloc[0] + df.close.iloc[0]) / 2 if len(df) else np.nan
+    df['HA_Open'] = _heikin_ashi_open_kernel(
+        first_open, df.HA_Close.to_numpy(dtype=float))
     df['HA_High'] = df[['HA_Open', 'HA_Close', 'high']].max(axis=1)
     df['HA_Low'] = df[['HA_Open', 'HA_Close', 'low']].min(axis=1)
     return df
@@ -215,6 +226,40 @@ def volume_anomality(df, volume_window=10):
               "VolAnomaly"] = (-1) * dfInd["VolAnomaly"]
     return dfInd["VolAnomaly"]
 
+@njit
+def _supertrend_kernel(close, final_upperband, final_lowerband):
+    # initialize Supertrend column to True
+    supertrend = np.ones(len(close), dtype=np.bool_)
+    final_upperband = final_upperband.copy()
+    final_lowerband = final_lowerband.copy()
+
+    for i in range(1, len(close)):
+        curr, prev = i, i-1
+
+        # if current close price crosses above upperband
+        if close[curr] > final_upperband[prev]:
+            supertrend[curr] = True
+        # if current close price crosses below lowerband
+        elif close[curr] < final_lowerband[prev]:
+            supertrend[curr] = False
+        # else, the trend continues
+        else:
+            supertrend[curr] = supertrend[prev]
+
+            # adjustment to the final bands
+            if supertrend[curr] and final_lowerband[curr] < final_lowerband[prev]:
+                final_lowerband[curr] = final_lowerband[prev]
+            if not supertrend[curr] and final_upperband[curr] > final_upperband[prev]:
+                final_upperband[curr] = final_upperband[prev]
+
+        # to remove bands according to the trend direction
+        if supertrend[curr]:
+            final_upperband[curr] = np.nan
+        else:
+            final_lowerband[curr] = np.nan
+
+    return supertrend, final_lowerband, final_upperband
+
 class SuperTrend():
     def __init__(
         self,
@@ -250,39 +295,16 @@ class SuperTrend():
         final_upperband = upperband = hl2 + (self.atr_multi * atr)
         final_lowerband = lowerband = hl2 - (self.atr_multi * atr)
         
-        # initialize Supertrend column to True
-        supertrend = [True] * len(self.close)
-        
-        for i in range(1, len(self.close)):
-            curr, prev = i, i-1
-            
-            # if current close price crosses above upperband
-            if self.close[curr] > final_upperband[prev]:
-                supertrend[curr] = True
-            # if current close price crosses below lowerband
-            elif self.close[curr] < final_lowerband[prev]:
-                supertrend[curr] = False
-            # else, the trend continues
-            else:
-                supertrend[curr] = supertrend[prev]
-                
-                # adjustment to the final bands
-                if supertrend[curr] == True and final_lowerband[curr] < final_lowerband[prev]:
-                    final_lowerband[curr] = final_lowerband[prev]
-                if supertrend[curr] == False and final_upperband[curr] > final_upperband[prev]:
-                    final_upperband[curr] = final_upperband[prev]
-
-            # to remove bands according to the trend direction
-            if supertrend[curr] == True:
-                final_upperband[curr] = np.nan
-            else:
-                final_lowerband[curr] = np.nan
-                
+        supertrend, final_lowerband, final_upperband = _supertrend_kernel(
+            self.close.to_numpy(dtype=float),
+            final_upperband.to_numpy(dtype=float),
+            final_lowerband.to_numpy(dtype=float))
+
         self.st = pd.DataFrame({
             'Supertrend': supertrend,
             'Final Lowerband': final_lowerband,
             'Final Upperband': final_upperband
-        })
+        }, index=self.close.index)
         
     def super_trend_upper(self):
         return self.st['Final Upperband']
@@ -293,6 +315,16 @@ class SuperTrend():
     def super_trend_direction(self):
         return self.st['Supertrend']
     
+@njit
+def _ma_slope_kernel(close, alpha):
+    ma = np.empty(len(close))
+    if len(close) == 0:
+        return ma
+    ma[0] = alpha[0] * close[0]
+    for i in range(1, len(close)):
+        ma[i] = ma[i-1] + alpha[i] * (close[i] - ma[i-1])
+    return ma
+
 class MaSlope():
     """ Slope adaptative moving average
     """
@@ -330,14 +362,9 @@ class MaSlope():
         df.loc[df['hh'] != df['ll'],'mult'] = abs(2 * df['close'] - df['ll'] - df['hh']) / (df['hh'] - df['ll'])
         df['final'] = df['mult'] * (minAlpha - majAlpha) + majAlpha
 
-        ma_first = (df.iloc[0]['final']**2) * df.iloc[0]['close']
-
-        col_ma = [ma_first]
-        for i in range(1, len(df)):
-            ma1 = col_ma[i-1]
-            col_ma.append(ma1 + (df.iloc[i]['final']**2) * (df.iloc[i]['close'] - ma1))
-
-        df['ma'] = col_ma
+        df['ma'] = _ma_slope_kernel(
+            df['close'].to_numpy(dtype=float),
+            df['final'].to_numpy(dtype=float)**2)
         pi = math.atan(1) * 4
         df['hh1'] = df['high'].rolling(window=self.slope_period).max()
         df['ll1'] = df['low'].rolling(window=self.slope_period).min()
@@ -366,3 +393,520 @@ class MaSlope():
         return self.df['xangle']
         
     
+
+
+def _batch_columns(**parameters):
+    """ One column per parameter set, scalars are broadcast to every column
+    """
+    values = np.broadcast_arrays(*[np.atleast_1d(value) for value in parameters.values()])
+    return pd.MultiIndex.from_arrays(values, names=list(parameters))
+
+def _unique_parameters(*parameters):
+    """ Unique parameter sets and the position of each column in them
+    """
+    unique, inverse = np.unique(np.column_stack(parameters), axis=0, return_inverse=True)
+    return unique, inverse.ravel()
+
+def _rolling_mean_by_window(df, windows):
+    """ Rolling mean of each column of df with its own window
+    """
+    result = np.empty(df.shape, order='F')
+    for window in np.unique(windows):
+        columns = np.flatnonzero(windows == window)
+        result[:, columns] = df.iloc[:, columns].rolling(window=int(window)).mean().to_numpy()
+    return pd.DataFrame(result, index=df.index, columns=df.columns)
+
+def ema_batch(values, windows):
+    """ Exponential moving averages of a (time x column) array, one window per column
+    """
+    values = pd.DataFrame(values)
+    windows = np.asarray(windows)
+    result = np.empty(values.shape, order='F')
+    for window in np.unique(windows):
+        columns = np.flatnonzero(windows == window)
+        # same as ta.trend.ema_indicator, applied to every column of the window at once
+        result[:, columns] = values.iloc[:, columns].ewm(
+            span=int(window), min_periods=int(window), adjust=False).mean().to_numpy()
+    return result
+
+
+class TrixBatch():
+    """ Trix indicator for several parameter sets in one pass
+
+        Every accessor returns a dataframe with one column per parameter set.
+        The moving averages are computed once per distinct trixLength.
+
+        Args:
+            close(pd.Series): dataframe 'close' columns,
+            trixLength(list[int]): the window length for each mooving average of the trix,
+            trixSignal(list[int]): the window length for the signal line
+    """
+
+    def __init__(
+        self,
+        close: pd.Series,
+        trixLength=[9],
+        trixSignal=[21]
+    ):
+        self.close = close
+        self.columns = _batch_columns(trixLength=trixLength, trixSignal=trixSignal)
+        self.trixLength = self.columns.get_level_values("trixLength").to_numpy()
+        self.trixSignal = self.columns.get_level_values("trixSignal").to_numpy()
+        self._run()
+
+    def _run(self):
+        lengths, column = _unique_parameters(self.trixLength)
+        lengths = lengths[:, 0]
+        trix = np.repeat(self.close.to_numpy(dtype=float)[:, None], len(lengths), axis=1)
+        for _ in range(3):
+            trix = ema_batch(trix, lengths)
+        trix = np.asfortranarray(trix)
+        trix_pct = np.full(trix.shape, np.nan, order='F')
+        trix_pct[1:] = (trix[1:] / trix[:-1] - 1)*100
+        self.trixLine = pd.DataFrame(trix[:, column], index=self.close.index, columns=self.columns)
+        self.trixPctLine = pd.DataFrame(
+            trix_pct[:, column], index=self.close.index, columns=self.columns)
+        self.trixSignalLine = _rolling_mean_by_window(self.trixPctLine, self.trixSignal)
+        self.trixHisto = self.trixPctLine - self.trixSignalLine
+
+    def trix_line(self) -> pd.DataFrame:
+        """ trix line
+
+            Returns:
+                pd.DataFrame: trix line
+        """
+        return self.trixLine
+
+    def trix_pct_line(self) -> pd.DataFrame:
+        """ trix percentage line
+
+            Returns:
+                pd.DataFrame: trix percentage line
+        """
+        return self.trixPctLine
+
+    def trix_signal_line(self) -> pd.DataFrame:
+        """ trix signal line
+
+            Returns:
+                pd.DataFrame: trix signal line
+        """
+        return self.trixSignalLine
+
+    def trix_histo(self) -> pd.DataFrame:
+        """ trix histogram
+
+            Returns:
+                pd.DataFrame: trix histogram
+        """
+        return self.trixHisto
+
+
+class VMCBatch():
+    """ VuManChu Cipher B for several parameter sets in one pass
+
+        Every accessor returns a dataframe with one column per parameter set.
+        esa, de and ci are computed once per distinct wtChannelLen and wave 1 once
+        per distinct (wtChannelLen, wtAverageLen).
+
+        Args:
+            open(pandas.Series): dataset 'Open' column.
+            high(pandas.Series): dataset 'High' column.
+            low(pandas.Series): dataset 'Low' column.
+            close(pandas.Series): dataset 'Close' column.
+            wtChannelLen(list[int]): n period.
+            wtAverageLen(list[int]): n period.
+            wtMALen(list[int]): n period.
+            rsiMFIperiod(list[int]): n period.
+            rsiMFIMultiplier(list[int]): n period.
+            rsiMFIPosY(list[int]): n period.
+    """
+
+    def __init__(
+        self,
+        open: pd.Series,
+        high: pd.Series,
+        low: pd.Series,
+        close: pd.Series,
+        wtChannelLen=[9],
+        wtAverageLen=[12],
+        wtMALen=[3],
+        rsiMFIperiod=[60],
+        rsiMFIMultiplier=[150],
+        rsiMFIPosY=[2.5]
+    ) -> None:
+        self._high = high
+        self._low = low
+        self._close = close
+        self._open = open
+        self.columns = _batch_columns(
+            wtChannelLen=wtChannelLen,
+            wtAverageLen=wtAverageLen,
+            wtMALen=wtMALen,
+            rsiMFIperiod=rsiMFIperiod,
+            rsiMFIMultiplier=rsiMFIMultiplier,
+            rsiMFIPosY=rsiMFIPosY
+        )
+        self._run()
+
+    def _parameter(self, name):
+        return self.columns.get_level_values(name).to_numpy()
+
+    def _run(self) -> None:
+        index = self._close.index
+        hlc3 = (self._close + self._high + self._low).to_numpy(dtype=float)
+        channels, channel_column = _unique_parameters(self._parameter("wtChannelLen"))
+        channels = channels[:, 0]
+        hlc3 = np.repeat(hlc3[:, None], len(channels), axis=1)
+        esa = ema_batch(hlc3, channels)
+        de = ema_batch(np.abs(hlc3 - esa), channels)
+        ci = (hlc3 - esa) / (0.015 * de)
+
+        waves, wave_column = _unique_parameters(
+            channel_column, self._parameter("wtAverageLen"))
+        wt1 = ema_batch(ci[:, waves[:, 0]], waves[:, 1])
+        self._wt1 = pd.DataFrame(wt1[:, wave_column], index=index, columns=self.columns)
+        self._wt2 = _rolling_mean_by_window(self._wt1, self._parameter("wtMALen"))
+
+        mfi = ((self._close - self._open) / (self._high - self._low)).to_numpy(dtype=float)
+        flows, flow_column = _unique_parameters(
+            self._parameter("rsiMFIperiod"), self._parameter("rsiMFIMultiplier"))
+        rsi = _rolling_mean_by_window(
+            pd.DataFrame(mfi[:, None] * flows[:, 1], index=index), flows[:, 0])
+        self._money_flow = pd.DataFrame(
+            rsi.to_numpy()[:, flow_column] - self._parameter("rsiMFIPosY"),
+            index=index,
+            columns=self.columns
+        )
+
+    def wave_1(self) -> pd.DataFrame:
+        """VMC Wave 1
+
+        Returns:
+            pandas.DataFrame: New feature generated.
+        """
+        return self._wt1
+
+    def wave_2(self) -> pd.DataFrame:
+        """VMC Wave 2
+
+        Returns:
+            pandas.DataFrame: New feature generated.
+        """
+        return self._wt2
+
+    def money_flow(self) -> pd.DataFrame:
+        """VMC Money Flow
+
+        Returns:
+            pandas.DataFrame: New feature generated.
+        """
+        return self._money_flow
+
+
+class SuperTrendBatch():
+    """ SuperTrend for several parameter sets in one pass
+
+        The true range is computed once and the ATR once per distinct atr_window,
+        every accessor returns a dataframe with one column per parameter set.
+    """
+
+    def __init__(
+        self,
+        high,
+        low,
+        close,
+        atr_window=[10],
+        atr_multi=[3]
+    ):
+        self.high = high
+        self.low = low
+        self.close = close
+        self.columns = _batch_columns(atr_window=atr_window, atr_multi=atr_multi)
+        self.atr_window = self.columns.get_level_values("atr_window").to_numpy()
+        self.atr_multi = self.columns.get_level_values("atr_multi").to_numpy()
+        self._run()
+
+    def _run(self):
+        # calculate ATR
+        price_diffs = [self.high - self.low,
+                    self.high - self.close.shift(),
+                    self.close.shift() - self.low]
+        true_range = pd.concat(price_diffs, axis=1)
+        true_range = true_range.abs().max(axis=1)
+        windows, window_column = _unique_parameters(self.atr_window)
+        atr = np.column_stack([
+            true_range.ewm(alpha=1/window, min_periods=window).mean().to_numpy()
+            for window in windows[:, 0]
+        ])
+
+        hl2 = ((self.high + self.low) / 2).to_numpy(dtype=float)
+        upperband = hl2[:, None] + (self.atr_multi * atr[:, window_column])
+        lowerband = hl2[:, None] - (self.atr_multi * atr[:, window_column])
+
+        close = self.close.to_numpy(dtype=float)
+        supertrend = np.empty(upperband.shape, dtype=bool)
+        final_lowerband = np.empty(upperband.shape)
+        final_upperband = np.empty(upperband.shape)
+        for j in range(len(self.columns)):
+            supertrend[:, j], final_lowerband[:, j], final_upperband[:, j] = _supertrend_kernel(
+                close, upperband[:, j], lowerband[:, j])
+
+        self.st = {
+            'Supertrend': pd.DataFrame(supertrend, index=self.close.index, columns=self.columns),
+            'Final Lowerband': pd.DataFrame(final_lowerband, index=self.close.index, columns=self.columns),
+            'Final Upperband': pd.DataFrame(final_upperband, index=self.close.index, columns=self.columns)
+        }
+
+    def super_trend_upper(self):
+        return self.st['Final Upperband']
+
+    def super_trend_lower(self):
+        return self.st['Final Lowerband']
+
+    def super_trend_direction(self):
+        return self.st['Supertrend']
+
+
+class BollingerBandsBatch():
+    """ Bollinger Bands for several parameter sets in one pass
+
+        The moving average and standard deviation are computed once per distinct
+        window, every accessor returns a dataframe with one column per parameter set.
+
+        Args:
+            close(pd.Series): dataframe 'close' columns,
+            window(list[int]): n period,
+            window_dev(list[float]): n factor standard deviation
+    """
+
+    def __init__(
+        self,
+        close: pd.Series,
+        window=[20],
+        window_dev=[2]
+    ):
+        self._close = close
+        self.columns = _batch_columns(window=window, window_dev=window_dev)
+        self._window = self.columns.get_level_values("window").to_numpy()
+        self._window_dev = self.columns.get_level_values("window_dev").to_numpy()
+        self._run()
+
+    def _run(self):
+        windows, window_column = _unique_parameters(self._window)
+        rolling = [self._close.rolling(int(window), min_periods=int(window)) for window in windows[:, 0]]
+        mavg = np.column_stack([r.mean().to_numpy() for r in rolling])[:, window_column]
+        mstd = np.column_stack([r.std(ddof=0).to_numpy() for r in rolling])[:, window_column]
+        self._mavg = pd.DataFrame(mavg, index=self._close.index, columns=self.columns)
+        self._hband = pd.DataFrame(
+            mavg + self._window_dev * mstd, index=self._close.index, columns=self.columns)
+        self._lband = pd.DataFrame(
+            mavg - self._window_dev * mstd, index=self._close.index, columns=self.columns)
+
+    def bollinger_mavg(self) -> pd.DataFrame:
+        """ Bollinger Channel Middle Band
+
+            Returns:
+                pd.DataFrame: bollinger middle band
+        """
+        return self._mavg
+
+    def bollinger_hband(self) -> pd.DataFrame:
+        """ Bollinger Channel High Band
+
+            Returns:
+                pd.DataFrame: bollinger high band
+        """
+        return self._hband
+
+    def bollinger_lband(self) -> pd.DataFrame:
+        """ Bollinger Channel Low Band
+
+            Returns:
+                pd.DataFrame: bollinger low band
+        """
+        return self._lband
+
+    def bollinger_wband(self) -> pd.DataFrame:
+        """ Bollinger Channel Band Width
+
+            Returns:
+                pd.DataFrame: bollinger band width
+        """
+        return ((self._hband - self._lband) / self._mavg) * 100
+
+    def bollinger_pband(self) -> pd.DataFrame:
+        """ Bollinger Channel Percentage Band
+
+            Returns:
+                pd.DataFrame: bollinger percentage band
+        """
+        close = self._close.to_numpy(dtype=float)[:, None]
+        return (close - self._lband) / (self._hband - self._lband).where(
+            self._hband != self._lband, np.nan)
+
+
+def get_pivots(values, window=3):
+    """ Swing tops and bottoms: a value is a top (bottom) if none of the window values
+        before and after it are higher (lower), missing values never make a pivot
+
+        Args:
+            values(pd.Series): series to analyse,
+            window(int): number of candles checked on each side
+
+        Returns:
+            tuple(np.ndarray, np.ndarray): boolean top and bottom masks
+    """
+    values = np.asarray(values, dtype=float)
+    padded = np.concatenate([np.full(window, np.nan), values, np.full(window, np.nan)])
+    neighbours = np.lib.stride_tricks.sliding_window_view(padded, 2 * window + 1)
+    with np.errstate(invalid='ignore'):
+        top = ~(neighbours > values[:, None]).any(axis=1)
+        bottom = ~(neighbours < values[:, None]).any(axis=1)
+    valid = ~np.isnan(values)
+    return top & valid, bottom & valid
+
+
+def get_min_max(df, column_name, candle_min_window=3):
+    """ Same as the get_min_max of the divergence notebook: adds the
+        column_name_top and column_name_bottom columns (1 on pivots, else 0)
+    """
+    dt = df.copy()
+    top, bottom = get_pivots(dt[column_name], candle_min_window)
+    dt[column_name+"_top"] = top.astype(int)
+    dt[column_name+"_bottom"] = bottom.astype(int)
+    return dt
+
+
+@njit
+def _divergence_kernel(iloc, values, max_period_check, min_window_diff):
+    # for each pivot, keeps the next pivots (within max_period_check candles)
+    # whose slope from it is not below the slope of any pivot before them
+    count = 0
+    start = np.empty(0, dtype=np.int64)
+    end = np.empty(0, dtype=np.int64)
+    for fill in range(2):
+        if fill:
+            start = np.empty(count, dtype=np.int64)
+            end = np.empty(count, dtype=np.int64)
+            count = 0
+        for i in range(len(iloc)):
+            min_scope = -1000000.0
+            for j in range(i + 1, len(iloc)):
+                if iloc[i] + max_period_check < iloc[j]:
+                    break
+                scope = (values[j] - values[i]) / (iloc[j] - iloc[i])
+                if iloc[j] - iloc[i] < min_window_diff:
+                    min_scope = scope
+                elif scope >= min_scope:
+                    min_scope = scope
+                    if fill:
+                        start[count] = i
+                        end[count] = j
+                    count += 1
+    return start, end
+
+
+class Divergence():
+    """ Divergences between an indicator and the price
+
+        The pivots of the indicator are joined to the next pivots that are not hidden
+        behind a steeper line (the trend line of the indicator), as in the divergence
+        notebook. Each pivot only looks max_period_check candles ahead, so the scan is
+        linear in the number of candles.
+
+        Args:
+            price(pd.Series): dataframe 'close' columns,
+            indicator(pd.Series): indicator compared with the price (ex: macd_diff),
+            window(int): number of candles on each side of a pivot,
+            max_period_check(int): maximum number of candles between two pivots,
+            min_window_diff(int): minimum number of candles between two pivots,
+            concordance(bool): both ends must also be pivots of the price
+    """
+
+    def __init__(
+        self,
+        price,
+        indicator,
+        window=3,
+        max_period_check=100,
+        min_window_diff=10,
+        concordance=True
+    ):
+        self.price = price
+        self.indicator = indicator
+        self.window = window
+        self.max_period_check = max_period_check
+        self.min_window_diff = min_window_diff
+        self.concordance = concordance
+        self._run()
+
+    def _run(self):
+        price = self.price.to_numpy(dtype=float)
+        indicator = self.indicator.to_numpy(dtype=float)
+        price_top, price_bottom = get_pivots(price, self.window)
+        indicator_top, indicator_bottom = get_pivots(indicator, self.window)
+        self._top = self._scopes(price, indicator, indicator_top, price_top, 1)
+        self._bottom = self._scopes(price, indicator, indicator_bottom, price_bottom, -1)
+
+    def _scopes(self, price, indicator, pivots, price_pivots, sign):
+        iloc = np.flatnonzero(pivots)
+        start, end = _divergence_kernel(
+            iloc, sign * indicator[iloc], self.max_period_check, self.min_window_diff)
+        start, end = iloc[start], iloc[end]
+        if self.concordance:
+            keep = price_pivots[start] & price_pivots[end]
+            start, end = start[keep], end[keep]
+        return pd.DataFrame({
+            'start_date': self.price.index[start],
+            'end_date': self.price.index[end],
+            'start_iloc': start,
+            'end_iloc': end,
+            'start_value': price[start],
+            'end_value': price[end],
+            'scope': (price[end] - price[start]) / (end - start),
+            'start_indicator_value': indicator[start],
+            'end_indicator_value': indicator[end],
+            'indicator_scope': (indicator[end] - indicator[start]) / (end - start)
+        })
+
+    def _signal(self, divergences):
+        # a pivot is only known window candles after it
+        signal = np.zeros(len(self.price), dtype=bool)
+        detection = divergences['end_iloc'].to_numpy() + self.window
+        signal[detection[detection < len(signal)]] = True
+        return pd.Series(signal, index=self.price.index)
+
+    def top_divergences(self):
+        """ Lines between tops, price 'scope' and indicator 'indicator_scope' slopes
+
+        Returns:
+            pandas.DataFrame: New feature generated.
+        """
+        return self._top
+
+    def bottom_divergences(self):
+        """ Lines between bottoms, price 'scope' and indicator 'indicator_scope' slopes
+
+        Returns:
+            pandas.DataFrame: New feature generated.
+        """
+        return self._bottom
+
+    def bullish_divergence(self):
+        """ True on the candle a bottom where the price goes down and the indicator up is detected
+
+        Returns:
+            pandas.Series: New feature generated.
+        """
+        bottom = self._bottom
+        return self._signal(bottom.loc[(bottom['scope'] < 0) & (bottom['indicator_scope'] > 0)])
+
+    def bearish_divergence(self):
+        """ True on the candle a top where the price goes up and the indicator down is detected
+
+        Returns:
+            pandas.Series: New feature generated.
+        """
+        top = self._top
+        return self._signal(top.loc[(top['scope'] > 0) & (top['indicator_scope'] < 0)])
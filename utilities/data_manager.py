@@ -4,12 +4,18 @@ from pathlib import Path
 import ccxt.async_support as ccxt
 import pytz
 import pandas as pd
+import numpy as np
 import os
 from datetime import datetime, timedelta
 from tqdm.auto import tqdm
 import itertools
+import collections
 import timeit
 import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from utilities.ohlcv_store import OhlcvStore
+from utilities.panel import align_pairs
 
 
 class ExchangeDataManager:
@@ -19,34 +25,42 @@ class ExchangeDataManager:
         "binance": {
             "ccxt_object": ccxt.binance(config={"enableRateLimit": True}),
             "limit_size_request": 1000,
+            "max_concurrent_requests": 8,
         },
         "binanceusdm": {
             "ccxt_object": ccxt.binanceusdm(config={"enableRateLimit": True}),
             "limit_size_request": 1000,
+            "max_concurrent_requests": 8,
         },
         "kucoin": {
             "ccxt_object": ccxt.kucoin(config={"enableRateLimit": True}),
             "limit_size_request": 1500,
+            "max_concurrent_requests": 4,
         },
         "hitbtc": {
             "ccxt_object": ccxt.hitbtc(config={"enableRateLimit": True}),
             "limit_size_request": 1000,
+            "max_concurrent_requests": 4,
         },
         "bitfinex": {
             "ccxt_object": ccxt.bitfinex(config={"enableRateLimit": True}),
             "limit_size_request": 10000,
+            "max_concurrent_requests": 2,
         },
         "bybit": {
             "ccxt_object": ccxt.bybit(config={"enableRateLimit": True}),
             "limit_size_request": 200,
+            "max_concurrent_requests": 4,
         },
         "bitget": {
             "ccxt_object": ccxt.bitget(config={"enableRateLimit": True}),
             "limit_size_request": 100,
+            "max_concurrent_requests": 4,
         },
         "bitmart": {
             "ccxt_object": ccxt.bitmart(config={"enableRateLimit": True}),
-            "limit_size_request": 500,     
+            "limit_size_request": 500,
+            "max_concurrent_requests": 4,
         }
     }
 
@@ -93,7 +107,8 @@ class ExchangeDataManager:
             ).resolve()
         )
         os.makedirs(self.path_data, exist_ok=True)
-        self.pbar = None
+        self.store = OhlcvStore(self.path_data, self.intervals_dict)
+        self.limiter = None
 
     def load_data(
         self, coin, interval, start_date="1990", end_date="2050"
@@ -106,18 +121,155 @@ class ExchangeDataManager:
             :param end_date: end date (default 2050)
             :return pd.DataFrame
         """
-        file_path = f"{self.path_data}/{interval}/"
-        file_name = f"{file_path}{coin.replace('/', '-')}.csv"
-        if not os.path.exists(file_name):
-            raise FileNotFoundError(f"Le fichier {file_name} n'existe pas")
+        return OhlcvStore.to_frame(
+            self.load_arrays(coin, interval, start_date, end_date)
+        )
+
+    def load_arrays(
+        self, coin, interval, start_date="1990", end_date="2050"
+    ) -> dict:
+        """This method load the market data between 2 dates as memory-mapped arrays
+
+            Only the requested window is read from disk and the arrays are zero-copy
+            views on the files, so memory and latency scale with the window size.
+
+            :param coin: symbol (ex: BTCUSDT)
+            :param interval: interval between each point of data (ex: 1h)
+            :param start_date: starting date (default 1990)
+            :param end_date: end date (default 2050)
+            :return dict of read-only np.ndarray (date in ms, open, high, low, close, volume)
+
+            An interval that was never downloaded is built from a smaller stored one
+            (see resample_data), so load_data(coin, "4h") works with only 1h data.
+        """
+        if self.store.csv_is_newer(coin, interval):
+            self.store.migrate_csv(coin, interval)
+        meta = self.store.get_meta(coin, interval)
+        if meta is None or "source" in meta:
+            # interval not downloaded, build it from a smaller stored one
+            self.resample_data(coin, interval)
+
+        columns = self.store.read_range(
+            coin,
+            interval,
+            OhlcvStore.date_to_ms(start_date),
+            OhlcvStore.date_to_ms(end_date, end=True),
+        )
+        # the last candle of the window may still be open
+        return {column: values[:-1] for column, values in columns.items()}
+
+    def load_panel(
+        self, coins, interval, start_date="1990", end_date="2050", max_workers=8
+    ) -> dict:
+        """This method load many pairs in parallel threads, aligned on one date index
+
+            Replaces the df_list loops of the multi pairs notebooks: every field is a
+            (time x pair) array on the union of the dates, with masks of the rows each
+            pair really has and of its listing period.
+
+            :param coins: list of symbols (ex: [BTC/USDT, ETH/USDT])
+            :param interval: interval between each point of data (ex: 1h)
+            :param start_date: starting date (default 1990)
+            :param end_date: end date (default 2050)
+            :param max_workers: number of pairs loaded at the same time (default 8)
+            :return dict with 'index' (pd.DatetimeIndex), 'pairs' (list), 'open', 'high', 'low',
+                'close', 'volume' ((time x pair) np.ndarray, nan when missing), 'valid' (candle
+                stored), 'listed' (after the first candle of the pair), 'oldest_pair' and
+                'df_list' (pair -> pd.DataFrame, as loaded by load_data)
+        """
+        def load(coin):
+            try:
+                return self.load_data(coin, interval, start_date, end_date)
+            except FileNotFoundError:
+                return None
+
+        coins = list(coins)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(load, coins))
+        df_list = {
+            coin: df for coin, df in zip(coins, frames) if df is not None and len(df) > 0
+        }
+        for coin in coins:
+            if coin not in df_list:
+                print(f"Aucune donnée pour la paire {coin} en timeframe {interval}")
+        if not df_list:
+            raise ValueError(f"Aucune donnée en timeframe {interval}")
+
+        fields = [column for column in OhlcvStore.COLUMNS if column != "date"]
+        index, pairs, panel, valid = align_pairs(df_list, fields)
+        first_rows = valid.argmax(axis=0)
+        return {
+            "index": index,
+            "pairs": pairs,
+            **panel,
+            "valid": valid,
+            "listed": np.arange(len(index))[:, None] >= first_rows,
+            "oldest_pair": pairs[int(first_rows.argmin())],
+            "df_list": df_list,
+        }
+
+    def resample_data(self, coin, interval, base_interval=None) -> int:
+        """This method build the candles of an interval from a smaller stored interval
+
+            The result is cached in the store and only the candles after the last cached
+            one are rebuilt when the base interval grows.
 
-        df = pd.read_csv(file_name, index_col=0, parse_dates=True)
-        df.index = pd.to_datetime(df.index, unit="ms")
-        df = df.groupby(df.index).first()
-        df = df.loc[start_date:end_date]
-        df = df.iloc[:-1]
+            :param coin: symbol (ex: BTC/USDT)
+            :param interval: interval to build (ex: 4h)
+            :param base_interval: interval to build from (default: the biggest stored one that fits)
+            :return number of candles stored for interval
+        """
+        meta = self.store.get_meta(coin, interval)
+        if base_interval is None:
+            if meta is not None and "source" in meta:
+                base_interval = meta["source"]
+            else:
+                base_interval = self.find_base_interval(coin, interval)
+        if base_interval is None:
+            raise FileNotFoundError(
+                f"Le fichier {self.store.pair_path(coin, interval)} n'existe pas"
+            )
+        if not self.store.can_resample(base_interval, interval):
+            raise ValueError(f"Impossible de construire {interval} à partir de {base_interval}")
 
-        return df
+        base_meta = self.store.get_meta(coin, base_interval)
+        source_meta = {key: base_meta[key] for key in ("first", "last", "gaps")}
+        cached = (
+            meta is not None and meta.get("source") == base_interval and meta["rows"] > 0
+        )
+        if cached and meta["source_meta"] == source_meta:
+            return meta["rows"]
+
+        previous_source = meta["source_meta"] if cached else None
+        if (
+            previous_source is not None
+            and previous_source["first"] == source_meta["first"]
+            and source_meta["gaps"][:len(previous_source["gaps"])] == previous_source["gaps"]
+        ):
+            # the base only grew at the end, rebuild from the last cached candle
+            base = self.store.read_range(coin, base_interval, start_ms=meta["last"])
+            rows = self.store.append(coin, interval, self.store.resample(base, interval))
+        else:
+            base = self.store.read(coin, base_interval, mmap=True)
+            rows = self.store.write(coin, interval, self.store.resample(base, interval))
+
+        meta = self.store.get_meta(coin, interval)
+        meta.update(source=base_interval, source_meta=source_meta)
+        self.store.write_meta(coin, interval, meta)
+        return rows
+
+    def find_base_interval(self, coin, interval) -> str | None:
+        """Return the biggest downloaded interval of a pair that interval can be built from"""
+        candidates = []
+        for base_interval in self.intervals_dict:
+            if base_interval == interval or not self.store.can_resample(base_interval, interval):
+                continue
+            meta = self.store.get_meta(coin, base_interval)
+            if meta is not None and meta["rows"] > 0 and "source" not in meta:
+                candidates.append(base_interval)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda base: self.intervals_dict[base]["interval_ms"])
 
     async def download_data(
         self,
@@ -125,6 +277,8 @@ class ExchangeDataManager:
         intervals,
         start_date="2017-01-01 00:00:00",
         end_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        fill_gaps=True,
+        max_jobs=4,
     ) -> None:
         """This method download the market data between 2 dates
 
@@ -132,117 +286,291 @@ class ExchangeDataManager:
             :param intervals: list of intervals between each point of data (ex: [1h, 1w])
             :param start_date: starting date (ex:  2020-01-01 00:00:00) (default: "2017-01-01 00:00:00")
             :param end_date: end date (ex: 2023-01-01 01:00:00) (default: current timestamp)
+            :param fill_gaps: also request the candles missing in the middle of the history (default: True)
+            :param max_jobs: number of (coin, interval) downloaded at the same time (default: 4)
             :return None
         """
+        await ExchangeDataManager.download_many(
+            [(self, coin, interval) for interval in intervals for coin in coins],
+            start_date=start_date,
+            end_date=end_date,
+            fill_gaps=fill_gaps,
+            max_jobs=max_jobs,
+        )
+
+    @staticmethod
+    async def download_many(
+        jobs,
+        start_date="2017-01-01 00:00:00",
+        end_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        fill_gaps=True,
+        max_jobs=8,
+    ) -> None:
+        """This method download many (exchange, coin, interval) at the same time
 
-        await self.exchange.load_markets()
+            Requests are bounded per exchange by a RateLimiter built from CCXT_EXCHANGES,
+            so jobs on different exchanges never slow each other down.
+
+            :param jobs: list of (ExchangeDataManager, coin, interval)
+            :param start_date: starting date (ex:  2020-01-01 00:00:00) (default: "2017-01-01 00:00:00")
+            :param end_date: end date (ex: 2023-01-01 01:00:00) (default: current timestamp)
+            :param fill_gaps: also request the candles missing in the middle of the history (default: True)
+            :param max_jobs: number of jobs running at the same time (default: 8)
+            :return None
 
+            If a job fails, the other ones are cancelled before the exchanges are closed
+            and the error is raised.
+        """
         start_date = datetime.strptime(start_date, "%Y-%m-%d %H:%M:%S")
         end_date = datetime.strptime(end_date, "%Y-%m-%d %H:%M:%S")
-   
 
-        for interval in intervals:
+        # the ccxt objects are shared by every manager of the same exchange
+        managers = {manager.exchange_name: manager for manager, coin, interval in jobs}
+        limiters = {name: manager.create_limiter() for name, manager in managers.items()}
+        for manager, coin, interval in jobs:
+            manager.limiter = limiters[manager.exchange_name]
 
-            all_dt_intervals = list(
-                self.create_intervals(
-                    start_date, end_date, self.create_timedelta(interval)
-                )
+        try:
+            await gather_tasks(
+                [asyncio.create_task(manager.exchange.load_markets()) for manager in managers.values()]
             )
-   
-            last_dt = all_dt_intervals[-1].astimezone(pytz.utc)
-            end_timestamp = int(last_dt.timestamp() * 1000)
-          
-            for coin in coins:
-                print(
-                    f"\tRécupération pour la paire {coin} en timeframe {interval} sur l'exchange {self.exchange_name}..."
-                )
-
-                file_path = f"{self.path_data}/{interval}/"
-                os.makedirs(file_path, exist_ok=True)
-                file_name = f"{file_path}{coin.replace('/', '-')}.csv"
-
-                dt_or_false = await self.is_data_missing(file_name, last_dt, str(start_date))
-                
-                if dt_or_false:
-
-                    tasks = []
-                    current_timestamp = int(dt_or_false.timestamp() * 1000)
-                    turn = 0
-                 
-                    while current_timestamp <= end_timestamp:
-                        tasks.append(
-                            asyncio.create_task(
-                                self.download_tf(coin, interval, current_timestamp)
-                            )
-                        )
-                        current_timestamp = (
-                            self.exchange_dict["limit_size_request"]
-                            * self.intervals_dict[interval]["interval_ms"]
-                            + current_timestamp
-                        )
+            await gather_bounded(
+                [
+                    manager.download_pair(coin, interval, start_date, end_date, fill_gaps)
+                    for manager, coin, interval in jobs
+                ],
+                max_jobs,
+            )
+        finally:
+            await asyncio.gather(*(manager.exchange.close() for manager in managers.values()))
 
-                    self.pbar = tqdm(tasks)
-                    results = await asyncio.gather(*tasks)
-                    await self.exchange.close()
-                  
-                    results = list(itertools.chain(*results))
-               
-                    self.pbar.close()
-
-                    if results:
-                        final = pd.DataFrame(
-                            results,
-                            columns=["date", "open", "high", "low", "close", "volume"],
-                        )
-                        final.set_index('date', drop=False, inplace=True)
-                        final = final[~final.index.duplicated(keep='first')]
-                        
-                        
-                        flag_header = (
-                            ("a", False) if os.path.exists(file_name) else ("w", True)
+    async def download_pair(self, coin, interval, start_date, end_date, fill_gaps=True) -> None:
+        delta = self.create_timedelta(interval)
+        last_dt = (start_date + ((end_date - start_date) // delta) * delta).astimezone(pytz.utc)
+        end_timestamp = int(last_dt.timestamp() * 1000)
+
+        print(
+            f"\tRécupération pour la paire {coin} en timeframe {interval} sur l'exchange {self.exchange_name}..."
+        )
+
+        meta = self.store.get_meta(coin, interval)
+        if meta is not None and "source" in meta:
+            # replace the candles built by resample_data with the exchange ones
+            self.store.delete(coin, interval)
+
+        dt_or_false = await self.is_data_missing(coin, interval, last_dt, str(start_date))
+
+        if dt_or_false:
+
+            step = (
+                self.exchange_dict["limit_size_request"]
+                * self.intervals_dict[interval]["interval_ms"]
+            )
+            timestamps = range(int(dt_or_false.timestamp() * 1000), end_timestamp + 1, step)
+            rows = await self.download_chunks(coin, interval, timestamps)
+
+            if not rows:
+                print(f"\tPas de données pour {coin} en {interval} sur cette période")
+        else:
+            print(f"\tDonnées déjà récupérées pour {coin} en {interval}")
+
+        if fill_gaps:
+            await self.backfill_gaps(coin, interval)
+
+    async def download_chunks(self, coin, interval, timestamps, gap=None) -> int:
+        """This method download consecutive chunks and stream them to the store
+
+            Only a bounded window of chunks is requested at the same time, and each
+            chunk is saved as soon as every earlier one is persisted, so memory stays
+            bounded and the sidecar always points to the last saved chunk: after a crash
+            is_data_missing (or the remaining gaps) resumes from there.
+
+            :param timestamps: sorted start timestamps of the chunks in ms
+            :param gap: [first ms, last ms] of a gap to fill: only the candles inside it
+                are kept and merged with the stored ones (default: append the chunks)
+            :return number of candles saved
+        """
+        window = 2 * self.exchange_dict["max_concurrent_requests"]
+        timestamps = iter(timestamps)
+        pending = collections.deque(
+            asyncio.create_task(self.download_tf(coin, interval, timestamp))
+            for timestamp in itertools.islice(timestamps, window)
+        )
+        pbar = tqdm(desc=f"{coin} {interval}")
+        rows = 0
+        try:
+            while pending:
+                task = pending.popleft()
+                next_timestamp = next(timestamps, None)
+                if next_timestamp is not None:
+                    pending.append(
+                        asyncio.create_task(self.download_tf(coin, interval, next_timestamp))
+                    )
+                chunk = await task
+                if chunk and gap is None:
+                    self.store.append(coin, interval, chunk)
+                    rows += len(chunk)
+                elif chunk:
+                    new = self.store.prepare(chunk)
+                    inside = (new["date"] >= gap[0]) & (new["date"] <= gap[1])
+                    if inside.any():
+                        self.store.merge(
+                            coin, interval, {column: values[inside] for column, values in new.items()}
                         )
-                        with open(file_name, mode=flag_header[0]) as f:
-                            final.to_csv(
-                                path_or_buf=f, header=flag_header[1], index=False
-                            )
-                    else:
-                        print(f"\tPas de données pour {coin} en {interval} sur cette période")
+                        rows += int(inside.sum())
+                pbar.update(1)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            pbar.close()
+        return rows
+
+    async def backfill_gaps(self, coin, interval) -> int:
+        """This method request only the missing spans recorded in the sidecar of a pair
+
+            Gaps are filled one after the other, each through the bounded window of
+            download_chunks, and marked as checked once done: the spans the exchange has
+            no data for are skipped next time, and an interrupted backfill resumes from
+            the chunks already merged.
+
+            :param coin: symbol (ex: BTC/USDT)
+            :param interval: interval between each point of data (ex: 1h)
+            :return number of candles recovered
+        """
+        meta = self.store.get_meta(coin, interval)
+        if meta is None:
+            return 0
+        gaps = [gap for gap in meta["gaps"] if gap not in meta["checked_gaps"]]
+        if not gaps:
+            return 0
+
+        print(f"\tComblement de {len(gaps)} trou(s) pour {coin} en {interval}...")
+        step = (
+            self.exchange_dict["limit_size_request"]
+            * self.intervals_dict[interval]["interval_ms"]
+        )
+        recovered = 0
+        for start, end in gaps:
+            recovered += await self.download_chunks(
+                coin, interval, range(start, end + 1, step), gap=[start, end]
+            )
+            # what is still missing in the span is not on the exchange
+            meta = self.store.get_meta(coin, interval)
+            meta["checked_gaps"] += [
+                gap
+                for gap in meta["gaps"]
+                if gap not in meta["checked_gaps"] and gap[0] <= end and gap[1] >= start
+            ]
+            self.store.write_meta(coin, interval, meta)
+        return recovered
+
+    def scan_gaps(self, coins=None, intervals=None, refresh=False) -> pd.DataFrame:
+        """This method list the missing candles of the stored pairs
+
+            :param coins: list of symbols to check (default: every stored pair)
+            :param intervals: list of intervals to check (default: every stored interval)
+            :param refresh: rescan the date columns instead of trusting the sidecars (default: False)
+            :return pd.DataFrame with one row per gap
+        """
+        gaps_data = []
+        if intervals is None:
+            intervals = sorted(
+                name for name in os.listdir(self.path_data)
+                if os.path.isdir(os.path.join(self.path_data, name))
+            )
+        for interval in intervals:
+            if coins is None:
+                interval_path = os.path.join(self.path_data, interval)
+                pairs = sorted(os.listdir(interval_path)) if os.path.isdir(interval_path) else []
+            else:
+                pairs = [coin.replace("/", "-") for coin in coins]
+            for pair in pairs:
+                if not self.store.exists(pair, interval):
+                    continue
+                if refresh:
+                    meta = self.store.refresh_meta(pair, interval)
                 else:
-                    print("\tDonnées déjà récupérées")
+                    meta = self.store.get_meta(pair, interval)
+                for start, end in meta["gaps"]:
+                    gaps_data.append(
+                        {
+                            "timeframe": interval,
+                            "pair": pair,
+                            "start_date": pd.to_datetime(start, unit="ms"),
+                            "end_date": pd.to_datetime(end, unit="ms"),
+                            "missing": (end - start) // self.intervals_dict[interval]["interval_ms"] + 1,
+                            "checked": [start, end] in meta["checked_gaps"],
+                        }
+                    )
+        return pd.DataFrame(
+            gaps_data,
+            columns=["timeframe", "pair", "start_date", "end_date", "missing", "checked"],
+        )
 
-                #print("\033[H\033[J", end="")
+    def create_limiter(self) -> "RateLimiter":
+        return RateLimiter(
+            max_concurrent=self.exchange_dict["max_concurrent_requests"],
+            rate=1000 / self.exchange.rateLimit,
+        )
 
-    async def download_tf(self, coin, interval, start_timestamp) -> list:
+    async def download_tf(self, coin, interval, start_timestamp, max_retries=6) -> list:
+        if self.limiter is None:
+            self.limiter = self.create_limiter()
         tests = 0
         while True:
             try:
-                r = await self.exchange.fetch_ohlcv(
-                    symbol=coin,
-                    timeframe=interval,
-                    since=start_timestamp,
-                    limit=self.exchange_dict["limit_size_request"],
-                )
-                self.pbar.update(1)
-                return r
+                async with self.limiter:
+                    return await self.exchange.fetch_ohlcv(
+                        symbol=coin,
+                        timeframe=interval,
+                        since=start_timestamp,
+                        limit=self.exchange_dict["limit_size_request"],
+                    )
+            except ccxt.BadRequest:
+                # unknown symbol or timeframe, retrying will not help
+                raise
             except Exception:
                 tests += 1
-                if tests == 3:
+                if tests == max_retries:
                     raise TooManyError
+                # exponential backoff with jitter: ~1s, 2s, 4s... capped at 60s
+                await asyncio.sleep(min(60, 2 ** (tests - 1)) * random.uniform(0.5, 1))
 
-    async def is_data_missing(self, file_name, last_dt, start_date) -> bool | datetime:
-
-        await self.exchange.close()
+    async def is_data_missing(self, coin, interval, last_dt, start_date) -> bool | datetime:
 
-        if os.path.isfile(file_name):
-            df = pd.read_csv(file_name, index_col=0, parse_dates=True)
-            df.index = pd.to_datetime(df.index, unit="ms")
-            df = df.groupby(df.index).first()
+        if self.store.csv_is_newer(coin, interval):
+            self.store.migrate_csv(coin, interval)
 
-            if pytz.utc.localize(df.index[-1]) >= last_dt:
+        meta = self.store.get_meta(coin, interval)
+        if meta is not None:
+            if meta["rows"] == 0:
+                return datetime.fromisoformat(start_date)
+            # the last stored candle may have been saved while still open
+            last_stored = datetime.fromtimestamp(meta["last"] / 1000, tz=pytz.utc)
+            if last_stored >= last_dt:
                 return False
-        else:
-            return datetime.fromisoformat(start_date)
-        return pytz.utc.localize(df.index[-2])
+            return last_stored
+        return datetime.fromisoformat(start_date)
+
+    def migrate_csv(self, remove_csv=False) -> pd.DataFrame:
+        """This method convert every legacy {interval}/{pair}.csv file of the exchange to the binary store
+
+            :param remove_csv: delete each csv file once converted (default False)
+            :return pd.DataFrame with the number of rows converted per file
+        """
+        migrated = []
+        for interval in sorted(os.listdir(self.path_data)):
+            interval_path = os.path.join(self.path_data, interval)
+            if not os.path.isdir(interval_path):
+                continue
+            for name in sorted(os.listdir(interval_path)):
+                if not name.endswith(".csv"):
+                    continue
+                coin = name[:-4]
+                rows = self.store.migrate_csv(coin, interval, remove_csv=remove_csv)
+                migrated.append({"timeframe": interval, "pair": coin, "rows": rows})
+        return pd.DataFrame(migrated)
 
     def create_intervals(self, start_date, end_date, delta):
         current = start_date
@@ -258,33 +586,101 @@ class ExchangeDataManager:
 
     def explore_data(self) -> pd.DataFrame:
         files_data = []
-        for path, subdirs, files in os.walk(self.path_download):
-            for name in files:
-                if os.path.join(path, name).endswith(".csv"):
-                    current_file = os.path.join(path, name)
-                    file_split = current_file.split("\\")
-                    try:
-                        df_file = pd.read_csv(current_file)
-                    except Exception:
-                        continue
-
-                    files_data.append(
-                        {
-                            "exchange": file_split[1],
-                            "timeframe": file_split[2],
-                            "pair": file_split[3][:-4],
-                            "occurences": len(df_file),
-                            "start_date": str(
-                                datetime.fromtimestamp(df_file.iloc[0]["date"] / 1000)
-                            ),
-                            "end_date": str(
-                                datetime.fromtimestamp(df_file.iloc[-1]["date"] / 1000)
-                            ),
-                        }
-                    )
+        path_exchanges = dirname(self.path_data)
+        for path, subdirs, files in os.walk(path_exchanges):
+            if "date.bin" not in files:
+                continue
+            exchange_name, interval, pair = os.path.relpath(path, path_exchanges).split(os.sep)[-3:]
+            try:
+                meta = OhlcvStore(
+                    os.path.join(path_exchanges, exchange_name), self.intervals_dict
+                ).get_meta(pair, interval)
+            except Exception:
+                continue
+            if meta is None or meta["rows"] == 0:
+                continue
+
+            files_data.append(
+                {
+                    "exchange": exchange_name,
+                    "timeframe": interval,
+                    "pair": pair,
+                    "occurences": meta["rows"],
+                    "start_date": str(datetime.fromtimestamp(meta["first"] / 1000)),
+                    "end_date": str(datetime.fromtimestamp(meta["last"] / 1000)),
+                    "gaps": len(meta["gaps"]),
+                }
+            )
 
         return pd.DataFrame(files_data)
 
 
+class RateLimiter:
+    """Per exchange request limiter: a semaphore bounding the requests in flight
+       and a token bucket bounding the request rate
+
+       Args:
+           max_concurrent (int): maximum number of requests in flight
+           rate (float): sustained number of requests per second
+    """
+
+    def __init__(self, max_concurrent, rate) -> None:
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.rate = rate
+        self.capacity = max_concurrent
+        self.tokens = max_concurrent
+        self.updated = time.monotonic()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            await self.take_token()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *args):
+        self.semaphore.release()
+
+    async def take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def gather_tasks(tasks) -> list:
+    """Same as asyncio.gather, but if a task fails (or the gather is cancelled) the
+       other tasks are cancelled and awaited before the error is raised, so none of
+       them keeps running on a closed exchange"""
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def gather_bounded(coroutines, limit) -> list:
+    """Same as gather_tasks, with at most limit coroutines running at the same time"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        try:
+            async with semaphore:
+                return await coroutine
+        finally:
+            # a job cancelled before its start is never awaited
+            coroutine.close()
+
+    return await gather_tasks([asyncio.create_task(run(coroutine)) for coroutine in coroutines])
+
+
 class TooManyError(Exception):
     pass
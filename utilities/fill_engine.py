@@ -0,0 +1,383 @@
+import numpy as np
+import pandas as pd
+
+from utilities.backtest_engine import TRADES_COLUMNS
+from utilities.jit import njit
+
+# Columns of the trade buffers filled by the kernels
+_OPEN_ROW, _CLOSE_ROW, _SIDE, _REASON, _OPEN_PRICE, _CLOSE_PRICE, _OPEN_FEE, _CLOSE_FEE, \
+    _OPEN_SIZE, _CLOSE_SIZE, _WALLET = range(11)
+TP_SL_REASONS = np.array(["Market", "Stop Loss", "Take Profit"])
+
+
+def limit_touches(high, low, levels, side):
+    """ Rows where a limit order is touched, for every level at once
+
+        Args:
+            high, low (np.ndarray): candles high and low, shape (rows,)
+            levels (np.ndarray): order prices, shape (rows, orders), NaN for no order
+            side (str): "buy" (touched when low <= level) or "sell" (high >= level)
+
+        Returns:
+            np.ndarray: boolean touches, shape (rows, orders)
+    """
+    levels = np.asarray(levels, dtype=float)
+    with np.errstate(invalid="ignore"):
+        if side == "buy":
+            return np.asarray(low, dtype=float)[:, None] <= levels
+        return np.asarray(high, dtype=float)[:, None] >= levels
+
+
+def _envelope_levels(df, name):
+    count = 0
+    while f"{name}_{count + 1}" in df:
+        count += 1
+    return df[[f"{name}_{i}" for i in range(1, count + 1)]].to_numpy(dtype=float)
+
+
+def _report_rows(index):
+    # first row of each day, as the daily reports of the notebooks loops
+    day_of_month = index.day.to_numpy()
+    return np.r_[True, day_of_month[1:] != day_of_month[:-1]] if len(index) else np.zeros(0, dtype=bool)
+
+
+@njit
+def _add_trade(trades, count, open_row, close_row, side, reason, open_price, close_price,
+               open_fee, close_fee, open_size, close_size, wallet):
+    if count == len(trades):
+        grown = np.empty((2 * len(trades), trades.shape[1]))
+        grown[:count] = trades
+        trades = grown
+    trades[count, _OPEN_ROW] = open_row
+    trades[count, _CLOSE_ROW] = close_row
+    trades[count, _SIDE] = side
+    trades[count, _REASON] = reason
+    trades[count, _OPEN_PRICE] = open_price
+    trades[count, _CLOSE_PRICE] = close_price
+    trades[count, _OPEN_FEE] = open_fee
+    trades[count, _CLOSE_FEE] = close_fee
+    trades[count, _OPEN_SIZE] = open_size
+    trades[count, _CLOSE_SIZE] = close_size
+    trades[count, _WALLET] = wallet
+    return trades
+
+
+@njit
+def _envelope_kernel(close, ma_base, ma_low, ma_high, open_long, open_short, close_long, close_short,
+                     report, initial_wallet, leverage, maker_fee, taker_fee):
+    envelopes = ma_low.shape[1]
+    wallet = initial_wallet
+    trades = np.empty((16, 11))
+    count = 0
+    days = np.empty(len(close))
+    day_count = 0
+    side = 0
+    size = 0.0
+    price = 0.0
+    position_fee = 0.0
+    envelope = 0
+    open_row = 0
+
+    for i in range(len(close)):
+        # -- Daily report --
+        if report[i]:
+            temp_wallet = wallet
+            if side != 0:
+                trade_result = side * (close[i] - price) / price
+                temp_wallet += size * trade_result
+                temp_wallet -= temp_wallet * taker_fee
+            days[day_count] = temp_wallet
+            day_count += 1
+
+        # -- Close on the base average, unless the next envelope is touched --
+        if side != 0:
+            close_signal = close_long[i] if side == 1 else close_short[i]
+            next_touched = False
+            if envelope < envelopes:
+                next_touched = open_long[i, envelope] if side == 1 else open_short[i, envelope]
+            if close_signal and not next_touched:
+                close_price = ma_base[i]
+                trade_result = side * (close_price - price) / price
+                wallet += size * trade_result
+                close_trade_size = size + (size * trade_result)
+                fee = close_trade_size * maker_fee
+                wallet -= fee
+                trades = _add_trade(trades, count, open_row, i, side, envelope, price, close_price,
+                                    position_fee, fee, size, close_trade_size, wallet)
+                count += 1
+                side = 0
+
+        # -- Open or add on each touched envelope, from the nearest one --
+        for k in range(envelopes):
+            new_side = 0
+            open_price = 0.0
+            if open_long[i, k]:
+                if side != 0 and (envelope >= k + 1 or side == -1):
+                    continue
+                new_side = 1
+                open_price = ma_low[i, k]
+            elif open_short[i, k]:
+                if side != 0 and (envelope >= k + 1 or side == 1):
+                    continue
+                new_side = -1
+                open_price = ma_high[i, k]
+            else:
+                break
+            fee = wallet * maker_fee * (1 / envelopes) * leverage
+            wallet -= fee
+            pos_size = wallet * (1 / envelopes) * leverage
+            if side != 0:
+                price = (size * price + open_price * pos_size) / (size + pos_size)
+                size = size + pos_size
+                position_fee = position_fee + fee
+            else:
+                side = new_side
+                size = pos_size
+                price = open_price
+                position_fee = fee
+                open_row = i
+            envelope = k + 1
+
+    return wallet, trades[:count], days[:day_count]
+
+
+@njit
+def _tp_sl_kernel(close, high, low, open_long, close_long, open_short, close_short, report,
+                  take_profit_pct, stop_loss_pct, initial_wallet, maker_fee, taker_fee,
+                  lower_high, lower_low, lower_start, lower_end):
+    wallet = initial_wallet
+    trades = np.empty((16, 11))
+    count = 0
+    days = np.empty(len(close))
+    day_count = 0
+    side = 0
+    size = 0.0
+    price = 0.0
+    position_fee = 0.0
+    open_row = 0
+    take_profit_price = 0.0
+    stop_loss_price = 0.0
+
+    for i in range(len(close)):
+        # -- Daily report --
+        if report[i]:
+            temp_wallet = wallet
+            if side != 0:
+                trade_result = side * (close[i] - price) / price
+                temp_wallet += temp_wallet * trade_result
+                temp_wallet -= temp_wallet * taker_fee
+            days[day_count] = temp_wallet
+            day_count += 1
+
+        if side != 0:
+            # -- Close on stop loss, take profit or signal --
+            if side == 1:
+                stop_loss_hit = stop_loss_pct > 0 and low[i] < stop_loss_price
+                take_profit_hit = take_profit_pct > 0 and high[i] > take_profit_price
+                close_signal = close_long[i]
+            else:
+                stop_loss_hit = stop_loss_pct > 0 and high[i] > stop_loss_price
+                take_profit_hit = take_profit_pct > 0 and low[i] < take_profit_price
+                close_signal = close_short[i]
+
+            # both touched in the candle: the first lower timeframe candle touching one decides,
+            # the stop loss is kept if unknown
+            if stop_loss_hit and take_profit_hit:
+                for r in range(lower_start[i], lower_end[i]):
+                    if side == 1:
+                        sub_stop_loss = lower_low[r] < stop_loss_price
+                        sub_take_profit = lower_high[r] > take_profit_price
+                    else:
+                        sub_stop_loss = lower_high[r] > stop_loss_price
+                        sub_take_profit = lower_low[r] < take_profit_price
+                    if sub_stop_loss:
+                        break
+                    if sub_take_profit:
+                        stop_loss_hit = False
+                        break
+
+            reason = -1
+            close_price = fee_rate = 0.0
+            if stop_loss_hit:
+                close_price, fee_rate, reason = stop_loss_price, taker_fee, 1
+            elif take_profit_hit:
+                close_price, fee_rate, reason = take_profit_price, maker_fee, 2
+            elif close_signal:
+                close_price, fee_rate, reason = close[i], taker_fee, 0
+            if reason >= 0:
+                trade_result = side * (close_price - price) / price
+                wallet += wallet * trade_result
+                fee = wallet * fee_rate
+                wallet -= fee
+                trades = _add_trade(trades, count, open_row, i, side, reason, price, close_price,
+                                    position_fee, fee, size, wallet, wallet)
+                count += 1
+                side = 0
+
+        # -- Open market, only if no position at the start of the row --
+        elif open_long[i] or open_short[i]:
+            side = 1 if open_long[i] else -1
+            fee = wallet * taker_fee
+            wallet -= fee
+            size = wallet
+            price = close[i]
+            position_fee = fee
+            open_row = i
+            take_profit_price = price + side * (price * take_profit_pct)
+            stop_loss_price = price - side * (price * stop_loss_pct)
+
+    return wallet, trades[:count], days[:day_count]
+
+
+def _backtest_result(df, wallet, trades, days, report, reasons, return_type):
+    open_size = trades[:, _OPEN_SIZE]
+    if return_type == "arrays":
+        trade_results = (trades[:, _CLOSE_SIZE] - open_size - trades[:, _OPEN_FEE] - trades[:, _CLOSE_FEE]) / open_size
+        return {"wallet": wallet, "equity": days, "trade_results": trade_results}
+
+    dates = df.index.to_numpy()
+    df_trades = pd.DataFrame(
+        {
+            "open_date": dates[trades[:, _OPEN_ROW].astype(int)],
+            "close_date": dates[trades[:, _CLOSE_ROW].astype(int)],
+            "position": np.where(trades[:, _SIDE] == 1, "LONG", "SHORT"),
+            "open_reason": reasons[0],
+            "close_reason": reasons[1],
+            "open_price": trades[:, _OPEN_PRICE],
+            "close_price": trades[:, _CLOSE_PRICE],
+            "open_fee": trades[:, _OPEN_FEE],
+            "close_fee": trades[:, _CLOSE_FEE],
+            "open_trade_size": open_size,
+            "close_trade_size": trades[:, _CLOSE_SIZE],
+            "wallet": trades[:, _WALLET],
+        },
+        columns=TRADES_COLUMNS,
+    )
+    df_trades = df_trades.set_index(df_trades["open_date"])
+
+    report_rows = np.flatnonzero(report)
+    df_days = pd.DataFrame(
+        {
+            "day": df.index[report_rows].normalize(),
+            "wallet": days,
+            "price": df["close"].to_numpy(dtype=float)[report_rows],
+        }
+    )
+    df_days = df_days.set_index(df_days["day"])
+
+    return {"wallet": wallet, "trades": df_trades, "days": df_days}
+
+
+def run_envelope_backtest(
+    df,
+    use_long=True,
+    use_short=True,
+    initial_wallet=1000,
+    leverage=1,
+    maker_fee=0.0002,
+    taker_fee=0.0007,
+    return_type="frames",
+):
+    """ Compiled replacement of the SaEnvelope.run_backtest loop
+
+        Consumes the ma_base, ma_low_{i} and ma_high_{i} columns of populate_indicators.
+        The touches of every envelope are resolved against the candles high and low at
+        once, then a jitted loop applies the notebook rules: each touched envelope opens
+        or adds 1 / envelopes of the wallet at its price (maker fee), and the position is
+        closed at ma_base (maker fee) when it is touched and the next envelope is not.
+
+        Args:
+            df (pd.DataFrame): dataframe indexed by date with 'high', 'low', 'close' and the envelopes
+            use_long (bool): open long positions on the ma_low_{i} envelopes
+            use_short (bool): open short positions on the ma_high_{i} envelopes
+            initial_wallet (float): starting wallet
+            leverage (float): multiplier of the size of each envelope
+            maker_fee (float): fee rate of the limit orders
+            taker_fee (float): fee rate of the position closed in the daily reports
+            return_type (str): "frames", or "arrays" to skip the dataframes (see score_backtest)
+
+        Returns:
+            dict: wallet, trades and days dataframes as expected by basic_single_asset_backtest,
+            or with "arrays": wallet, equity (daily wallet) and trade_results
+    """
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    ma_base = df["ma_base"].to_numpy(dtype=float)
+    ma_low = _envelope_levels(df, "ma_low")
+    ma_high = _envelope_levels(df, "ma_high")
+    if ma_low.shape[1] == 0 or ma_low.shape != ma_high.shape:
+        raise ValueError("Expected ma_low_1..n and ma_high_1..n columns")
+
+    no_touch = np.zeros(ma_low.shape, dtype=bool)
+    open_long = limit_touches(high, low, ma_low, "buy") if use_long else no_touch
+    open_short = limit_touches(high, low, ma_high, "sell") if use_short else no_touch
+    with np.errstate(invalid="ignore"):
+        close_long = high >= ma_base if use_long else np.zeros(len(df), dtype=bool)
+        close_short = low <= ma_base if use_short else np.zeros(len(df), dtype=bool)
+    report = _report_rows(df.index)
+
+    wallet, trades, days = _envelope_kernel(
+        df["close"].to_numpy(dtype=float), ma_base, ma_low, ma_high, open_long, open_short,
+        close_long, close_short, report, float(initial_wallet), float(leverage), maker_fee, taker_fee)
+    envelope = trades[:, _REASON].astype(int)
+    reasons = (np.array([f"Limit Envelop {i}" for i in range(ma_low.shape[1] + 1)])[envelope], "Limit")
+    return _backtest_result(df, wallet, trades, days, report, reasons, return_type)
+
+
+def run_tp_sl_backtest(
+    df,
+    take_profit_pct=0.05,
+    stop_loss_pct=0.05,
+    initial_wallet=1000,
+    maker_fee=0,
+    taker_fee=0.0007,
+    lower_df=None,
+    return_type="frames",
+):
+    """ Compiled replacement of the tp_sl_analysis random_strat.run_backtest loop
+
+        Market orders on the open_long / close_long (and optional open_short / close_short)
+        columns, at the close, with the whole wallet. An open position is closed on the
+        stop loss (taker fee), else on the take profit (maker fee), else on its close signal
+        (taker fee). When a candle touches both the stop loss and the take profit, the
+        stop loss is used unless lower_df tells the take profit was touched first.
+
+        Args:
+            df (pd.DataFrame): dataframe indexed by date with 'high', 'low', 'close' and the signals
+            take_profit_pct (float): take profit distance from the open price, 0 for none
+            stop_loss_pct (float): stop loss distance from the open price, 0 for none
+            initial_wallet (float): starting wallet
+            maker_fee (float): fee rate of the take profit
+            taker_fee (float): fee rate of the market orders and the stop loss
+            lower_df (pd.DataFrame): optional lower timeframe candles of the same pair, ex:
+                ExchangeDataManager(...).load_data(coin=pair, interval="5m")
+            return_type (str): "frames", or "arrays" to skip the dataframes (see score_backtest)
+
+        Returns:
+            dict: wallet, trades and days dataframes as expected by basic_single_asset_backtest,
+            or with "arrays": wallet, equity (daily wallet) and trade_results
+    """
+    no_signal = np.zeros(len(df), dtype=bool)
+    signals = [
+        df[column].to_numpy(dtype=bool) if column in df else no_signal
+        for column in ["open_long", "close_long", "open_short", "close_short"]
+    ]
+    if lower_df is not None and len(df):
+        lower_index = lower_df.index
+        lower_high = lower_df["high"].to_numpy(dtype=float)
+        lower_low = lower_df["low"].to_numpy(dtype=float)
+        lower_start = np.searchsorted(lower_index, df.index, side="left")
+        last_end = df.index[-1] + (df.index[-1] - df.index[-2] if len(df) > 1 else pd.Timedelta(0))
+        lower_end = np.r_[lower_start[1:], np.searchsorted(lower_index, last_end, side="left")]
+    else:
+        lower_high = lower_low = np.zeros(0)
+        lower_start = lower_end = np.zeros(len(df), dtype=np.int64)
+    report = _report_rows(df.index)
+
+    wallet, trades, days = _tp_sl_kernel(
+        df["close"].to_numpy(dtype=float), df["high"].to_numpy(dtype=float), df["low"].to_numpy(dtype=float),
+        *signals, report, float(take_profit_pct), float(stop_loss_pct), float(initial_wallet),
+        float(maker_fee), float(taker_fee), lower_high, lower_low,
+        lower_start.astype(np.int64), lower_end.astype(np.int64))
+    reasons = ("Market", TP_SL_REASONS[trades[:, _REASON].astype(int)])
+    return _backtest_result(df, wallet, trades, days, report, reasons, return_type)
@@ -1,13 +1,12 @@
 import pandas as pd
 import ccxt
+from utilities.ohlcv_store import OhlcvStore
 
 def get_historical_from_db(exchange, symbol, timeframe, path="database/"):
-    symbol = symbol.replace('/','-')
-    df = pd.read_csv(filepath_or_buffer=path+str(exchange.name)+"/"+timeframe+"/"+symbol+".csv")
-    df = df.set_index(df['date'])
-    df.index = pd.to_datetime(df.index, unit='ms')
-    del df['date']
-    return df
+    store = OhlcvStore(path+str(exchange.name))
+    if store.csv_is_newer(symbol, timeframe):
+        store.migrate_csv(symbol, timeframe)
+    return store.to_frame(store.read(symbol, timeframe))
 
 def get_historical_from_path(path):
     df = pd.read_csv(filepath_or_buffer=path)
@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+
+from utilities.jit import njit
+
+GRID_TRADES_COLUMNS = ["date", "side", "usd_amount", "price", "usd", "crypto", "wallet"]
+SIDES = np.array(["Buy", "Sell"])
+
+
+def custom_grid(first_price, last_order_down=0.5, last_order_up=1, down_grid_len=50, up_grid_len=50):
+    """ Buy and sell grids of the basic_grid_trading notebook
+
+        Args:
+            first_price (float): price at the begining
+            last_order_down (float): percentage of the last grid buy
+            last_order_up (float): percentage of the last grid sell
+            down_grid_len (int): initial length of grid buy
+            up_grid_len (int): initial length of grid sell
+
+        Returns:
+            tuple: grid_buy (decreasing prices) and grid_sell (increasing prices) np.ndarray
+    """
+    down_pct_unity = last_order_down / down_grid_len
+    up_pct_unity = last_order_up / up_grid_len
+    grid_buy = first_price - first_price * down_pct_unity * np.arange(1, down_grid_len + 1)
+    grid_sell = first_price + first_price * up_pct_unity * np.arange(1, up_grid_len + 1)
+    return grid_buy, grid_sell
+
+
+@njit
+def _append_trade(trades, count, row, side, usd_amount, price, usd, crypto):
+    if count == len(trades):
+        grown = np.empty((2 * len(trades), trades.shape[1]))
+        grown[:count] = trades
+        trades = grown
+    trades[count, 0] = row
+    trades[count, 1] = side
+    trades[count, 2] = usd_amount
+    trades[count, 3] = price
+    trades[count, 4] = usd
+    trades[count, 5] = crypto
+    trades[count, 6] = usd + crypto * price
+    return trades
+
+
+@njit
+def _reset_grid(price, last_order_down, last_order_up, down_grid_len, up_grid_len, capacity):
+    # grid_buy is stored increasing in buy[:buy_len] (front at the end), grid_sell
+    # increasing in sell[sell_head:] (front at the start), so both fronts move in O(1)
+    buy = np.empty(capacity)
+    sell = np.empty(capacity)
+    for i in range(down_grid_len):
+        buy[down_grid_len - 1 - i] = price - price * (last_order_down / down_grid_len) * (i + 1)
+    for i in range(up_grid_len):
+        sell[capacity - up_grid_len + i] = price + price * (last_order_up / up_grid_len) * (i + 1)
+    return buy, down_grid_len, sell, capacity - up_grid_len
+
+
+@njit
+def _grid_kernel(open_, high, low, close, usd, crypto, grid, reset_grid, reset_threshold):
+    capacity = int(max(grid[2] + grid[3], reset_grid[2] + reset_grid[3]))
+    buy, buy_len, sell, sell_head = _reset_grid(
+        close[0], grid[0], grid[1], int(grid[2]), int(grid[3]), capacity)
+    trades = np.empty((max(16, len(close) // 4), 7))
+    count = 0
+    resets = np.zeros(len(close), dtype=np.bool_)
+    equity = np.empty(len(close))
+    buy_to_insert = 0
+    sell_to_insert = 0
+
+    for i in range(len(close)):
+        # levels crossed on the previous candle are put back between the open and the grid,
+        # a grid emptied on the previous candle loses them (as the notebook try / except)
+        if buy_to_insert > 0 or sell_to_insert > 0:
+            if buy_to_insert > 0 and buy_len == 0:
+                buy_to_insert = sell_to_insert = 0
+            if buy_to_insert > 0:
+                buy_diff = (open_[i] - buy[buy_len - 1]) / (buy_to_insert + 1)
+                for _ in range(buy_to_insert):
+                    buy[buy_len] = buy[buy_len - 1] + buy_diff
+                    buy_len += 1
+            if sell_to_insert > 0 and sell_head < capacity:
+                sell_diff = (sell[sell_head] - open_[i]) / (sell_to_insert + 1)
+                for _ in range(sell_to_insert):
+                    sell[sell_head - 1] = sell[sell_head] - sell_diff
+                    sell_head -= 1
+        buy_to_insert = 0
+        sell_to_insert = 0
+
+        # end of a grid: new grid around the open and 50/50 wallet
+        crypto_value = crypto * open_[i]
+        if (buy_len == 0 and usd < reset_threshold * crypto_value) or (
+            sell_head == capacity and crypto_value < reset_threshold * usd
+        ):
+            buy, buy_len, sell, sell_head = _reset_grid(
+                open_[i], reset_grid[0], reset_grid[1], int(reset_grid[2]), int(reset_grid[3]), capacity)
+            wallet = usd + crypto_value
+            usd = 0.5 * wallet
+            crypto = 0.5 * wallet / open_[i]
+            resets[i] = True
+
+        # -- SELL --
+        while sell_head < capacity and high[i] > sell[sell_head]:
+            price = sell[sell_head]
+            crypto_to_sell = crypto / (capacity - sell_head)
+            crypto -= crypto_to_sell
+            usd += crypto_to_sell * price
+            trades = _append_trade(trades, count, i, 1, crypto_to_sell * price, price, usd, crypto)
+            count += 1
+            buy_to_insert += 1
+            sell_head += 1
+
+        # -- BUY --
+        while buy_len > 0 and low[i] < buy[buy_len - 1]:
+            price = buy[buy_len - 1]
+            buy_usd_amount = usd / buy_len
+            crypto += buy_usd_amount / price
+            usd -= buy_usd_amount
+            trades = _append_trade(trades, count, i, 0, buy_usd_amount, price, usd, crypto)
+            count += 1
+            sell_to_insert += 1
+            buy_len -= 1
+
+        equity[i] = usd + crypto * close[i]
+
+    return trades[:count], resets, equity
+
+
+def run_grid_backtest(
+    df,
+    last_order_down=0.35,
+    last_order_up=16,
+    down_grid_len=30,
+    up_grid_len=70,
+    reset_grid=None,
+    initial_wallet=1000,
+    reset_threshold=0.05,
+):
+    """ Compiled replacement of the basic_grid_trading notebook loop
+
+        The wallet starts half in usd, half in crypto, with a grid around the first close.
+        On each candle the sell levels under the high are filled from the nearest one,
+        then the buy levels over the low. Each filled level is replaced on the next candle
+        by a level of the opposite grid, spread between the open and that grid. When a grid
+        is empty and the wallet is almost all on the other side, a new grid is built around
+        the open and the wallet is rebalanced 50/50.
+
+        Args:
+            df (pd.DataFrame): OHLC dataframe indexed by date
+            last_order_down (float): percentage of the last grid buy
+            last_order_up (float): percentage of the last grid sell
+            down_grid_len (int): length of grid buy
+            up_grid_len (int): length of grid sell
+            reset_grid (dict): custom_grid parameters of the grids built on a reset,
+                default the initial ones, ex: {"last_order_down": 0.3, "last_order_up": 1,
+                "down_grid_len": 40, "up_grid_len": 60}
+            initial_wallet (float): starting wallet in usd
+            reset_threshold (float): a grid is reset when the other side of the wallet
+                is under this fraction of it
+
+        Returns:
+            dict: wallet (final wallet at the last close), trades (the notebook trade_list
+            columns), equity (wallet at each close) and resets (dates of the grid resets)
+    """
+    grid = [last_order_down, last_order_up, down_grid_len, up_grid_len]
+    reset_grid = reset_grid or {}
+    reset_grid = [
+        reset_grid.get("last_order_down", last_order_down),
+        reset_grid.get("last_order_up", last_order_up),
+        reset_grid.get("down_grid_len", down_grid_len),
+        reset_grid.get("up_grid_len", up_grid_len),
+    ]
+    close = df["close"].to_numpy(dtype=float)
+    if len(close) == 0:
+        raise ValueError("No candles to backtest")
+    usd = initial_wallet / 2
+    crypto = initial_wallet / 2 / close[0]
+
+    trades, resets, equity = _grid_kernel(
+        df["open"].to_numpy(dtype=float),
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        close,
+        usd,
+        crypto,
+        np.array(grid, dtype=float),
+        np.array(reset_grid, dtype=float),
+        reset_threshold,
+    )
+    df_trades = pd.DataFrame(trades[:, 2:], columns=GRID_TRADES_COLUMNS[2:])
+    df_trades.insert(0, "side", SIDES[trades[:, 1].astype(int)])
+    df_trades.insert(0, "date", df.index[trades[:, 0].astype(int)])
+    return {
+        "wallet": equity[-1],
+        "trades": df_trades,
+        "equity": pd.Series(equity, index=df.index, name="wallet"),
+        "resets": df.index[resets],
+    }
+
+
+@njit
+def _rebalance_kernel(close, coin1_balance, coin2_balance, pct_check):
+    trades = np.empty((max(16, len(close) // 4), 7))
+    count = 0
+    equity = np.empty(len(close))
+    for i in range(len(close)):
+        coin1_value = coin1_balance * close[i]
+        if coin2_balance > coin1_value * (1 + pct_check):
+            diff = coin2_balance - coin1_value
+            coin2_balance -= diff / 2
+            coin1_balance += (diff / 2) / close[i]
+            trades = _append_trade(trades, count, i, 0, diff / 2, close[i], coin2_balance, coin1_balance)
+            count += 1
+        elif coin2_balance < coin1_value * (1 - pct_check):
+            diff = coin1_value - coin2_balance
+            coin2_balance += diff / 2
+            coin1_balance -= (diff / 2) / close[i]
+            trades = _append_trade(trades, count, i, 1, diff / 2, close[i], coin2_balance, coin1_balance)
+            count += 1
+        equity[i] = coin2_balance + coin1_balance * close[i]
+    return trades[:count], equity
+
+
+def run_rebalance_backtest(df, pct_check=0.1, initial_wallet=1000):
+    """ Compiled replacement of the grid_50_50 notebook loop
+
+        The wallet starts half in each coin. On each close, if one side is worth more
+        than pct_check over the other, half of the difference is traded to go back to 50/50.
+
+        Args:
+            df (pd.DataFrame): dataframe indexed by date with a 'close' column
+            pct_check (float): imbalance that triggers a rebalancing
+            initial_wallet (float): starting wallet in the quote coin (coin2)
+
+        Returns:
+            dict: wallet (final wallet in coin2), trades (same columns as run_grid_backtest,
+            usd is the coin2 balance and crypto the coin1 balance) and equity (wallet at each close)
+    """
+    close = df["close"].to_numpy(dtype=float)
+    if len(close) == 0:
+        raise ValueError("No candles to backtest")
+    trades, equity = _rebalance_kernel(close, initial_wallet / 2 / close[0], initial_wallet / 2, pct_check)
+    df_trades = pd.DataFrame(trades[:, 2:], columns=GRID_TRADES_COLUMNS[2:])
+    df_trades.insert(0, "side", SIDES[trades[:, 1].astype(int)])
+    df_trades.insert(0, "date", df.index[trades[:, 0].astype(int)])
+    return {
+        "wallet": equity[-1],
+        "trades": df_trades,
+        "equity": pd.Series(equity, index=df.index, name="wallet"),
+    }
@@ -0,0 +1,233 @@
+import collections
+import copy
+import hashlib
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Results returned without copy
+IMMUTABLE_TYPES = (bool, int, float, complex, str, bytes, frozenset, np.generic, pd.Timestamp, pd.Timedelta)
+
+# Source hash of each module file, by (path, modification time, size)
+_module_hashes = {}
+
+
+class IndicatorCache:
+    """ Content addressed cache for indicator computations
+
+        Entries are keyed by a hash of the function, the input data (values, index and
+        columns) and the parameters, so the same indicator on the same candles is only
+        computed once, whatever the dataframe object it comes from. Entries are kept in
+        memory with LRU eviction once max_bytes is reached, and optionally pickled in
+        path to survive kernel restarts. Results are returned as copies (deep copies for
+        objects such as a SuperTrend instance), functions that modify their inputs in place
+        (ex: heikinAshiDf) only do it on a miss.
+
+        The function part of the key covers the bytecode of the function (or of the methods
+        of the class and of its bases) and the source files of their modules, so editing an
+        indicator or a helper of the same module invalidates its entries. Code of other
+        modules called by the function is not covered (ex: a library upgrade): call
+        clear(disk=True) after such changes.
+
+        Usage:
+            cache = IndicatorCache()
+            df['ema'] = cache(ta.trend.ema_indicator, close=df['close'], window=50)
+            st = cache(SuperTrend, df['high'], df['low'], df['close'], 10, 3)
+
+        :param max_bytes: maximum memory used by the cached results
+        :param path: directory of the disk cache, None to keep the cache in memory only
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def __call__(self, function, *args, **kwargs):
+        key = self.key(function, *args, **kwargs)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self._copy(self.entries[key][0])
+
+        value = self._read_disk(key)
+        if value is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            value = function(*args, **kwargs)
+            self._write_disk(key, value)
+        self._store(key, value)
+        return self._copy(value)
+
+    def wrap(self, function):
+        """ Cached version of function, ex: ema_indicator = cache.wrap(ta.trend.ema_indicator) """
+        def cached_function(*args, **kwargs):
+            return self(function, *args, **kwargs)
+        cached_function.__name__ = getattr(function, "__name__", "cached_function")
+        cached_function.__doc__ = function.__doc__
+        return cached_function
+
+    def key(self, function, *args, **kwargs):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(_function_key(function))
+        for arg in args:
+            _update_digest(digest, arg)
+        for name in sorted(kwargs):
+            digest.update(name.encode())
+            _update_digest(digest, kwargs[name])
+        return digest.hexdigest()
+
+    def stats(self):
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / total if total else 0,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+    def clear(self, disk=False):
+        self.entries.clear()
+        self.size = 0
+        self.hits = self.disk_hits = self.misses = 0
+        if disk and self.path is not None:
+            for file in os.listdir(self.path):
+                if file.endswith(".pkl"):
+                    os.remove(os.path.join(self.path, file))
+
+    def _store(self, key, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def _read_disk(self, key):
+        if self.path is None:
+            return None
+        file = os.path.join(self.path, key + ".pkl")
+        if not os.path.exists(file):
+            return None
+        try:
+            with open(file, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _write_disk(self, key, value):
+        if self.path is None:
+            return
+        file = os.path.join(self.path, key + ".pkl")
+        try:
+            with open(file + ".tmp", "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(file + ".tmp", file)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            if os.path.exists(file + ".tmp"):
+                os.remove(file + ".tmp")
+
+    @staticmethod
+    def _copy(value):
+        # results are copied so the caller can modify them freely
+        if isinstance(value, (pd.Series, pd.DataFrame, np.ndarray)):
+            return value.copy()
+        if isinstance(value, tuple):
+            return tuple(IndicatorCache._copy(item) for item in value)
+        if value is None or isinstance(value, IMMUTABLE_TYPES):
+            return value
+        return copy.deepcopy(value)
+
+
+def _function_key(function):
+    """ Name and bytecode of the function (or of the methods of a class and of its bases)
+        and source of their modules, so a modified indicator does not reuse the results
+        of the old one
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', repr(function))}".encode())
+    owners = [cls for cls in function.__mro__ if cls is not object] if isinstance(function, type) else [function]
+    members = [member for cls in owners for member in vars(cls).values()] if isinstance(function, type) else owners
+    for member in members:
+        code = getattr(getattr(member, "__func__", member), "__code__", None)
+        if code is not None:
+            digest.update(code.co_code)
+            digest.update(repr(code.co_consts).encode())
+    for module in sorted({getattr(owner, "__module__", None) or "" for owner in owners}):
+        digest.update(_module_hash(module))
+    return digest.digest()
+
+
+def _module_hash(name):
+    """ Hash of the source file of a module, empty for modules without file (ex: a notebook) """
+    file = getattr(sys.modules.get(name), "__file__", None)
+    try:
+        stat = os.stat(file)
+    except (TypeError, OSError):
+        return b""
+    file_key = (file, stat.st_mtime_ns, stat.st_size)
+    if file_key not in _module_hashes:
+        with open(file, "rb") as f:
+            _module_hashes[file_key] = hashlib.blake2b(f.read(), digest_size=20).digest()
+    return _module_hashes[file_key]
+
+
+def _update_digest(digest, value):
+    if isinstance(value, pd.Series):
+        digest.update(b"series")
+        _update_digest(digest, value.index)
+        _update_digest(digest, value.to_numpy())
+    elif isinstance(value, pd.DataFrame):
+        digest.update(b"frame")
+        _update_digest(digest, value.index)
+        digest.update(repr(list(value.columns)).encode())
+        for column in value.columns:
+            _update_digest(digest, value[column].to_numpy())
+    elif isinstance(value, pd.Index):
+        digest.update(b"index")
+        _update_digest(digest, value.to_numpy())
+    elif isinstance(value, np.ndarray):
+        if value.dtype == object:
+            digest.update(repr(value.tolist()).encode())
+        else:
+            digest.update(str(value.dtype).encode() + str(value.shape).encode())
+            digest.update(np.ascontiguousarray(value).view(np.uint8).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"sequence")
+        for item in value:
+            _update_digest(digest, item)
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for name in sorted(value, key=repr):
+            digest.update(repr(name).encode())
+            _update_digest(digest, value[name])
+    else:
+        digest.update(type(value).__name__.encode() + repr(value).encode())
+
+
+def _size_of(value):
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_size_of(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_size_of(item) for item in value.values())
+    if hasattr(value, "__dict__"):
+        return sum(_size_of(item) for item in vars(value).values())
+    return 64
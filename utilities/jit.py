@@ -0,0 +1,12 @@
+""" Optional numba compilation
+
+    numba is not a hard requirement: without it, the decorated kernels run as plain
+    Python loops over numpy arrays.
+"""
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
@@ -0,0 +1,381 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+
+class OhlcvStore:
+    """Columnar binary storage for OHLCV candles
+
+       Each pair is stored in its own directory ({interval}/{pair}/) with one raw
+       little-endian file per column: int64 milliseconds for the date and float64
+       for open, high, low, close and volume. Rows are sorted and deduplicated on
+       write, so reading a pair never needs any parsing or regrouping.
+
+       A meta.json sidecar next to the columns keeps the first/last timestamps,
+       the row count and the known gaps of the pair, and is updated on every write.
+       Gaps the exchange has no data for are kept in checked_gaps so they are not
+       requested again. Intervals built locally from a smaller one also record
+       their source interval there (see resample).
+    """
+
+    COLUMNS = {
+        "date": np.dtype("<i8"),
+        "open": np.dtype("<f8"),
+        "high": np.dtype("<f8"),
+        "low": np.dtype("<f8"),
+        "close": np.dtype("<f8"),
+        "volume": np.dtype("<f8"),
+    }
+
+    # exchanges start weekly candles on monday, the unix epoch is a thursday
+    WEEK_OFFSET_MS = 4 * 86400000
+
+    def __init__(self, path_data, intervals_dict=None) -> None:
+        """This method create an OhlcvStore object
+           Args:
+               path_data (str): root directory of the store (ex: ./database/exchanges/binance)
+               intervals_dict (dict, optional): ExchangeDataManager.INTERVALS like dict,
+                   needed to record the gaps of each pair (default None)
+        """
+        self.path_data = path_data
+        self.intervals_dict = intervals_dict or {}
+
+    def pair_path(self, coin, interval) -> str:
+        return os.path.join(self.path_data, interval, coin.replace("/", "-"))
+
+    def column_path(self, coin, interval, column) -> str:
+        return os.path.join(self.pair_path(coin, interval), f"{column}.bin")
+
+    def meta_path(self, coin, interval) -> str:
+        return os.path.join(self.pair_path(coin, interval), "meta.json")
+
+    def csv_path(self, coin, interval) -> str:
+        return os.path.join(self.path_data, interval, f"{coin.replace('/', '-')}.csv")
+
+    def exists(self, coin, interval) -> bool:
+        return all(
+            os.path.isfile(self.column_path(coin, interval, column))
+            for column in OhlcvStore.COLUMNS
+        )
+
+    def csv_is_newer(self, coin, interval) -> bool:
+        """True when a legacy csv file exists and has not been converted since its last change"""
+        csv_file = self.csv_path(coin, interval)
+        if not os.path.isfile(csv_file):
+            return False
+        if not self.exists(coin, interval):
+            return True
+        return os.path.getmtime(csv_file) > os.path.getmtime(
+            self.column_path(coin, interval, "date")
+        )
+
+    def read(self, coin, interval, mmap=False) -> dict:
+        """This method read every column of a pair
+
+            :param coin: symbol (ex: BTC/USDT)
+            :param interval: interval between each point of data (ex: 1h)
+            :param mmap: memory-map the files instead of loading them in RAM (default False)
+            :return dict of np.ndarray (date, open, high, low, close, volume)
+        """
+        if not self.exists(coin, interval):
+            raise FileNotFoundError(
+                f"Les données {coin} en {interval} n'existent pas dans {self.path_data}"
+            )
+        loader = OhlcvStore.memmap if mmap else np.fromfile
+        columns = {
+            column: loader(self.column_path(coin, interval, column), dtype=dtype)
+            for column, dtype in OhlcvStore.COLUMNS.items()
+        }
+        # an interrupted write can leave columns of different length, the
+        # sidecar only counts the rows that were completely written
+        size = min(len(values) for values in columns.values())
+        meta = self.read_meta(coin, interval)
+        if meta is not None:
+            size = min(size, meta["rows"])
+        return {column: values[:size] for column, values in columns.items()}
+
+    def read_meta(self, coin, interval) -> dict | None:
+        """This method return the sidecar of a pair without touching the columns
+
+            :return dict (first, last, rows, gaps, checked_gaps) or None if the sidecar does not exist
+        """
+        try:
+            with open(self.meta_path(coin, interval)) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        meta.setdefault("checked_gaps", [])
+        return meta
+
+    def write_meta(self, coin, interval, meta) -> None:
+        file_name = self.meta_path(coin, interval)
+        with open(file_name + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(file_name + ".tmp", file_name)
+
+    def build_meta(self, dates, interval, previous=None) -> dict:
+        gaps = self.find_gaps(dates, interval)
+        meta = {} if previous is None else dict(previous)
+        meta.update(
+            first=int(dates[0]) if len(dates) else None,
+            last=int(dates[-1]) if len(dates) else None,
+            rows=len(dates),
+            gaps=gaps,
+            checked_gaps=[gap for gap in meta.get("checked_gaps", []) if gap in gaps],
+        )
+        return meta
+
+    def refresh_meta(self, coin, interval) -> dict:
+        """This method rebuild the sidecar of a pair from its date column"""
+        previous = self.read_meta(coin, interval)
+        if previous is not None:
+            # rows may not be trusted, read the whole columns
+            os.remove(self.meta_path(coin, interval))
+        meta = self.build_meta(
+            self.read(coin, interval, mmap=True)["date"], interval, previous
+        )
+        self.write_meta(coin, interval, meta)
+        return meta
+
+    def get_meta(self, coin, interval) -> dict | None:
+        """Same as read_meta, but rebuild the sidecar if it is missing"""
+        if not self.exists(coin, interval):
+            return None
+        meta = self.read_meta(coin, interval)
+        if meta is None:
+            meta = self.refresh_meta(coin, interval)
+        return meta
+
+    def find_gaps(self, dates, interval) -> list:
+        """This method list the missing candles of a sorted date column
+
+            :return list of [first missing ms, last missing ms]
+        """
+        if interval not in self.intervals_dict or len(dates) < 2:
+            return []
+        if interval == "1M":
+            # months have 28 to 31 days, compare each candle with the next calendar month
+            month = pd.DateOffset(months=1)
+            after = self.to_ms(pd.to_datetime(dates[:-1], unit="ms") + month)
+            before = self.to_ms(pd.to_datetime(dates[1:], unit="ms") - month)
+            holes = np.flatnonzero(dates[1:] > after)
+            return [[int(after[i]), int(before[i])] for i in holes]
+        interval_ms = self.intervals_dict[interval]["interval_ms"]
+        steps = np.diff(dates)
+        # a missing candle at least doubles the spacing
+        holes = np.flatnonzero(steps >= 2 * interval_ms)
+        return [
+            [int(dates[i]) + interval_ms, int(dates[i + 1]) - interval_ms]
+            for i in holes
+        ]
+
+    def read_range(self, coin, interval, start_ms=None, end_ms=None) -> dict:
+        """This method return the candles between 2 timestamps as zero-copy views
+
+            The date column is memory-mapped and binary searched, so only the pages
+            of the requested window are ever read from disk.
+            :param start_ms: first timestamp in ms, included (default: first candle)
+            :param end_ms: last timestamp in ms, included (default: last candle)
+            :return dict of read-only np.memmap views
+        """
+        columns = self.read(coin, interval, mmap=True)
+        dates = columns["date"]
+        first = 0 if start_ms is None else int(np.searchsorted(dates, start_ms, side="left"))
+        last = len(dates) if end_ms is None else int(np.searchsorted(dates, end_ms, side="right"))
+        return {column: values[first:last] for column, values in columns.items()}
+
+    def write(self, coin, interval, data) -> int:
+        """This method replace the stored candles of a pair
+
+            :param coin: symbol (ex: BTC/USDT)
+            :param interval: interval between each point of data (ex: 1h)
+            :param data: candles as a pd.DataFrame with a 'date' column in ms,
+                a dict of arrays or a list of [date, open, high, low, close, volume]
+            :return number of rows written
+        """
+        columns = self.prepare(data)
+        os.makedirs(self.pair_path(coin, interval), exist_ok=True)
+        # without sidecar a half replaced pair is rebuilt from its columns
+        previous = self.read_meta(coin, interval)
+        if previous is not None:
+            os.remove(self.meta_path(coin, interval))
+        for column, values in columns.items():
+            file_name = self.column_path(coin, interval, column)
+            values.tofile(file_name + ".tmp")
+            os.replace(file_name + ".tmp", file_name)
+        self.write_meta(
+            coin, interval, self.build_meta(columns["date"], interval, previous)
+        )
+        return len(columns["date"])
+
+    def append(self, coin, interval, data) -> int:
+        """This method append candles at the end of a pair, deduplicating at write time
+
+            Rows older than the last stored candle are dropped and a row with the same
+            date replaces the last stored candle (it may have been saved while still
+            open), so the columns stay sorted and unique without any rewrite.
+            :return total number of rows stored
+        """
+        meta = self.get_meta(coin, interval)
+        if meta is None or meta["rows"] == 0:
+            return self.write(coin, interval, data)
+        new = self.prepare(data)
+        keep = new["date"] >= meta["last"]
+        new = {column: values[keep] for column, values in new.items()}
+        if len(new["date"]) == 0:
+            return meta["rows"]
+
+        rows = meta["rows"]
+        if new["date"][0] == meta["last"]:
+            rows -= 1
+        for column, dtype in OhlcvStore.COLUMNS.items():
+            with open(self.column_path(coin, interval, column), "r+b") as f:
+                # also drops the leftovers of an interrupted append
+                f.truncate(rows * dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                new[column].tofile(f)
+
+        boundary = np.array([meta["last"], new["date"][0]], dtype="<i8")
+        meta.update(
+            last=int(new["date"][-1]),
+            rows=rows + len(new["date"]),
+            gaps=meta["gaps"]
+            + self.find_gaps(boundary, interval)
+            + self.find_gaps(new["date"], interval),
+        )
+        self.write_meta(coin, interval, meta)
+        return meta["rows"]
+
+    def prepare(self, data) -> dict:
+        """Convert candles to sorted, deduplicated typed columns (first row wins)"""
+        if isinstance(data, pd.DataFrame):
+            columns = {column: data[column].to_numpy() for column in OhlcvStore.COLUMNS}
+        elif isinstance(data, dict):
+            columns = {column: np.asarray(data[column]) for column in OhlcvStore.COLUMNS}
+        else:
+            rows = np.asarray(data, dtype="f8").reshape(-1, len(OhlcvStore.COLUMNS))
+            columns = {
+                column: rows[:, i] for i, column in enumerate(OhlcvStore.COLUMNS)
+            }
+        columns = {
+            column: np.ascontiguousarray(values, dtype=OhlcvStore.COLUMNS[column])
+            for column, values in columns.items()
+        }
+        dates, first_index = np.unique(columns["date"], return_index=True)
+        if len(dates) == len(columns["date"]) and np.all(first_index == np.arange(len(dates))):
+            return columns
+        return {column: values[first_index] for column, values in columns.items()}
+
+    def merge(self, coin, interval, data) -> int:
+        """This method merge new candles with the stored ones
+
+            New rows win on duplicates, so a candle stored while it was still open
+            gets its final values.
+            :return total number of rows stored
+        """
+        if not self.exists(coin, interval):
+            return self.write(coin, interval, data)
+        current = self.read(coin, interval)
+        new = self.prepare(data)
+        merged = {
+            column: np.concatenate([new[column], current[column]])
+            for column in OhlcvStore.COLUMNS
+        }
+        return self.write(coin, interval, merged)
+
+    def delete(self, coin, interval) -> None:
+        shutil.rmtree(self.pair_path(coin, interval), ignore_errors=True)
+
+    def can_resample(self, base_interval, interval) -> bool:
+        """True when every candle of interval is made of whole base_interval candles"""
+        base_ms = self.intervals_dict[base_interval]["interval_ms"]
+        if interval == "1M":
+            return 86400000 % base_ms == 0
+        interval_ms = self.intervals_dict[interval]["interval_ms"]
+        offset = OhlcvStore.WEEK_OFFSET_MS if interval == "1w" else 0
+        return base_ms < interval_ms and interval_ms % base_ms == 0 and offset % base_ms == 0
+
+    def bucket_start(self, dates, interval) -> np.ndarray:
+        """Return the open time of the interval candle containing each date"""
+        if interval == "1M":
+            return (
+                dates.astype("datetime64[ms]")
+                .astype("datetime64[M]")
+                .astype("datetime64[ms]")
+                .astype("<i8")
+            )
+        interval_ms = self.intervals_dict[interval]["interval_ms"]
+        offset = OhlcvStore.WEEK_OFFSET_MS if interval == "1w" else 0
+        return dates - (dates - offset) % interval_ms
+
+    def resample(self, columns, interval) -> dict:
+        """This method aggregate sorted candles into a bigger interval
+
+            The last candle is kept even if it is partial (its base candles are not all
+            there yet), it is replaced on the next resample like an open candle.
+            :param columns: dict of arrays of a smaller interval (see read)
+            :param interval: target interval (ex: 4h)
+            :return dict of np.ndarray (date, open, high, low, close, volume)
+        """
+        dates = np.asarray(columns["date"])
+        if len(dates) == 0:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in OhlcvStore.COLUMNS.items()}
+        buckets = self.bucket_start(dates, interval)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(dates)] - 1
+        return {
+            "date": buckets[starts],
+            "open": np.asarray(columns["open"])[starts],
+            "high": np.maximum.reduceat(columns["high"], starts),
+            "low": np.minimum.reduceat(columns["low"], starts),
+            "close": np.asarray(columns["close"])[ends],
+            "volume": np.add.reduceat(columns["volume"], starts),
+        }
+
+    def migrate_csv(self, coin, interval, remove_csv=False) -> int:
+        """This method convert the legacy {interval}/{pair}.csv file of a pair to the store
+
+            :param remove_csv: delete the csv file once converted (default False)
+            :return number of rows written
+        """
+        file_name = self.csv_path(coin, interval)
+        df = pd.read_csv(file_name)
+        rows = self.write(coin, interval, df)
+        if remove_csv:
+            os.remove(file_name)
+        return rows
+
+    @staticmethod
+    def memmap(file_name, dtype) -> np.ndarray:
+        # np.memmap refuses empty files
+        if os.path.getsize(file_name) < dtype.itemsize:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file_name, dtype=dtype, mode="r")
+
+    @staticmethod
+    def date_to_ms(date, end=False) -> int:
+        """Convert a date to a timestamp in ms
+
+            Strings follow pandas partial string indexing: "2021" as a start means
+            2021-01-01 00:00:00 and as an end means 2021-12-31 23:59:59.999.
+        """
+        if isinstance(date, str):
+            period = pd.Period(date)
+            date = period.end_time if end else period.start_time
+        return pd.Timestamp(date).value // 10**6
+
+    @staticmethod
+    def to_ms(dates) -> np.ndarray:
+        """Convert a DatetimeIndex to timestamps in ms"""
+        return dates.to_numpy().astype("datetime64[ms]").astype("<i8")
+
+    @staticmethod
+    def to_frame(columns) -> pd.DataFrame:
+        df = pd.DataFrame(
+            {column: columns[column] for column in OhlcvStore.COLUMNS if column != "date"},
+            index=pd.to_datetime(columns["date"], unit="ms"),
+        )
+        df.index.name = "date"
+        return df
@@ -0,0 +1,318 @@
+import collections
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class _RunningStats:
+    """ Welford running mean and variance """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class OnlineMetrics:
+    """ Streaming version of the complete_multi_asset_backtest statistics
+
+        Days and trades are pushed one at a time as the backtest (or the live bot)
+        produces them, every update is O(1) and nothing is kept in memory but counters,
+        so very long simulations do not need to store their days and trades lists.
+        metrics() returns the same keys and numbers as compute_backtest_metrics (without
+        its trades_columns and days_columns arrays).
+
+        :param indepedant_trade: same meaning as in complete_multi_asset_backtest
+        :param close_fee_in_result: subtract the close fee from the trade result
+        :param open_fee_in_base: add the open fee to the size the trade result is divided by
+        :param periods_per_year: number of days reports per year
+    """
+
+    def __init__(self, indepedant_trade=True, close_fee_in_result=False, open_fee_in_base=False, periods_per_year=365):
+        self.indepedant_trade = indepedant_trade
+        self.close_fee_in_result = close_fee_in_result
+        self.open_fee_in_base = open_fee_in_base
+        self.periods_per_year = periods_per_year
+
+        # -- Days --
+        self.total_days = 0
+        self.period_start = None
+        self.period_end = None
+        self.initial_wallet = math.nan
+        self.final_wallet = math.nan
+        self.first_price = math.nan
+        self.last_price = math.nan
+        self.returns = _RunningStats()
+        self.negative_returns = _RunningStats()
+        self.wallet_ath = -math.inf
+        self.max_days_drawdown = math.nan
+        self.drawdown_sum = 0.0
+        self.drawdown_count = 0
+        self.win_days_number = 0
+        self.loose_days_number = 0
+        self.neutral_days_number = 0
+        self.streak = 0
+        self.best_streak_number = math.nan
+        self.best_streak_date = None
+        self.worst_streak_number = math.nan
+        self.worst_streak_date = None
+        self.best_day_return = math.nan
+        self.best_day_date = None
+        self.worst_day_return = math.nan
+        self.worst_day_date = None
+        self.has_exposition = False
+        self.exposition_sum = 0.0
+        self.max_exposition = -math.inf
+        self.max_long_exposition = -math.inf
+        self.max_short_exposition = -math.inf
+        self.has_risk = False
+        self.risk_sum = 0.0
+        self.max_risk = -math.inf
+        self.min_risk = math.inf
+
+        # -- Trades --
+        self.total_trades = 0
+        self.total_good_trades = 0
+        self.total_bad_trades = 0
+        self.result_sum = 0.0
+        self.good_result_sum = 0.0
+        self.bad_result_sum = 0.0
+        self.total_fees = 0.0
+        self.trades_wallet_ath = -math.inf
+        self.max_trades_drawdown = math.nan
+        self.best_trade = math.nan
+        self.best_trade_trade = None
+        self.worst_trade = math.nan
+        self.worst_trade_trade = None
+        self.duration_sum = None
+        self.good_duration_sum = None
+        self.bad_duration_sum = None
+        self.sides = {}
+        self.entries = collections.Counter()
+        self.exits = collections.Counter()
+        self.pairs = {}
+
+    def update_day(self, wallet, day=None, price=math.nan, long_exposition=None, short_exposition=None, risk=None):
+        """ Add one days report (same fields as the days dataframe), the exposition and
+            risk metrics are only returned if these fields are given
+        """
+        if self.total_days == 0:
+            self.period_start = day
+            self.initial_wallet = wallet
+            self.first_price = price
+            daily_return = math.nan
+        else:
+            daily_return = (wallet - self.final_wallet) / self.final_wallet
+        self.total_days += 1
+        self.period_end = day
+        self.final_wallet = wallet
+        self.last_price = price
+
+        # -- Returns --
+        if not math.isnan(daily_return):
+            self.returns.update(daily_return)
+            if daily_return < 0:
+                self.negative_returns.update(daily_return)
+            if not daily_return <= self.best_day_return:
+                self.best_day_return, self.best_day_date = daily_return, day
+            if not daily_return >= self.worst_day_return:
+                self.worst_day_return, self.worst_day_date = daily_return, day
+
+        # -- Drawdown --
+        self.wallet_ath = max(self.wallet_ath, wallet)
+        drawdown_pct = (self.wallet_ath - wallet) / self.wallet_ath
+        self.drawdown_sum += drawdown_pct
+        self.drawdown_count += 1
+        if not drawdown_pct <= self.max_days_drawdown:
+            self.max_days_drawdown = drawdown_pct
+
+        # -- Streaks, neutral days neither break nor extend a streak --
+        win_loose = 1 if daily_return > 0 else -1 if daily_return < 0 else 0
+        if win_loose == 1:
+            self.win_days_number += 1
+        elif win_loose == -1:
+            self.loose_days_number += 1
+        else:
+            self.neutral_days_number += 1
+        if win_loose != 0:
+            self.streak = self.streak + win_loose if self.streak * win_loose > 0 else win_loose
+            if not self.streak <= self.best_streak_number:
+                self.best_streak_number, self.best_streak_date = self.streak, day
+            if not self.streak >= self.worst_streak_number:
+                self.worst_streak_number, self.worst_streak_date = self.streak, day
+
+        # -- Exposition --
+        if long_exposition is not None and short_exposition is not None:
+            self.has_exposition = True
+            total_exposition = long_exposition + short_exposition
+            self.exposition_sum += total_exposition
+            self.max_exposition = max(self.max_exposition, total_exposition)
+            self.max_long_exposition = max(self.max_long_exposition, long_exposition)
+            self.max_short_exposition = max(self.max_short_exposition, short_exposition)
+        if risk is not None:
+            self.has_risk = True
+            self.risk_sum += risk
+            self.max_risk = max(self.max_risk, risk)
+            self.min_risk = min(self.min_risk, risk)
+
+    def update_trade(self, trade):
+        """ Add one closed trade (a dict with the columns of the trades dataframe) """
+        trade_result = trade["close_trade_size"] - trade["open_trade_size"] - trade["open_fee"]
+        if self.close_fee_in_result:
+            trade_result -= trade["close_fee"]
+        base = trade["open_trade_size"] + trade["open_fee"] if self.open_fee_in_base else trade["open_trade_size"]
+        trade_result_pct = trade_result / base
+        trade_result_pct_wallet = trade_result / (trade["wallet"] + trade_result)
+        result = trade_result_pct if self.indepedant_trade else trade_result_pct_wallet
+        good = trade_result > 0
+        bad = trade_result < 0
+
+        self.total_trades += 1
+        self.total_good_trades += good
+        self.total_bad_trades += bad
+        self.result_sum += result
+        self.good_result_sum += result if good else 0.0
+        self.bad_result_sum += result if bad else 0.0
+        self.total_fees += trade["open_fee"] + trade["close_fee"]
+
+        self.trades_wallet_ath = max(self.trades_wallet_ath, trade["wallet"])
+        drawdown_pct = (self.trades_wallet_ath - trade["wallet"]) / self.trades_wallet_ath
+        if not drawdown_pct <= self.max_trades_drawdown:
+            self.max_trades_drawdown = drawdown_pct
+        if not result <= self.best_trade:
+            self.best_trade, self.best_trade_trade = result, trade
+        if not result >= self.worst_trade:
+            self.worst_trade, self.worst_trade_trade = result, trade
+
+        if "open_date" in trade and "close_date" in trade:
+            duration = trade["close_date"] - trade["open_date"]
+            self.duration_sum = duration if self.duration_sum is None else self.duration_sum + duration
+            if good:
+                self.good_duration_sum = duration if self.good_duration_sum is None else self.good_duration_sum + duration
+            if bad:
+                self.bad_duration_sum = duration if self.bad_duration_sum is None else self.bad_duration_sum + duration
+
+        if "position" in trade:
+            side = self.sides.setdefault(trade["position"], [0, 0, 0.0])
+            side[0] += 1
+            side[1] += good
+            side[2] += result
+            if "open_reason" in trade and "close_reason" in trade:
+                self.entries[trade["position"], trade["open_reason"]] += 1
+                self.exits[trade["position"], trade["close_reason"]] += 1
+
+        if "pair" in trade:
+            pair = self.pairs.setdefault(trade["pair"], [0, 0.0, math.inf, -math.inf, 0])
+            pair[0] += 1
+            pair[1] += trade_result_pct
+            pair[2] = min(pair[2], trade_result_pct)
+            pair[3] = max(pair[3], trade_result_pct)
+            pair[4] += good
+
+    def metrics(self):
+        """ Same keys and values as compute_backtest_metrics, without the column arrays """
+        mean_return = self.returns.mean if self.returns.count else math.nan
+        sqrt_periods = self.periods_per_year**0.5
+        buy_and_hold_pct = (self.last_price - self.first_price) / self.first_price
+        buy_and_hold_wallet = self.initial_wallet + self.initial_wallet * buy_and_hold_pct
+        metrics = {
+            'initial_wallet': self.initial_wallet,
+            'final_wallet': self.final_wallet,
+            'vs_usd_pct': (self.final_wallet - self.initial_wallet)/self.initial_wallet,
+            'sharpe_ratio': _divide(sqrt_periods * mean_return, self.returns.std()),
+            'sortino_ratio': _divide(sqrt_periods * mean_return, self.negative_returns.std()),
+            'calmar_ratio': _divide(mean_return * self.periods_per_year, self.max_days_drawdown),
+            'max_trades_drawdown': self.max_trades_drawdown,
+            'max_days_drawdown': self.max_days_drawdown,
+            'mean_drawdown': _divide(self.drawdown_sum, self.drawdown_count),
+            'total_trades': self.total_trades,
+            'total_good_trades': self.total_good_trades,
+            'total_bad_trades': self.total_bad_trades,
+            'global_win_rate': _divide(self.total_good_trades, self.total_trades),
+            'avg_profit': _divide(self.result_sum, self.total_trades),
+            'period_start': self.period_start,
+            'period_end': self.period_end,
+            'total_days': self.total_days,
+            'buy_and_hold_pct': buy_and_hold_pct,
+            'vs_hold_pct': (self.final_wallet - buy_and_hold_wallet)/buy_and_hold_wallet,
+            'total_fees': self.total_fees,
+            'avg_profit_good_trades': _divide(self.good_result_sum, self.total_good_trades),
+            'avg_profit_bad_trades': _divide(self.bad_result_sum, self.total_bad_trades),
+            'mean_trades_duration': _mean_duration(self.duration_sum, self.total_trades),
+            'mean_good_trades_duration': _mean_duration(self.good_duration_sum, self.total_good_trades),
+            'mean_bad_trades_duration': _mean_duration(self.bad_duration_sum, self.total_bad_trades),
+            'mean_trades_per_days': _divide(self.total_trades, self.total_days),
+            'win_days_number': self.win_days_number,
+            'loose_days_number': self.loose_days_number,
+            'neutral_days_number': self.neutral_days_number,
+            'best_day_return': self.best_day_return,
+            'best_day_date': self.best_day_date,
+            'worst_day_return': self.worst_day_return,
+            'worst_day_date': self.worst_day_date,
+            'best_streak_number': self.best_streak_number,
+            'best_streak_date': self.best_streak_date,
+            'worst_streak_number': self.worst_streak_number,
+            'worst_streak_date': self.worst_streak_date,
+        }
+        if self.has_exposition:
+            metrics |= {
+                'mean_exposition': _divide(self.exposition_sum, self.total_days),
+                'max_exposition': self.max_exposition,
+                'max_long_exposition': self.max_long_exposition,
+                'max_short_exposition': self.max_short_exposition,
+            }
+        if self.has_risk:
+            metrics |= {
+                'max_risk': self.max_risk,
+                'min_risk': self.min_risk,
+                'mean_risk': _divide(self.risk_sum, self.total_days),
+            }
+        for name, result, trade in [
+            ('best_trade', self.best_trade, self.best_trade_trade),
+            ('worst_trade', self.worst_trade, self.worst_trade_trade)
+        ]:
+            trade = trade or {}
+            metrics[name] = result
+            metrics[name + '_open_date'] = trade.get('open_date')
+            metrics[name + '_close_date'] = trade.get('close_date')
+            metrics[name + '_pair'] = trade.get('pair')
+        for side in ['LONG', 'SHORT'] if self.sides else []:
+            trades, good, result_sum = self.sides.get(side, [0, 0, 0.0])
+            metrics[side.lower() + '_trades'] = trades
+            metrics[side.lower() + '_win_rate'] = _divide(good, trades)
+            metrics[side.lower() + '_average_profit'] = _divide(result_sum, trades)
+        if self.entries:
+            metrics['entries'] = dict(self.entries)
+            metrics['exits'] = dict(self.exits)
+        if self.pairs:
+            df_pairs = pd.DataFrame.from_dict(
+                self.pairs,
+                orient='index',
+                columns=['trades', 'sum_result', 'worst_trade', 'best_trade', 'good'],
+            )
+            df_pairs.index.name = 'pair'
+            df_pairs['mean_trade'] = df_pairs['sum_result'] / df_pairs['trades']
+            df_pairs['win_rate'] = df_pairs.pop('good') / df_pairs['trades']
+            metrics['pairs'] = df_pairs[['trades', 'sum_result', 'mean_trade', 'worst_trade', 'best_trade', 'win_rate']]
+            metrics['total_pair_traded'] = len(df_pairs)
+        return metrics
+
+
+def _divide(numerator, denominator):
+    # numpy division, as the batch metrics: x / 0 is inf, 0 / 0 and nan are nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.float64(numerator) / np.float64(denominator)
+
+
+def _mean_duration(duration_sum, count):
+    return duration_sum / count if count else pd.NaT
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def align_pairs(df_list, columns, index=None):
+    """ Align the dataframes of a df_list on one date index
+
+        Args:
+            df_list (dict): pair -> dataframe indexed by date
+            columns (list): columns to extract from every dataframe
+            index (pd.DatetimeIndex): common index (default: union of every index)
+
+        Returns:
+            tuple: index, list of pairs, dict column -> (time x pair) np.ndarray
+            (missing values are nan, or False for boolean columns) and the
+            (time x pair) boolean mask of the rows each pair really has
+    """
+    pairs = list(df_list)
+    if index is None:
+        index = df_list[pairs[0]].index
+        for pair in pairs[1:]:
+            index = index.union(df_list[pair].index)
+    panel = {}
+    valid = np.zeros((len(index), len(pairs)), dtype=bool)
+    for j, pair in enumerate(pairs):
+        df = df_list[pair]
+        rows = index.get_indexer(df.index)
+        keep = rows >= 0
+        valid[rows[keep], j] = True
+        for column in columns:
+            values = df[column].to_numpy()
+            if column not in panel:
+                if values.dtype == bool:
+                    panel[column] = np.zeros((len(index), len(pairs)), dtype=bool)
+                else:
+                    panel[column] = np.full((len(index), len(pairs)), np.nan)
+            panel[column][rows[keep], j] = values[keep]
+    return index, pairs, panel, valid
@@ -0,0 +1,235 @@
+import itertools
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from tqdm.auto import tqdm
+
+# Worker side state, set once per process by _init_worker
+_shared = {}
+# Name of the index in the shared arrays
+_INDEX = "__index__"
+
+
+def parameter_grid(**parameters):
+    """ Every combination of the given parameter lists
+
+        ex: parameter_grid(take_profit_pct=[0.02, 0.05], stop_loss_pct=[0, 0.05])
+    """
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*parameters.values())]
+
+
+def random_parameters(sampler, n_iter, seed=None):
+    """ n_iter parameter sets drawn by sampler(rng), rng being a seeded random.Random
+
+        ex: random_parameters(lambda rng: {"open_proba": 1 / rng.randint(12, 72)}, 1000)
+    """
+    rng = random.Random(seed)
+    return [sampler(rng) for _ in range(n_iter)]
+
+
+def run_sweep(
+    strategy_factory, df, parameters, max_workers=None, backtest_kwargs=None, seed=None, chunksize=None, mp_context=None,
+    copy=True,
+):
+    """ Run one backtest per parameter set over a process pool
+
+        The numeric, boolean and datetime columns of df are copied once in a shared memory
+        block, every worker rebuilds its own dataframe from it instead of receiving a pickled
+        copy per task. The other columns (ex: a 'pair' string column) are pickled once per worker.
+
+        :param strategy_factory: called as strategy_factory(df=df, **params) in the workers,
+            returns either a dict of results or a strategy object with populate_indicators,
+            populate_buy_sell and run_backtest (as in the notebooks). It must be picklable:
+            with the spawn start method (Windows, macOS) define it in a module, not in a notebook
+        :param df: dataframe indexed by date (naive or tz-aware), ex: open, high, low, close, volume
+        :param parameters: dict of lists (every combination is run) or list of dicts
+        :param max_workers: number of processes, default os.cpu_count(), 1 runs in this process
+        :param backtest_kwargs: kwargs given to run_backtest, ex: {"initial_wallet": 1000}
+        :param seed: if set, numpy and random are seeded with seed + run number before each run
+        :param chunksize: number of runs sent to a worker at once
+        :param mp_context: multiprocessing context of the pool, ex: multiprocessing.get_context("spawn"),
+            default the platform start method
+        :param copy: if True every run gets a private copy of df. If False the runs get a
+            read-only dataframe built once per worker, for factories that only read slices
+            of a large df (ex: simulation.backtest_paths)
+        :return: dataframe with one row per parameter set, the parameters and the scalar results
+            (the trades/days dataframes are not sent back), and an 'error' column if some runs failed
+    """
+    results = list(iter_sweep(
+        strategy_factory,
+        df,
+        parameters,
+        max_workers=max_workers,
+        backtest_kwargs=backtest_kwargs,
+        seed=seed,
+        chunksize=chunksize,
+        mp_context=mp_context,
+        copy=copy,
+    ))
+    results.sort(key=lambda result: result[0])
+    return pd.DataFrame([result for _, result in results], index=[position for position, _ in results])
+
+
+def iter_sweep(
+    strategy_factory, df, parameters, max_workers=None, backtest_kwargs=None, seed=None, chunksize=None, mp_context=None,
+    copy=True,
+):
+    """ Same as run_sweep but yields (run number, results dict) as soon as each run is done
+    """
+    if isinstance(parameters, dict):
+        parameters = parameter_grid(**parameters)
+    tasks = list(enumerate(parameters))
+    backtest_kwargs = backtest_kwargs or {}
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1:
+        for position, params in tqdm(tasks, desc="Sweep"):
+            yield position, _run_one(
+                strategy_factory, df.copy() if copy else df, position, params, backtest_kwargs, seed)
+        return
+
+    if chunksize is None:
+        chunksize = max(1, min(16, math.ceil(len(tasks) / (max_workers * 8))))
+    shm, spec = _share_frame(df)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(spec,),
+        ) as executor:
+            futures = [
+                executor.submit(_run_batch, strategy_factory, tasks[i:i + chunksize], backtest_kwargs, seed, copy)
+                for i in range(0, len(tasks), chunksize)
+            ]
+            with tqdm(total=len(tasks), desc="Sweep") as pbar:
+                for future in as_completed(futures):
+                    for result in future.result():
+                        pbar.update(1)
+                        yield result
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _share_frame(df):
+    """ Copy the index and the numeric, boolean and datetime columns of df in one shared
+        memory block. Only raw values are shared: datetimes as int64 UTC values plus their
+        timezone, the other columns (strings, objects) are kept aside to be pickled once
+        in the arguments of the worker initializer
+
+        :return: the shared memory block and the spec given to _init_worker
+    """
+    arrays = {}
+    timezones = {}
+    objects = {}
+    for name, values in [(_INDEX, df.index)] + list(df.items()):
+        dtype = values.dtype
+        if isinstance(values, pd.RangeIndex):
+            # a few bytes pickled instead of one integer per row
+            objects[name] = values
+        elif isinstance(dtype, pd.DatetimeTZDtype) or (isinstance(dtype, np.dtype) and dtype.kind == "M"):
+            dates = pd.DatetimeIndex(values)
+            timezones[name] = dates.tz
+            if dates.tz is not None:
+                dates = dates.tz_convert("UTC").tz_localize(None)
+            arrays[name] = dates.to_numpy()
+        elif isinstance(dtype, np.dtype) and (np.issubdtype(dtype, np.number) or np.issubdtype(dtype, np.bool_)):
+            arrays[name] = np.asarray(values)
+        else:
+            objects[name] = values if name == _INDEX else values.array
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        layout.append((name, array.dtype.str, offset, len(array)))
+        offset += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, offset, length) in layout:
+        np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)[:] = arrays[name]
+    spec = {
+        "name": shm.name,
+        "layout": layout,
+        "timezones": timezones,
+        "objects": objects,
+        "columns": list(df.columns),
+        "index_name": df.index.name,
+    }
+    return shm, spec
+
+
+def _init_worker(spec):
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    _shared["shm"] = shm
+    _shared["arrays"] = {
+        column: np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)
+        for (column, dtype, offset, length) in spec["layout"]
+    }
+    _shared["spec"] = spec
+    # forked workers inherit the same random state, reseed them from the OS
+    np.random.seed()
+    random.seed()
+
+
+def _shared_values(name):
+    spec = _shared["spec"]
+    if name in spec["objects"]:
+        return spec["objects"][name].copy()
+    values = _shared["arrays"][name].copy()
+    if name in spec["timezones"]:
+        values = pd.DatetimeIndex(values)
+        if spec["timezones"][name] is not None:
+            values = values.tz_localize("UTC").tz_convert(spec["timezones"][name])
+    return values
+
+
+def _shared_frame():
+    """ Private copy of the shared dataframe, strategies are free to modify it """
+    spec = _shared["spec"]
+    index = pd.Index(_shared_values(_INDEX), name=spec["index_name"])
+    return pd.DataFrame({column: _shared_values(column) for column in spec["columns"]}, index=index)
+
+
+def _shared_view():
+    """ Read-only dataframe over the shared block, built once per worker """
+    if "view" not in _shared:
+        spec = _shared["spec"]
+        columns = {}
+        for column in spec["columns"]:
+            if column in spec["objects"] or column in spec["timezones"]:
+                columns[column] = _shared_values(column)
+            else:
+                columns[column] = _shared["arrays"][column]
+                columns[column].flags.writeable = False
+        index = pd.Index(_shared_values(_INDEX), name=spec["index_name"])
+        _shared["view"] = pd.DataFrame(columns, index=index, copy=False)
+    return _shared["view"]
+
+
+def _run_batch(strategy_factory, tasks, backtest_kwargs, seed, copy=True):
+    return [
+        (position, _run_one(
+            strategy_factory, _shared_frame() if copy else _shared_view(), position, params, backtest_kwargs, seed))
+        for position, params in tasks
+    ]
+
+
+def _run_one(strategy_factory, df, position, params, backtest_kwargs, seed):
+    if seed is not None:
+        np.random.seed(seed + position)
+        random.seed(seed + position)
+    try:
+        result = strategy_factory(df=df, **params)
+        if not isinstance(result, dict):
+            result.populate_indicators()
+            result.populate_buy_sell()
+            result = result.run_backtest(**backtest_kwargs)
+        metrics = {key: value for key, value in result.items() if value is None or np.isscalar(value)}
+    except Exception as e:
+        metrics = {"error": repr(e)}
+    return params | metrics
@@ -0,0 +1,218 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utilities.backtest_engine import run_single_asset_backtest, score_backtest
+from utilities.parameter_sweep import run_sweep
+
+
+def block_bootstrap_indexes(length, n_resamples, block_size=1, rng=None):
+    """ Circular moving block bootstrap: rows of each resample, made of blocks of
+        block_size consecutive rows starting at random positions
+
+        Returns:
+            np.ndarray: indexes, shape (n_resamples, length)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    n_blocks = -(-length // block_size)
+    starts = rng.integers(0, length, size=(n_resamples, n_blocks))
+    indexes = (starts[:, :, None] + np.arange(block_size)) % length
+    return indexes.reshape(n_resamples, -1)[:, :length]
+
+
+def return_statistics(daily_return, periods_per_year=365):
+    """ Sharpe, sortino, max drawdown and total return of each row of daily returns
+
+        Args:
+            daily_return (np.ndarray): returns, shape (n_resamples, days), NaN free
+
+        Returns:
+            dict: arrays of shape (n_resamples,)
+    """
+    daily_return = np.atleast_2d(daily_return)
+    mean_return = daily_return.mean(axis=1)
+    negative = np.where(daily_return < 0, daily_return, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        negative_std = np.sqrt(
+            np.nansum((negative - np.nanmean(negative, axis=1, keepdims=True)) ** 2, axis=1)
+            / (np.sum(daily_return < 0, axis=1) - 1)
+        )
+        sharpe_ratio = periods_per_year**0.5 * mean_return / daily_return.std(axis=1, ddof=1)
+        sortino_ratio = periods_per_year**0.5 * mean_return / negative_std
+    wallet = np.cumprod(1 + daily_return, axis=1)
+    wallet_ath = np.maximum(np.maximum.accumulate(wallet, axis=1), 1)
+    return {
+        'sharpe_ratio': sharpe_ratio,
+        'sortino_ratio': sortino_ratio,
+        'max_drawdown': ((wallet_ath - wallet) / wallet_ath).max(axis=1),
+        'total_return': wallet[:, -1] - 1,
+    }
+
+
+def trade_statistics(trade_results):
+    """ Win rate and average profit of each row of trade results
+
+        Args:
+            trade_results (np.ndarray): results in %, shape (n_resamples, trades)
+
+        Returns:
+            dict: arrays of shape (n_resamples,)
+    """
+    trade_results = np.atleast_2d(trade_results)
+    return {
+        'win_rate': (trade_results > 0).mean(axis=1),
+        'avg_profit': trade_results.mean(axis=1),
+    }
+
+
+def _bootstrap_chunk(daily_return, trade_results, n_resamples, block_size, seed, periods_per_year):
+    rng = np.random.default_rng(seed)
+    statistics = {}
+    if daily_return is not None:
+        indexes = block_bootstrap_indexes(len(daily_return), n_resamples, block_size, rng)
+        statistics |= return_statistics(daily_return[indexes], periods_per_year)
+    if trade_results is not None:
+        indexes = block_bootstrap_indexes(len(trade_results), n_resamples, 1, rng)
+        statistics |= trade_statistics(trade_results[indexes])
+    return statistics
+
+
+def bootstrap_metrics(
+    daily_return=None,
+    trade_results=None,
+    n_resamples=10000,
+    block_size=None,
+    conf_level=0.95,
+    seed=None,
+    max_workers=None,
+    chunk_size=500,
+    periods_per_year=365,
+):
+    """ Confidence intervals of the backtest metrics by bootstrap
+
+        The daily returns are resampled by blocks (to keep the volatility clusters and
+        the autocorrelation), the trades one by one. Resamples are computed as
+        (resamples x days) arrays, by chunks spread over threads.
+
+        ex: df_trades, df_days = complete_multi_asset_backtest(trades, days)
+            bootstrap_metrics(df_days['daily_return'], df_trades['trade_result_pct'])
+
+        Args:
+            daily_return (pd.Series): daily returns (NaN are dropped)
+            trade_results (pd.Series): result of each trade in %
+            n_resamples (int): number of resamples
+            block_size (int): days per block, default sqrt(days)
+            conf_level (float): confidence level of the intervals
+            seed (int): seed of the resamples
+            max_workers (int): number of threads, default os.cpu_count()
+            chunk_size (int): resamples computed at once by a thread
+            periods_per_year (int): number of returns per year
+
+        Returns:
+            dict: 'summary' (observed value, bootstrap mean and interval of each metric)
+            and 'samples' (one row per resample)
+    """
+    if daily_return is not None:
+        daily_return = np.asarray(daily_return, dtype=float)
+        daily_return = daily_return[~np.isnan(daily_return)]
+        if block_size is None:
+            block_size = max(1, int(round(np.sqrt(len(daily_return)))))
+    if trade_results is not None:
+        trade_results = np.asarray(trade_results, dtype=float)
+        trade_results = trade_results[~np.isnan(trade_results)]
+    if daily_return is None and trade_results is None:
+        raise ValueError("Nothing to resample")
+
+    chunks = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        results = list(executor.map(
+            lambda args: _bootstrap_chunk(daily_return, trade_results, args[0], block_size, args[1], periods_per_year),
+            zip(chunks, seeds),
+        ))
+    samples = pd.DataFrame({
+        metric: np.concatenate([result[metric] for result in results]) for metric in results[0]
+    })
+
+    observed = {}
+    if daily_return is not None:
+        observed |= return_statistics(daily_return, periods_per_year)
+    if trade_results is not None:
+        observed |= trade_statistics(trade_results)
+    alpha = (1 - conf_level) / 2
+    summary = pd.DataFrame({
+        'observed': {metric: values[0] for metric, values in observed.items()},
+        'mean': samples.mean(),
+        'lower': samples.quantile(alpha),
+        'upper': samples.quantile(1 - alpha),
+    })
+    return {'summary': summary, 'samples': samples}
+
+
+class PermutedBacktest:
+    """ Sweep task of permutation_test: backtests df with its signal rows shuffled """
+
+    def __init__(self, signal_columns, backtest, backtest_kwargs, periods_per_year, seed):
+        self.signal_columns = signal_columns
+        self.backtest = backtest
+        self.backtest_kwargs = backtest_kwargs
+        self.periods_per_year = periods_per_year
+        self.seed = seed
+
+    def __call__(self, df, permutation):
+        rng = np.random.default_rng(None if self.seed is None else [self.seed, permutation])
+        signals = df[self.signal_columns].to_numpy()
+        df[self.signal_columns] = signals[rng.permutation(len(df))]
+        result = self.backtest(df, return_type="arrays", **self.backtest_kwargs)
+        score = score_backtest(result["equity"], result["trade_results"], self.periods_per_year)
+        return {"wallet": result["wallet"]} | score._asdict()
+
+
+def permutation_test(
+    df,
+    signal_columns=None,
+    n_permutations=1000,
+    score="sharpe_ratio",
+    backtest=run_single_asset_backtest,
+    backtest_kwargs=None,
+    seed=None,
+    max_workers=None,
+    periods_per_year=365,
+):
+    """ Does the strategy beat the same signals at random dates?
+
+        The rows of the signal columns are shuffled together (same number of signals,
+        same combinations on a row, random timing) and backtested n_permutations times
+        over a process pool with run_sweep. The p-value is the share of shuffled
+        backtests scoring at least as well as the real one.
+
+        Args:
+            df (pd.DataFrame): populated strategy dataframe (after populate_buy_sell)
+            signal_columns (list): columns to shuffle, default the boolean columns
+            n_permutations (int): number of shuffled backtests
+            score (str): BacktestScore field (or 'wallet') compared
+            backtest: engine called as backtest(df, return_type="arrays", **backtest_kwargs)
+            backtest_kwargs (dict): ex: {"initial_wallet": 1000, "leverage": 1}
+            seed (int): seed of the permutations
+            max_workers (int): number of processes, see run_sweep
+            periods_per_year (int): number of equity reports per year
+
+        Returns:
+            dict: 'observed' score, 'p_value' and 'samples' (one row per permutation)
+    """
+    if signal_columns is None:
+        signal_columns = [column for column in df.columns if df[column].dtype == bool]
+    backtest_kwargs = backtest_kwargs or {}
+    result = backtest(df.copy(), return_type="arrays", **backtest_kwargs)
+    observed = ({"wallet": result["wallet"]} | score_backtest(
+        result["equity"], result["trade_results"], periods_per_year)._asdict())[score]
+
+    task = PermutedBacktest(list(signal_columns), backtest, backtest_kwargs, periods_per_year, seed)
+    samples = run_sweep(
+        task, df, [{"permutation": i} for i in range(n_permutations)], max_workers=max_workers)
+    scores = samples[score].to_numpy(dtype=float)
+    scores = scores[~np.isnan(scores)]
+    p_value = (1 + np.sum(scores >= observed)) / (1 + len(scores))
+    return {'observed': observed, 'p_value': p_value, 'samples': samples}
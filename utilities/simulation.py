@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from utilities.backtest_engine import run_single_asset_backtest, score_backtest
+from utilities.parameter_sweep import run_sweep
+
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+
+
+def simulate_close(period, sigma, mu, initial_price, time, n_paths=1, rng=None):
+    """ Geometric brownian motion closes, as the simulation notebook, for n_paths at once
+
+        Args:
+            period (int): number of candles per year, ex: 365 * 24 for 1h candles
+            sigma (float): standard deviation of the candle returns
+            mu (float): mean of the candle returns
+            initial_price (float): price before the first candle
+            time (int): number of candles
+            n_paths (int): number of paths
+            rng (np.random.Generator): random generator, ex: np.random.default_rng(42)
+
+        Returns:
+            np.ndarray: closes, shape (n_paths, time)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    mu = mu * period  # drift
+    sigma = sigma * np.sqrt(period)  # volatility
+    delta = 1 / period
+
+    wiener_process = sigma * rng.normal(loc=0, scale=np.sqrt(delta), size=(n_paths, time))
+    gbm = np.exp(wiener_process + (mu - sigma**2 / 2) * delta)
+    return initial_price * gbm.cumprod(axis=1)
+
+
+def simulate_ohlc(close, period, sigma, rng=None):
+    """ Open, high and low around simulated closes, as the simulation notebook
+
+        Args:
+            close (np.ndarray): closes, shape (n_paths, time)
+            period (int): number of candles per year
+            sigma (float): standard deviation of the wicks in % of the body
+            rng (np.random.Generator): random generator
+
+        Returns:
+            dict: 'open', 'high', 'low' and 'close' arrays, shape (n_paths, time)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    close = np.atleast_2d(close)
+    mu = 0  # drift
+    sigma = sigma * np.sqrt(period)  # volatility
+    delta = 1 / period
+
+    open_ = np.empty(close.shape)
+    open_[:, 1:] = close[:, :-1]
+    open_[:, :1] = close[:, :1]
+    wiener_process_high = sigma * np.abs(rng.normal(loc=0, scale=np.sqrt(delta), size=close.shape))
+    wiener_process_low = sigma * np.abs(rng.normal(loc=0, scale=np.sqrt(delta), size=close.shape))
+    gbm_high = np.exp(wiener_process_high + (mu - sigma**2 / 2) * delta)
+    gbm_low = np.exp(wiener_process_low + (mu - sigma**2 / 2) * delta)
+    return {
+        "open": open_,
+        "high": gbm_high * np.maximum(open_, close),
+        "low": (1 - (gbm_low - 1)) * np.minimum(open_, close),
+        "close": close,
+    }
+
+
+def generate_fake_data(df, period, n_paths=1, seed=None):
+    """ Synthetic OHLC paths with the returns and wicks statistics of df
+
+        Args:
+            df (pd.DataFrame): OHLC dataframe indexed by date
+            period (int): number of candles per year, ex: 365 * 24 for 1h candles
+            n_paths (int): number of paths
+            seed (int): seed of the generator, the same seed gives the same paths
+
+        Returns:
+            dict: 'open', 'high', 'low' and 'close' arrays of shape (n_paths, len(df)),
+            and 'index' (the dates of df), see path_frame
+    """
+    rng = np.random.default_rng(seed)
+    close = df["close"].to_numpy(dtype=float)
+    returns = close[1:] / close[:-1] - 1
+    sigma = np.nanstd(returns, ddof=1)
+    mu = np.nanmean(returns)
+
+    fake_close = simulate_close(period, sigma, mu, close[0], len(df), n_paths, rng)
+
+    body_top = np.maximum(df["open"].to_numpy(dtype=float), close)
+    sigma_high_low = np.nanstd((df["high"].to_numpy(dtype=float) - body_top) / body_top, ddof=1) * 1.5
+    paths = simulate_ohlc(fake_close, period, sigma_high_low, rng)
+    paths["index"] = df.index
+    return paths
+
+
+def path_frame(paths, i):
+    """ OHLC dataframe of the path i of a generate_fake_data batch """
+    return pd.DataFrame(
+        {column: paths[column][i] for column in OHLC_COLUMNS},
+        index=paths["index"],
+    )
+
+
+class PathBacktest:
+    """ Sweep task of backtest_paths: backtests one path of the shared batch """
+
+    def __init__(self, index, strategy_factory, params, backtest, backtest_kwargs, periods_per_year):
+        self.index = index
+        self.strategy_factory = strategy_factory
+        self.params = params
+        self.backtest = backtest
+        self.backtest_kwargs = backtest_kwargs
+        self.periods_per_year = periods_per_year
+
+    def __call__(self, df, path):
+        rows = slice(path * len(self.index), (path + 1) * len(self.index))
+        strategy = self.strategy_factory(
+            df=pd.DataFrame({column: df[column].to_numpy()[rows] for column in OHLC_COLUMNS}, index=self.index),
+            **self.params,
+        )
+        strategy.populate_indicators()
+        strategy.populate_buy_sell()
+        result = self.backtest(strategy.df, return_type="arrays", **self.backtest_kwargs)
+        score = score_backtest(result["equity"], result["trade_results"], self.periods_per_year)
+        return {"wallet": result["wallet"]} | score._asdict()
+
+
+def backtest_paths(
+    paths,
+    strategy_factory,
+    params=None,
+    backtest=run_single_asset_backtest,
+    backtest_kwargs=None,
+    periods_per_year=365,
+    max_workers=None,
+    seed=None,
+):
+    """ Backtest a strategy on every path of a generate_fake_data batch
+
+        Each path goes through the strategy populate_indicators / populate_buy_sell, then
+        through an array backtest engine and score_backtest, no trades or days dataframe
+        is built. The paths are spread over a process pool with run_sweep, the batch is put
+        once in shared memory and each run only copies its own path.
+        ex: scores = backtest_paths(generate_fake_data(df, 365 * 24, 10000), BolTrend)
+
+        Args:
+            paths (dict): batch returned by generate_fake_data
+            strategy_factory: called as strategy_factory(df=df, **params), returns a strategy
+                with populate_indicators and populate_buy_sell. It must be picklable, see run_sweep
+            params (dict): strategy parameters
+            backtest: engine called as backtest(df, return_type="arrays", **backtest_kwargs),
+                ex: run_single_asset_backtest, run_tp_sl_backtest, run_envelope_backtest
+            backtest_kwargs (dict): ex: {"initial_wallet": 1000, "leverage": 1}
+            periods_per_year (int): number of equity reports per year (daily reports: 365)
+            max_workers (int): number of processes, default os.cpu_count(), 1 runs in this process
+            seed (int): if set, numpy and random are seeded with seed + path before each backtest
+
+        Returns:
+            pd.DataFrame: one row per path, with the final wallet and the BacktestScore fields,
+            and an 'error' column if some backtests failed
+    """
+    task = PathBacktest(
+        paths["index"], strategy_factory, params or {}, backtest, backtest_kwargs or {}, periods_per_year)
+    batch = pd.DataFrame({column: paths[column].ravel() for column in OHLC_COLUMNS})
+    scores = run_sweep(
+        task,
+        batch,
+        [{"path": i} for i in range(len(paths["close"]))],
+        max_workers=max_workers,
+        seed=seed,
+        copy=False,
+    )
+    return scores.drop(columns="path")
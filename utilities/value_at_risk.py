@@ -0,0 +1,128 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from utilities.panel import align_pairs
+
+
+class ValueAtRisk:
+    """ Drop-in replacement of the ValueAtRisk class of the multi_division notebooks
+
+        The close returns of every pair are computed once on a common (time x pair)
+        panel. The window sums (count, sum and cross products of the returns) are then
+        slid row by row with O(pairs²) work, instead of copying every dataframe and
+        rebuilding the covariance matrix from 1000 rows at each update.
+
+        Same conventions as the notebooks: the window of a date holds the returns of the
+        occurance_data closes before it without the last one, a pair that is not listed
+        at that date or has less than occurance_data rows before it gets -1 returns, and
+        null covariances are replaced by 1. Windows are aligned on dates, so a pair with
+        missing candles only uses the returns it really has.
+    """
+
+    def __init__(self, df_list, conf_level=0.05, index=None):
+        self.index, self.pairs, panel, valid = align_pairs(df_list, ["close"], index)
+        close = panel["close"]
+        self.returns = np.full(close.shape, np.nan)
+        self.returns[1:] = close[1:] / close[:-1] - 1
+        self.rows_before = np.cumsum(valid, axis=0) - valid
+        self.valid = valid
+        self.pair_position = {pair: j for j, pair in enumerate(self.pairs)}
+        self.cov = None
+        self.avg_return = None
+        self.conf_level = conf_level
+        self.usd_balance = 1
+        self._window = None
+        self._occurance_data = None
+        self._count = None
+        self._sum = None
+        self._product = None
+
+    def _add_rows(self, start, end, sign=1):
+        block = self.returns[max(start, 0):max(end, 0)]
+        mask = np.isfinite(block).astype(float)
+        block = np.nan_to_num(block)
+        self._count += sign * (mask.T @ mask)
+        self._sum += sign * (block.T @ mask)
+        self._product += sign * (block.T @ block)
+
+    def _move_window(self, start, end, occurance_data):
+        """ Slide the window sums to the returns rows [start, end) """
+        n = len(self.pairs)
+        if (
+            self._window is None
+            or occurance_data != self._occurance_data
+            or start < self._window[0]
+            or start >= self._window[1]
+        ):
+            self._count = np.zeros((n, n))
+            self._sum = np.zeros((n, n))
+            self._product = np.zeros((n, n))
+            self._add_rows(start, end)
+        else:
+            self._add_rows(self._window[0], start, sign=-1)
+            self._add_rows(self._window[1], end)
+        self._window = (start, end)
+        self._occurance_data = occurance_data
+
+    def update_cov(self, current_date, occurance_data=1000):
+        n = len(self.pairs)
+        try:
+            row = self.index.get_loc(current_date)
+            self._move_window(row - occurance_data + 1, row - 1, occurance_data)
+            in_window = self.valid[row] & (self.rows_before[row] >= occurance_data)
+        except KeyError:
+            in_window = np.zeros(n, dtype=bool)
+
+        cov = np.zeros((n, n))
+        avg_return = np.full(n, -1.0)
+        if in_window.any():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov = (self._product - self._sum * self._sum.T / self._count) / (self._count - 1)
+                avg_return = np.where(in_window, np.diag(self._sum) / np.diag(self._count), -1.0)
+            cov = np.where(np.outer(in_window, in_window), np.nan_to_num(cov), 0.0)
+
+        # Columns are long_pair, short_pair for each pair, short returns are -long returns
+        sign = np.array([1.0, -1.0])
+        self.cov = np.einsum("ij,a,b->iajb", cov, sign, sign).reshape(2 * n, 2 * n)
+        self.cov[self.cov == 0.0] = 1.0
+        self.avg_return = np.where(
+            np.repeat(in_window, 2), np.outer(avg_return, sign).ravel(), -1.0
+        )
+
+    def get_var(self, positions):
+        """ Value at risk in % of usd_balance
+
+            Args:
+                positions (dict): pair -> {"long": exposition, "short": exposition}
+                    or a (pair x 2) np.ndarray in the order of df_list
+        """
+        if not isinstance(positions, dict):
+            return self.get_var_array(positions)
+        exposures = np.zeros((len(self.pairs), 2))
+        for pair in positions:
+            exposures[self.pair_position[pair]] = positions[pair]["long"], positions[pair]["short"]
+        return self.get_var_array(exposures)
+
+    def get_var_array(self, exposures):
+        """ Value at risk in % of usd_balance, without building a positions dict
+
+            Args:
+                exposures (np.ndarray): (pair x 2) long and short expositions, rows in
+                    the order of self.pairs (the order of df_list)
+        """
+        weights = np.asarray(exposures, dtype=float).ravel()
+        usd_in_position = weights.sum()
+        if usd_in_position == 0:
+            return 0
+        weights = weights / usd_in_position
+
+        port_mean = self.avg_return.dot(weights)
+        port_stdev = np.sqrt(weights.dot(self.cov).dot(weights))
+
+        mean_investment = (1 + port_mean) * usd_in_position
+        stdev_investment = usd_in_position * port_stdev
+        cutoff = mean_investment + stdev_investment * NormalDist().inv_cdf(self.conf_level)
+
+        var_1d1 = usd_in_position - cutoff
+        return var_1d1 / self.usd_balance * 100
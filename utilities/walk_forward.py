@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+from utilities.parameter_sweep import run_sweep, parameter_grid
+
+# Trade and day columns that scale with the wallet when the folds are chained
+WALLET_TRADES_COLUMNS = ["open_fee", "close_fee", "open_trade_size", "close_trade_size", "wallet"]
+WALLET_DAYS_COLUMNS = ["wallet"]
+
+
+def walk_forward_windows(start, end, train, test, step=None, anchored=False):
+    """ Rolling in-sample / out-of-sample windows, as [start, end) pairs of timestamps
+
+        :param start: first date of the history
+        :param end: end of the history (excluded)
+        :param train: in-sample length, ex: pd.Timedelta("180D") or pd.DateOffset(months=6)
+        :param test: out-of-sample length
+        :param step: shift between two folds, default test (contiguous out-of-sample)
+        :param anchored: if True every in-sample window starts at start
+        :return: list of (train_start, train_end, test_start, test_end)
+    """
+    train, test = _to_offset(train), _to_offset(test)
+    step = test if step is None else _to_offset(step)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    windows = []
+    test_start = start + train
+    while test_start < end:
+        train_start = start if anchored else test_start - train
+        windows.append((train_start, test_start, test_start, min(test_start + test, end)))
+        test_start = test_start + step
+    return windows
+
+
+def run_walk_forward(
+    strategy_factory,
+    df,
+    parameters,
+    train,
+    test,
+    step=None,
+    anchored=False,
+    score="sharpe_ratio",
+    max_workers=None,
+    backtest_kwargs=None,
+    seed=None,
+):
+    """ Walk-forward optimization: the best parameters of each in-sample window are
+        backtested on the following out-of-sample window and the out-of-sample results
+        are stitched together
+
+        Indicators and signals are computed once per parameter set on the whole history,
+        each fold only backtests its slice of them, so overlapping windows never recompute
+        indicators. The parameter sets are spread over a process pool with run_sweep.
+
+        :param strategy_factory: strategy class or factory, see run_sweep. Its run_backtest
+            must return the metrics and the 'wallet', 'trades' and 'days' of the backtest
+        :param df: OHLCV dataframe indexed by date
+        :param parameters: dict of lists (every combination) or list of dicts
+        :param train: in-sample length, ex: pd.Timedelta("180D") or pd.DateOffset(months=6)
+        :param test: out-of-sample length
+        :param step: shift between two folds, default test
+        :param anchored: if True every in-sample window starts at the beginning of df
+        :param score: metric to maximize, or a function result -> float
+        :param max_workers: number of processes of the sweep
+        :param backtest_kwargs: kwargs given to run_backtest, ex: {"initial_wallet": 1000}
+        :param seed: seed of the sweep runs, see run_sweep
+        :return: dict with the stitched 'wallet', 'trades' and 'days' (with a 'fold' column,
+            usable by complete_multi_asset_backtest), 'folds' (windows, best parameters,
+            in-sample score, out-of-sample wallet and number of trades) and 'sweep' (every
+            in-sample score). A fold without trades (run_backtest returned None) or whose
+            backtest failed is kept flat: wallet unchanged, 0 trades and skipped True
+    """
+    if isinstance(parameters, dict):
+        parameters = parameter_grid(**parameters)
+    backtest_kwargs = backtest_kwargs or {}
+    initial_wallet = backtest_kwargs.get("initial_wallet", 1000)
+    end = df.index[-1] + (df.index[-1] - df.index[-2] if len(df) > 1 else pd.Timedelta(0))
+    windows = walk_forward_windows(df.index[0], end, train, test, step=step, anchored=anchored)
+    if not windows:
+        raise ValueError("History is shorter than the in-sample window")
+
+    scorer = FoldScorer(strategy_factory, [(a, b) for (a, b, _, _) in windows], score, backtest_kwargs)
+    sweep = run_sweep(scorer, df, parameters, max_workers=max_workers, seed=seed)
+    fold_columns = [FoldScorer.column(i) for i in range(len(windows))]
+    for column in fold_columns:
+        if column not in sweep:
+            sweep[column] = np.nan
+
+    folds = []
+    trades = []
+    days = []
+    wallet = initial_wallet
+    signals = {}
+    for i, (train_start, train_end, test_start, test_end) in enumerate(windows):
+        fold = {
+            "fold": i,
+            "train_start": train_start,
+            "train_end": train_end,
+            "test_start": test_start,
+            "test_end": test_end,
+            "in_sample_score": np.nan,
+            "wallet": wallet,
+            "trades": 0,
+            "skipped": True,
+        }
+        scores = sweep[fold_columns[i]].astype(float)
+        if scores.notna().sum() == 0:
+            print(f"Fold {i} skipped ({test_start} - {test_end}): no in-sample score")
+            folds.append(fold)
+            continue
+        best = int(scores.idxmax())
+        params = parameters[best]
+        fold["in_sample_score"] = scores[best]
+        if best not in signals:
+            signals[best] = _populate(strategy_factory, df.copy(), params)
+        strategy = signals[best]
+        full_df = strategy.df
+        strategy.df = _slice(full_df, test_start, test_end).copy()
+        try:
+            result = strategy.run_backtest(**backtest_kwargs)
+        except Exception as e:
+            print(f"Fold {i} skipped ({test_start} - {test_end}): {e!r}")
+            result = None
+        finally:
+            strategy.df = full_df
+
+        # no trade (run_backtest returns None) or failed backtest: flat fold, wallet unchanged
+        if result is None:
+            folds.append(fold | params)
+            continue
+
+        factor = wallet / initial_wallet
+        fold_trades = result["trades"].copy()
+        fold_days = result["days"].copy()
+        for column in WALLET_TRADES_COLUMNS:
+            if column in fold_trades:
+                fold_trades[column] = fold_trades[column] * factor
+        for column in WALLET_DAYS_COLUMNS:
+            if column in fold_days:
+                fold_days[column] = fold_days[column] * factor
+        fold_trades["fold"] = i
+        fold_days["fold"] = i
+        trades.append(fold_trades)
+        days.append(fold_days)
+        wallet = result["wallet"] * factor
+
+        folds.append(fold | {"wallet": wallet, "trades": len(fold_trades), "skipped": False} | params)
+
+    df_trades = pd.concat(trades) if trades else pd.DataFrame()
+    df_days = pd.concat(days) if days else pd.DataFrame()
+    if len(df_days):
+        df_days = df_days[~df_days.index.duplicated(keep="last")]
+    return {
+        "wallet": wallet,
+        "trades": df_trades,
+        "days": df_days,
+        "folds": pd.DataFrame(folds),
+        "sweep": sweep,
+    }
+
+
+class FoldScorer:
+    """ Sweep task of run_walk_forward: computes the indicators and signals of one parameter
+        set once, then scores every in-sample window on slices of them
+    """
+
+    def __init__(self, strategy_factory, windows, score, backtest_kwargs):
+        self.strategy_factory = strategy_factory
+        self.windows = windows
+        self.score = score
+        self.backtest_kwargs = backtest_kwargs
+
+    @staticmethod
+    def column(fold):
+        return f"score_fold_{fold}"
+
+    def __call__(self, df, **params):
+        strategy = _populate(self.strategy_factory, df, params)
+        full_df = strategy.df
+        scores = {}
+        for i, (start, end) in enumerate(self.windows):
+            strategy.df = _slice(full_df, start, end).copy()
+            try:
+                result = strategy.run_backtest(**self.backtest_kwargs)
+                scores[self.column(i)] = self.score(result) if callable(self.score) else result[self.score]
+            except Exception:
+                scores[self.column(i)] = np.nan
+        return scores
+
+
+def _populate(strategy_factory, df, params):
+    strategy = strategy_factory(df=df, **params)
+    strategy.populate_indicators()
+    strategy.populate_buy_sell()
+    return strategy
+
+
+def _slice(df, start, end):
+    return df.iloc[df.index.searchsorted(start):df.index.searchsorted(end)]
+
+
+def _to_offset(length):
+    return pd.Timedelta(length) if isinstance(length, str) else length